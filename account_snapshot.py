@@ -0,0 +1,89 @@
+"""계좌 잔고 스냅샷
+
+upbit.get_balance / get_avg_buy_price는 호출마다 /v1/accounts 전체를 서명 요청으로
+받아온다. 한 번 받은 get_balances() 결과로 모든 통화의 잔고/매수평균가 조회를
+처리하고, 주문이 나가거나 체결되면 무효화해 다음 조회 때 다시 받는다.
+여러 티커가 스냅샷을 공유하면 order_lock으로 주문을 하나씩 내서 다음 주문이
+앞 주문에 묶인 금액을 뺀 잔고로 크기를 정하게 한다.
+"""
+import os
+import threading
+import time
+
+
+ACCOUNT_MAX_AGE = float(os.getenv("ACCOUNT_MAX_AGE", "30"))  # 주문이 없어도 이 시간(초)이 지나면 재조회
+
+
+def _split(ticker):
+    """"KRW-BTC" -> ("BTC", "KRW"), "KRW" -> ("KRW", "KRW")"""
+    if "-" in ticker:
+        fiat, currency = ticker.split("-")
+        return currency, fiat
+    return ticker, "KRW"
+
+
+class AccountSnapshot:
+    """get_balances() 1회 호출 결과를 공유하는 잔고 캐시 (스레드 안전)"""
+
+    def __init__(self, upbit, max_age=ACCOUNT_MAX_AGE):
+        self.upbit = upbit
+        self.max_age = max_age
+        self.fetches = 0                # 실제 /accounts 요청 수
+        self._accounts = None           # (currency, unit_currency) -> 계좌 dict
+        self._fetched_at = 0.0
+        self._generation = 0            # invalidate()마다 증가
+        self._fetched_generation = -1
+        self._state_lock = threading.Lock()
+        self._fetch_lock = threading.Lock()  # 동시에 여러 스레드가 조회해도 요청은 1번
+        # 잔고로 주문 크기를 정하고 제출할 때까지 잡는 락 (스냅샷을 공유하는 티커들의 주문을 하나씩 처리)
+        self.order_lock = threading.Lock()
+
+    def _fresh(self):
+        return (self._accounts is not None
+                and self._fetched_generation == self._generation
+                and time.monotonic() - self._fetched_at < self.max_age)
+
+    def accounts(self):
+        """(currency, unit_currency) -> 계좌 정보 (필요할 때만 재조회)"""
+        with self._state_lock:
+            if self._fresh():
+                return self._accounts
+        with self._fetch_lock:
+            with self._state_lock:
+                if self._fresh():  # 기다리는 동안 다른 스레드가 받아옴
+                    return self._accounts
+                generation = self._generation
+            rows = self.upbit.get_balances()
+            if not isinstance(rows, list):
+                raise RuntimeError(f"잔고 조회 실패: {rows}")
+            accounts = {(row["currency"], row["unit_currency"]): row for row in rows}
+            with self._state_lock:
+                self.fetches += 1
+                self._accounts = accounts
+                self._fetched_at = time.monotonic()
+                # 요청 도중 주문이 나갔다면 이번 결과는 이번 호출에만 쓰고 캐시로 인정하지 않음
+                self._fetched_generation = generation
+            return accounts
+
+    def _row(self, ticker):
+        return self.accounts().get(_split(ticker))
+
+    def balance(self, ticker="KRW"):
+        """주문 가능 수량 (upbit.get_balance와 동일, 주문 중 묶인 수량 제외)"""
+        row = self._row(ticker)
+        return float(row["balance"]) if row else 0.0
+
+    def locked(self, ticker="KRW"):
+        """주문 중 묶인 수량"""
+        row = self._row(ticker)
+        return float(row["locked"]) if row else 0.0
+
+    def avg_buy_price(self, ticker):
+        """매수평균가 (upbit.get_avg_buy_price와 동일)"""
+        row = self._row(ticker)
+        return float(row["avg_buy_price"]) if row else 0.0
+
+    def invalidate(self):
+        """주문 접수/체결 후 호출: 다음 조회 때 다시 받아옴"""
+        with self._state_lock:
+            self._generation += 1
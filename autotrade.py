@@ -3,11 +3,8 @@ from dotenv import load_dotenv
 import json
 import pyupbit
 import pandas as pd
-import ta
 from datetime import datetime, timedelta
-from openai import OpenAI
 import time
-import requests
 import base64
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
@@ -22,10 +19,31 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
 from PIL import Image
 import io
-from youtube_transcript_api import YouTubeTranscriptApi
 
 
 import sqlite3  # SQLite 추가
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Optional
+from chart_worker import get_chart_worker
+from chart_renderer import render_indicator_chart
+from candle_store import CandleStore
+from indicators import add_indicators
+from strategy_digest import StrategyDigest
+from llm_gateway import get_llm_gateway
+from http_client import get_http_client, install_pyupbit
+from account_snapshot import AccountSnapshot
+from order_executor import OrderExecutor
+from market_feed import get_market_feed
+from triggers import TriggerEngine
+from tracing import get_tracer
+import cycle_archive
+import change_notify
+import trade_rules
+import migrations
+from prompt_encoder import PromptBuilder, encode_table, encode_rows, print_report
 
 
 
@@ -108,168 +126,422 @@ def create_driver():
 # DatabaseManager 클래스 수정
 class DatabaseManager:
     def __init__(self, db_path="trading.db"):
-        self.conn = sqlite3.connect(db_path)
+        # 포트폴리오 실행 시 여러 티커 스레드가 하나의 연결을 공유
+        # WAL 모드라 서버/대시보드가 읽는 동안에도 기록이 막히지 않음
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        migrations.configure(self.conn)
+        self.lock = threading.Lock()
         self.setup_database()
        
     def setup_database(self):
-        cursor = self.conn.cursor()
-        # 기존 거래 기록 테이블
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS trading_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp DATETIME NOT NULL,
-                decision TEXT NOT NULL,
-                percentage REAL NOT NULL,
-                reason TEXT NOT NULL,
-                btc_balance REAL NOT NULL,
-                krw_balance REAL NOT NULL,
-                btc_avg_buy_price REAL NOT NULL,
-                btc_krw_price REAL NOT NULL
-            )
-        """)
-       
-        # 거래 반성 일기 테이블 추가
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS trading_reflection (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                trading_id INTEGER NOT NULL,
-                reflection_date DATETIME NOT NULL,
-                market_condition TEXT NOT NULL,
-                decision_analysis TEXT NOT NULL,
-                improvement_points TEXT NOT NULL,
-                success_rate REAL NOT NULL,
-                learning_points TEXT NOT NULL,
-                FOREIGN KEY (trading_id) REFERENCES trading_history(id)
-            )
-        """)
-        self.conn.commit()
+        """스키마를 최신 버전으로 (migrations.MIGRATIONS, PRAGMA user_version)"""
+        with self.lock:
+            migrations.migrate(self.conn)
 
 
-    def get_recent_trades(self, limit=10):
+    def get_recent_trades(self, limit=10, ticker=None):
         """최근 거래 내역 조회"""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            SELECT * FROM trading_history
-            ORDER BY timestamp DESC
-            LIMIT ?
-        """, (limit,))
-        return cursor.fetchall()
-
-
-    def get_reflection_history(self, limit=10):
+        return self.get_recent_trades_table(limit, ticker)[1]
+
+
+    def get_recent_trades_table(self, limit=10, ticker=None):
+        """최근 거래 내역 조회 (컬럼명 목록, 행 목록). ticker 지정 시 해당 티커만"""
+        with self.lock:
+            cursor = self.conn.cursor()
+            cursor.execute("""
+                SELECT id, timestamp, ticker, decision, percentage, reason,
+                       btc_balance, krw_balance, btc_avg_buy_price, btc_krw_price
+                FROM trading_history
+                WHERE ? IS NULL OR ticker = ?
+                ORDER BY timestamp_ms DESC
+                LIMIT ?
+            """, (ticker, ticker, limit))
+            rows = cursor.fetchall()
+            return [d[0] for d in cursor.description], rows
+
+
+    def get_reflection_history(self, limit=10, ticker=None):
         """최근 반성 일기 조회"""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            SELECT r.*, h.decision, h.percentage, h.btc_krw_price
-            FROM trading_reflection r
-            JOIN trading_history h ON r.trading_id = h.id
-            ORDER BY r.reflection_date DESC
-            LIMIT ?
-        """, (limit,))
-        return cursor.fetchall()
+        return self.get_reflection_table(limit, ticker)[1]
+
+
+    def get_reflection_table(self, limit=10, ticker=None):
+        """최근 반성 일기 조회 (컬럼명 목록, 행 목록). ticker 지정 시 해당 티커만"""
+        with self.lock:
+            cursor = self.conn.cursor()
+            cursor.execute("""
+                SELECT r.id, r.trading_id, r.reflection_date, r.market_condition, r.decision_analysis,
+                       r.improvement_points, r.success_rate, r.learning_points,
+                       h.ticker, h.decision, h.percentage, h.btc_krw_price
+                FROM trading_reflection r
+                JOIN trading_history h ON r.trading_id = h.id
+                WHERE ? IS NULL OR h.ticker = ?
+                ORDER BY r.reflection_date_ms DESC
+                LIMIT ?
+            """, (ticker, ticker, limit))
+            rows = cursor.fetchall()
+            return [d[0] for d in cursor.description], rows
 
 
     def add_reflection(self, reflection_data):
         """반성 일기 추가"""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            INSERT INTO trading_reflection (
-                trading_id, reflection_date, market_condition,
-                decision_analysis, improvement_points, success_rate,
-                learning_points
-            ) VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (
-            reflection_data['trading_id'],
-            reflection_data['reflection_date'],
-            reflection_data['market_condition'],
-            reflection_data['decision_analysis'],
-            reflection_data['improvement_points'],
-            reflection_data['success_rate'],
-            reflection_data['learning_points']
-        ))
-        self.conn.commit()
+        with get_tracer().span("db.add_reflection"), self.lock:
+            cursor = self.conn.cursor()
+            cursor.execute("""
+                INSERT INTO trading_reflection (
+                    trading_id, reflection_date, reflection_date_ms, market_condition,
+                    decision_analysis, improvement_points, success_rate,
+                    learning_points
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                reflection_data['trading_id'],
+                reflection_data['reflection_date'],
+                int(reflection_data['reflection_date'].timestamp() * 1000),
+                reflection_data['market_condition'],
+                reflection_data['decision_analysis'],
+                reflection_data['improvement_points'],
+                reflection_data['success_rate'],
+                reflection_data['learning_points']
+            ))
+            self.conn.commit()
+        change_notify.notify("trading_reflection")  # 서버 watcher가 폴링 전에 바로 전송
 
 
     def record_trade(self, trade_data):
         """거래 데이터를 데이터베이스에 기록"""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            INSERT INTO trading_history (
-                timestamp, decision, percentage, reason,
-                btc_balance, krw_balance, btc_avg_buy_price, btc_krw_price
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            datetime.now(),
-            trade_data['decision'],
-            trade_data['percentage'],
-            trade_data['reason'],
-            trade_data['btc_balance'],
-            trade_data['krw_balance'],
-            trade_data['btc_avg_buy_price'],
-            trade_data['btc_krw_price']
-        ))
-        self.conn.commit()
+        with get_tracer().span("db.record_trade"), self.lock:
+            cursor = self.conn.cursor()
+            now = datetime.now()
+            cursor.execute("""
+                INSERT INTO trading_history (
+                    timestamp, timestamp_ms, ticker, decision, percentage, reason,
+                    btc_balance, krw_balance, btc_avg_buy_price, btc_krw_price
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                now,
+                int(now.timestamp() * 1000),
+                trade_data.get('ticker', 'KRW-BTC'),
+                trade_data['decision'],
+                trade_data['percentage'],
+                trade_data['reason'],
+                trade_data['btc_balance'],
+                trade_data['krw_balance'],
+                trade_data['btc_avg_buy_price'],
+                trade_data['btc_krw_price']
+            ))
+            self.conn.commit()
+        change_notify.notify("trading_history")
         return cursor.lastrowid  # 새로 삽입된 레코드의 ID 반환
 
 
+    def save_order_fill(self, ticket):
+        """주문 체결 기록 저장 (OrderTicket, 처음이면 삽입 후 ticket.fill_id 설정, 이후 갱신)"""
+        at = lambda ts: datetime.fromtimestamp(ts) if ts is not None else None
+        with self.lock:
+            # 체결 추적 스레드와 거래 id 연결이 겹쳐도 마지막 저장이 최신 상태가 되도록 락 안에서 읽음
+            latencies = ticket.latencies
+            values = (
+                ticket.trading_id, ticket.ticker, ticket.side, ticket.uuid, ticket.state,
+                ticket.requested, ticket.quote_price, ticket.executed_volume, ticket.executed_funds,
+                ticket.avg_price, ticket.paid_fee, ticket.slippage_bps,
+                at(ticket.decided_at), at(ticket.submitted_at), at(ticket.filled_at), ticket.fill_time_source,
+                latencies['decision_to_submit_ms'], latencies['submit_ack_ms'],
+                latencies['submit_to_fill_ms'], latencies['decision_to_fill_ms'],
+                ticket.error,
+            )
+            cursor = self.conn.cursor()
+            if ticket.fill_id is None:
+                cursor.execute("""
+                    INSERT INTO order_fills (
+                        trading_id, ticker, side, order_uuid, state,
+                        requested, quote_price, executed_volume, executed_funds,
+                        avg_price, paid_fee, slippage_bps,
+                        decided_at, submitted_at, filled_at, fill_time_source,
+                        decision_to_submit_ms, submit_ack_ms, submit_to_fill_ms, decision_to_fill_ms,
+                        error
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, values)
+                ticket.fill_id = cursor.lastrowid
+            else:
+                cursor.execute("""
+                    UPDATE order_fills SET
+                        trading_id = ?, ticker = ?, side = ?, order_uuid = ?, state = ?,
+                        requested = ?, quote_price = ?, executed_volume = ?, executed_funds = ?,
+                        avg_price = ?, paid_fee = ?, slippage_bps = ?,
+                        decided_at = ?, submitted_at = ?, filled_at = ?, fill_time_source = ?,
+                        decision_to_submit_ms = ?, submit_ack_ms = ?, submit_to_fill_ms = ?, decision_to_fill_ms = ?,
+                        error = ?
+                    WHERE id = ?
+                """, values + (ticket.fill_id,))
+            self.conn.commit()
+
+
 
 
 
 
 class TradeManager:
     """거래 실행을 담당하는 클래스"""
-    def __init__(self, upbit_client, ticker="KRW-BTC"):
+    def __init__(self, upbit_client, ticker="KRW-BTC", account=None, feed=None, params=None, executor=None):
         self.upbit = upbit_client
         self.ticker = ticker
-        self.MIN_TRADE_AMOUNT = 5000
+        self.account = account or AccountSnapshot(upbit_client)
+        self.feed = feed  # MarketFeed (없거나 값이 오래됐으면 REST 조회)
+        self.executor = executor or OrderExecutor(upbit_client, account=self.account)  # 주문 제출/체결 추적
+        self.params = params or trade_rules.TradingParams.from_env()  # 매매 규칙 파라미터
+        self.MIN_TRADE_AMOUNT = trade_rules.MIN_TRADE_AMOUNT
+
 
+    def current_price(self):
+        """현재가 (실시간 피드 우선)"""
+        price = self.feed.price(self.ticker) if self.feed else None
+        return float(price or pyupbit.get_current_price(self.ticker))
 
-    def execute_market_buy(self, amount):
-        """시장가 매수 주문 실행"""
+
+    def execute_market_buy(self, amount, price=None, decided_at=None):
+        """시장가 매수 주문 실행 -> OrderTicket (체결은 백그라운드 추적)"""
         if amount >= self.MIN_TRADE_AMOUNT:
-            return self.upbit.buy_market_order(self.ticker, amount)
+            return self.executor.submit(self.ticker, "buy", amount, price, decided_at)
         return None
 
 
-    def execute_market_sell(self, amount):
-        """시장가 매도 주문 실행"""
-        current_price = float(pyupbit.get_current_price(self.ticker))
-        if amount * current_price >= self.MIN_TRADE_AMOUNT:
-            return self.upbit.sell_market_order(self.ticker, amount)
+    def execute_market_sell(self, amount, price=None, decided_at=None):
+        """시장가 매도 주문 실행 (price: 판단에 쓴 현재가, 없으면 조회)"""
+        price = price or self.current_price()
+        if amount * price >= self.MIN_TRADE_AMOUNT:
+            return self.executor.submit(self.ticker, "sell", amount, price, decided_at)
         return None
 
 
     def adjust_trade_ratio(self, base_ratio, fear_greed_value, trade_type):
         """공포탐욕지수에 따른 거래 비율 조정"""
-        trade_ratio = base_ratio / 100.0
-       
-        if trade_type == "buy":
-            if fear_greed_value <= 25:
-                trade_ratio = min(trade_ratio * 1.2, 1.0)
-            elif fear_greed_value >= 75:
-                trade_ratio = trade_ratio * 0.8
-        elif trade_type == "sell":
-            if fear_greed_value >= 75:
-                trade_ratio = min(trade_ratio * 1.2, 1.0)
-            elif fear_greed_value <= 25:
-                trade_ratio = trade_ratio * 0.8
-               
-        return trade_ratio
+        return trade_rules.adjust_trade_ratio(base_ratio, fear_greed_value, trade_type, self.params)
 
 
-    def get_current_balances(self):
-        """현재 잔고 상태 조회"""
+    def get_current_balances(self, price=None):
+        """현재 잔고 상태 조회 (price: 이미 조회한 현재가)"""
         return {
-            'btc_balance': float(self.upbit.get_balance(self.ticker)),
-            'krw_balance': float(self.upbit.get_balance("KRW")),
-            'btc_avg_buy_price': float(self.upbit.get_avg_buy_price(self.ticker)),
-            'btc_krw_price': float(pyupbit.get_current_price(self.ticker))
+            'btc_balance': self.account.balance(self.ticker),
+            'krw_balance': self.account.balance("KRW"),
+            'btc_avg_buy_price': self.account.avg_buy_price(self.ticker),
+            'btc_krw_price': price or self.current_price()
         }
 
 
 load_dotenv()
 
 
+# 차트 이미지 생성 방식
+#   selenium: 매 사이클 Chrome 새로 실행 (기본)
+#   worker:   상주 브라우저 워커 사용 (CHART_WORKER=true 와 동일)
+#   render:   OHLCV 데이터로 직접 렌더링 (브라우저 불필요)
+CHART_MODE = os.getenv('CHART_MODE', 'worker' if os.getenv('CHART_WORKER', 'false').lower() == 'true' else 'selenium').lower()
+USE_CHART_WORKER = CHART_MODE == 'worker'
+
+
+# 실시간 시세/호가 WebSocket 피드 사용 여부 (끊기거나 오래된 값은 REST로 대체)
+USE_MARKET_FEED = os.getenv('MARKET_FEED', 'false').lower() == 'true'
+
+
+# 이벤트 기반 사이클 트리거 (정각 사이클은 그대로 유지, 트리거 발생 시 추가 실행)
+USE_CYCLE_TRIGGERS = os.getenv('CYCLE_TRIGGERS', 'false').lower() == 'true'
+TRIGGER_POLL_SECONDS = float(os.getenv('TRIGGER_POLL_SECONDS', '10'))
+
+
+# 지표 계산용 캔들 조회 구간 (ma120 + 여유분)
+OHLCV_LOOKBACK = 200
+
+
+# LLM 프롬프트 토큰 예산 (0이면 제한 없음)
+PROMPT_TOKEN_BUDGET = int(os.getenv('PROMPT_TOKEN_BUDGET', '6000'))
+
+
+# 포트폴리오 실행 대상 티커 (쉼표 구분, 2개 이상이면 PortfolioRunner 사용)
+TRADING_TICKERS = [t.strip() for t in os.getenv('TRADING_TICKERS', 'KRW-BTC').split(',') if t.strip()]
+# 동시에 사이클을 진행하는 티커 수 (LLM 동시 호출은 LLM_MAX_CONCURRENCY로 별도 제한)
+PORTFOLIO_WORKERS = int(os.getenv('PORTFOLIO_WORKERS', '8'))
+
+
+# 데이터 소스별 타임아웃(초)
+SOURCE_TIMEOUTS = {
+    "current_status": 10,
+    "orderbook": 10,
+    "ohlcv": 20,
+    "fear_greed": 10,
+    "news": 15,
+    "chart_analysis": 90,
+    "youtube_analysis": 60,
+}
+
+
+def gather_sources(sources, default_timeout=30):
+    """독립 데이터 소스 동시 수집
+
+    sources: {이름: 호출 가능 객체 또는 (호출 가능 객체, 타임아웃 초)}
+    반환: (results, timings) - 타임아웃/실패한 소스의 결과는 None
+    """
+    jobs = {}
+    for name, spec in sources.items():
+        if isinstance(spec, tuple):
+            fn, timeout = spec
+        else:
+            fn, timeout = spec, SOURCE_TIMEOUTS.get(name, default_timeout)
+        jobs[name] = (fn, timeout)
+
+    def _timed(name, fn):
+        t0 = time.perf_counter()
+        with get_tracer().span(f"source.{name}") as span:
+            value = fn()
+            if value is None:
+                span.status = "empty"
+        return value, time.perf_counter() - t0, datetime.now()
+
+    results, timings = {}, {}
+    if not jobs:
+        return results, timings
+
+    executor = ThreadPoolExecutor(max_workers=len(jobs), thread_name_prefix="source")
+    started = time.perf_counter()
+    try:
+        # 소스 span이 호출한 쪽 span의 자식이 되도록 context를 복사해 실행
+        futures = {name: executor.submit(contextvars.copy_context().run, _timed, name, fn)
+                   for name, (fn, _) in jobs.items()}
+        # 시작 시각 기준 마감시간 순으로 기다려야 앞선 소스가 뒤 소스의 대기 시간을 잡아먹지 않음
+        for name in sorted(jobs, key=lambda n: jobs[n][1]):
+            timeout = jobs[name][1]
+            remaining = max(0.0, started + timeout - time.perf_counter())
+            try:
+                value, elapsed, finished_at = futures[name].result(timeout=remaining)
+                results[name] = value
+                timings[name] = {"elapsed": elapsed, "status": "ok" if value is not None else "empty",
+                                 "captured_at": finished_at}
+            except TimeoutError:
+                futures[name].cancel()
+                results[name] = None
+                timings[name] = {"elapsed": float(timeout), "status": "timeout"}
+            except Exception as e:
+                print(f"Error in gather_sources ({name}): {e}")
+                results[name] = None
+                timings[name] = {"elapsed": time.perf_counter() - started, "status": "error"}
+    finally:
+        # 타임아웃된 작업은 백그라운드에서 끝나도록 두고 기다리지 않음
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    total = time.perf_counter() - started
+    print("\n=== Data Source Timings ===")
+    for name, t in timings.items():
+        print(f"{name:<18} {t['elapsed']:7.2f}s  {t['status']}")
+    print(f"{'total (wall)':<18} {total:7.2f}s")
+    return results, timings
+
+
+# 업비트 차트(ChartIQ) 요소 경로
+CHART_BASE_XPATH = "/html/body/div[1]/div[2]/div[3]/div/section[1]/article[1]/div/span[2]/div/div"
+CHART_INTERVAL_BUTTON_XPATH = CHART_BASE_XPATH + "/div[1]/div[1]/div/cq-menu[1]/span/cq-clickable"
+CHART_HOUR_OPTION_XPATH = CHART_BASE_XPATH + "/div[1]/div[1]/div/cq-menu[1]/cq-menu-dropdown/cq-item[8]"
+CHART_CANVAS_XPATH = CHART_BASE_XPATH + "//canvas"
+
+
+def wait_for_chart_ready(driver, timeout=20, settle_timeout=3.0, poll=0.1):
+    """차트 렌더링 완료 대기 (고정 sleep 대신 준비 상태 확인)"""
+    WebDriverWait(driver, timeout).until(
+        lambda d: d.execute_script("return document.readyState") == "complete"
+    )
+    canvas = WebDriverWait(driver, timeout).until(
+        EC.presence_of_element_located((By.XPATH, CHART_CANVAS_XPATH))
+    )
+    # 캔버스 내용이 두 번 연속 같으면 그리기가 끝난 것으로 판단
+    deadline = time.monotonic() + settle_timeout
+    last = None
+    while time.monotonic() < deadline:
+        try:
+            current = driver.execute_script("return arguments[0].toDataURL().length", canvas)
+        except Exception:
+            break
+        if current == last:
+            break
+        last = current
+        time.sleep(poll)
+    return canvas
+
+
+def select_hour_interval(driver, timeout=20):
+    """차트 시간 단위를 1시간으로 설정"""
+    wait = WebDriverWait(driver, timeout)
+    try:
+        # 시간 설정 버튼 클릭
+        time_button = wait.until(EC.element_to_be_clickable((By.XPATH, CHART_INTERVAL_BUTTON_XPATH)))
+        time_button.click()
+
+        # 1시간 옵션 클릭
+        hour_option = wait.until(EC.element_to_be_clickable((By.XPATH, CHART_HOUR_OPTION_XPATH)))
+        hour_option.click()
+        wait.until(EC.invisibility_of_element_located((By.XPATH, CHART_HOUR_OPTION_XPATH)))
+        return True
+    except TimeoutException:
+        print("차트 시간 설정을 찾을 수 없습니다. 기본 설정으로 진행합니다.")
+        return False
+
+
+def load_chart_page(driver, url, timeout=20):
+    """차트 페이지 로딩 + 1시간 봉 선택 + 전체 높이로 창 크기 조정"""
+    driver.get(url)
+    wait_for_chart_ready(driver, timeout)
+    if select_hour_interval(driver, timeout):
+        wait_for_chart_ready(driver, timeout)
+
+    # 전체 페이지 높이 구하기
+    total_height = driver.execute_script("return document.body.scrollHeight")
+    driver.set_window_size(1920, total_height)
+    wait_for_chart_ready(driver, timeout)
+
+
+def grab_chart_png(driver):
+    """현재 페이지 스크린샷을 최적화된 PNG 바이트로 반환"""
+    png = driver.get_screenshot_as_png()
+
+    # PIL Image로 변환 및 최적화
+    img = Image.open(io.BytesIO(png))
+    img.thumbnail((2000, 2000))
+    buf = io.BytesIO()
+    img.save(buf, format="PNG", optimize=True)
+    return buf.getvalue()
+
+
+@dataclass(frozen=True)
+class MarketSnapshot:
+    """한 사이클 동안 공유하는 시장 상태 (한 번만 수집, 모든 소비자가 같은 값을 읽음)
+
+    소비자는 내부 dict/DataFrame을 수정하지 않는다.
+    captured_at: 필드명 -> 수집 완료 시각
+    """
+    ticker: str
+    status: Optional[dict]                # 잔고/평가 (get_current_status)
+    price: Optional[float]
+    orderbook: Optional[dict]
+    daily: Optional[pd.DataFrame]         # 지표 포함 일봉
+    hourly: Optional[pd.DataFrame]        # 지표 포함 1시간봉
+    ohlcv: Optional[dict]                 # 프롬프트용 인코딩 + latest_indicators
+    fear_greed: Optional[dict]
+    news: Optional[list]
+    captured_at: dict = field(default_factory=dict)
+
+    @property
+    def indicators(self):
+        return (self.ohlcv or {}).get("latest_indicators")
+
+    @property
+    def fear_greed_value(self):
+        return self.fear_greed['current']['value'] if self.fear_greed else None
+
+    def is_complete(self):
+        """매매 판단에 필요한 필드가 모두 수집됐는지"""
+        return all([self.status, self.orderbook, self.ohlcv, self.fear_greed, self.news])
+
+
+def chart_url(ticker):
+    """업비트 차트 페이지 URL"""
+    return f"https://upbit.com/exchange?code=CRIX.UPBIT.{ticker}"
 
 
 def capture_full_page(url, output_path):
@@ -277,37 +549,11 @@ def capture_full_page(url, output_path):
     driver = None
     try:
         driver = create_driver()
-        wait = WebDriverWait(driver, 20)
-       
-        driver.get(url)
-        time.sleep(5)  # 초기 로딩 대기
-       
-        try:
-            # 시간 설정 버튼 클릭
-            time_button = wait.until(EC.element_to_be_clickable((By.XPATH,
-                "/html/body/div[1]/div[2]/div[3]/div/section[1]/article[1]/div/span[2]/div/div/div[1]/div[1]/div/cq-menu[1]/span/cq-clickable")))
-            time_button.click()
-            time.sleep(1)
-           
-            # 1시간 옵션 클릭
-            hour_option = wait.until(EC.element_to_be_clickable((By.XPATH,
-                "/html/body/div[1]/div[2]/div[3]/div/section[1]/article[1]/div/span[2]/div/div/div[1]/div[1]/div/cq-menu[1]/cq-menu-dropdown/cq-item[8]")))
-            hour_option.click()
-            time.sleep(3)
-        except TimeoutException:
-            print("차트 시간 설정을 찾을 수 없습니다. 기본 설정으로 진행합니다.")
-       
-        # 전체 페이지 높이 구하기
-        total_height = driver.execute_script("return document.body.scrollHeight")
-        driver.set_window_size(1920, total_height)
-       
+        load_chart_page(driver, url)
+
         # 스크린샷 캡처
-        png = driver.get_screenshot_as_png()
-       
-        # PIL Image로 변환 및 최적화
-        img = Image.open(io.BytesIO(png))
-        img.thumbnail((2000, 2000))
-        img.save(output_path, optimize=True, quality=85)
+        with open(output_path, "wb") as f:
+            f.write(grab_chart_png(driver))
         print(f"차트 이미지 저장 완료: {output_path}")
         return True
        
@@ -327,52 +573,69 @@ def capture_full_page(url, output_path):
 
 
 class EnhancedCryptoTrader:
-    def __init__(self, ticker="KRW-BTC"):
+    def __init__(self, ticker="KRW-BTC", db=None, candles=None, strategy_digest=None, account=None, feed=None,
+                 upbit=None, llm=None):
+        """db/candles/strategy_digest/account/feed를 넘기면 여러 티커 트레이더가 공유 (PortfolioRunner)
+
+        upbit/llm: 주문 클라이언트와 LLM 게이트웨이 교체용 (cycle_archive 재실행)
+        """
         self.ticker = ticker
         self.access = os.getenv('UPBIT_ACCESS_KEY')
         self.secret = os.getenv('UPBIT_SECRET_KEY')
-        self.upbit = pyupbit.Upbit(self.access, self.secret)
+        self.http = get_http_client()
+        install_pyupbit(self.http)  # pyupbit 호출도 공용 커넥션 풀/속도 제한 사용
+        self.upbit = upbit or pyupbit.Upbit(self.access, self.secret)
+        self.account = account or AccountSnapshot(self.upbit)  # 잔고 조회는 /accounts 1회로 처리
 
 
         # 하위 매니저 클래스들 초기화
-        self.trade_manager = TradeManager(self.upbit, ticker)
-        self.db = DatabaseManager()
+        self.feed = feed  # 실시간 시세/호가 (MARKET_FEED=true)
+        self.db = db or DatabaseManager()
+        self.executor = OrderExecutor(self.upbit, self.db, self.account)  # 체결 결과는 order_fills에 기록
+        self.trade_manager = TradeManager(self.upbit, ticker, self.account, feed, executor=self.executor)
+        self.params = self.trade_manager.params
+        self.candles = candles or CandleStore()
 
 
         # 기타 설정
-        self.client = OpenAI()
+        self.llm = llm or get_llm_gateway()  # LLM_BACKEND=stub 이면 네트워크 없이 스텁 응답
         self.serpapi_key = os.getenv('SERPAPI_KEY')
         self.fear_greed_api = "https://api.alternative.me/fng/"
         self.youtube_channels = ["3XbtEX3jUv4"]
+        self.strategy_digest = strategy_digest or StrategyDigest(self.analyze_strategy_text, self.youtube_channels, model="gpt-4o-mini")
 
 
 
 
-    def analyze_past_decisions(self):
+    def analyze_past_decisions(self, snapshot):
         """과거 거래 분석 및 반성"""
         print("analyze_past_decisions")
         try:
             # 최근 거래 내역 조회
-            recent_trades = self.db.get_recent_trades(10)
-            recent_reflections = self.db.get_reflection_history(5)
+            trade_columns, recent_trades = self.db.get_recent_trades_table(10, self.ticker)
+            if not recent_trades:
+                print(f"{self.ticker}: 거래 기록이 없어 반성 생략")
+                return None
+            reflection_columns, recent_reflections = self.db.get_reflection_table(5, self.ticker)
            
-            # 현재 시장 상태 조회
+            # 현재 시장 상태 (사이클 스냅샷 재사용)
             current_market = {
-                "price": float(pyupbit.get_current_price(self.ticker)),
-                "status": self.get_current_status(),
-                "fear_greed": self.get_fear_greed_index(),
-                "technical": self.get_ohlcv_data()
+                "price": snapshot.price,
+                "status": snapshot.status,
+                "fear_greed": snapshot.fear_greed,
+                "technical": snapshot.ohlcv
             }
-            print("1")
             # AI에 분석 요청
-            reflection_prompt = {
-                "recent_trades": recent_trades,
-                "recent_reflections": recent_reflections,
-                "current_market": current_market
-            }
+            reflection_prompt, report = (PromptBuilder(PROMPT_TOKEN_BUDGET)
+                .add("current_market", current_market, 100)
+                .add("recent_trades", encode_rows(recent_trades, trade_columns), 80)
+                .add("recent_reflections", encode_rows(recent_reflections, reflection_columns, drop=("id", "trading_id")), 60)
+                .build())
+            print_report(report, "Reflection Prompt Tokens")
 
 
-            response = self.client.chat.completions.create(
+            response = self.llm.chat(
+                "reflection",
                 model="gpt-4o-mini",
                 messages=[
                      {
@@ -388,14 +651,13 @@ class EnhancedCryptoTrader:
                     },
                     {
                         "role": "user",
-                        "content": f"Analyze these trading records and market conditions and provide response in JSON format:\n{json.dumps(reflection_prompt, indent=2)}"
+                        "content": f"Analyze these trading records and market conditions and provide response in JSON format:\n{reflection_prompt}"
                     }
                 ],
                 response_format={
                     "type": "json_object"
                 }
             )
-            print("2")
             reflection = json.loads(response.choices[0].message.content)
            
             # 반성 일기 저장
@@ -408,7 +670,6 @@ class EnhancedCryptoTrader:
                 'success_rate': reflection['success_rate'],
                 'learning_points': reflection['learning_points']
             }
-            print("3")
                
             print("\n=== Reflection Data ===")
             print(json.dumps(reflection_data, indent=2, default=str))  # datetime 객체를 위해 default=str 추가
@@ -433,7 +694,7 @@ class EnhancedCryptoTrader:
     def get_fear_greed_index(self, limit=7):
         """공포탐욕지수 데이터 조회"""
         try:
-            response = requests.get(f"{self.fear_greed_api}?limit={limit}")
+            response = self.http.get(self.fear_greed_api, params={"limit": limit})
             if response.status_code == 200:
                 data = response.json()
                
@@ -476,35 +737,9 @@ class EnhancedCryptoTrader:
 
 
     def add_technical_indicators(self, df):
-        """기술적 분석 지표 추가"""
-        # 볼린저 밴드
-        indicator_bb = ta.volatility.BollingerBands(close=df['close'])
-        df['bb_high'] = indicator_bb.bollinger_hband()
-        df['bb_mid'] = indicator_bb.bollinger_mavg()
-        df['bb_low'] = indicator_bb.bollinger_lband()
-        df['bb_pband'] = indicator_bb.bollinger_pband()
-       
-        # RSI
-        df['rsi'] = ta.momentum.RSIIndicator(close=df['close']).rsi()
-       
-        # MACD
-        macd = ta.trend.MACD(close=df['close'])
-        df['macd'] = macd.macd()
-        df['macd_signal'] = macd.macd_signal()
-        df['macd_diff'] = macd.macd_diff()
-       
-        # 이동평균선
-        df['ma5'] = ta.trend.SMAIndicator(close=df['close'], window=5).sma_indicator()
-        df['ma20'] = ta.trend.SMAIndicator(close=df['close'], window=20).sma_indicator()
-        df['ma60'] = ta.trend.SMAIndicator(close=df['close'], window=60).sma_indicator()
-        df['ma120'] = ta.trend.SMAIndicator(close=df['close'], window=120).sma_indicator()
-       
-        # ATR
-        df['atr'] = ta.volatility.AverageTrueRange(
-            high=df['high'], low=df['low'], close=df['close']
-        ).average_true_range()
-       
-        return df
+        """기술적 분석 지표 추가 (볼린저 밴드, RSI, MACD, 이동평균선, ATR)"""
+        # ta 라이브러리와 같은 결과를 내는 NumPy 벡터화 계산 (indicators.compare_with_ta로 검증)
+        return add_indicators(df)
 
 
 
@@ -513,13 +748,13 @@ class EnhancedCryptoTrader:
 
 
 
-    def get_current_status(self):
-        """현재 투자 상태 조회"""
+    def get_current_status(self, current_price=None):
+        """현재 투자 상태 조회 (current_price: 일괄 조회한 현재가)"""
         try:
-            krw_balance = float(self.upbit.get_balance("KRW"))
-            crypto_balance = float(self.upbit.get_balance(self.ticker))
-            avg_buy_price = float(self.upbit.get_avg_buy_price(self.ticker))
-            current_price = float(pyupbit.get_current_price(self.ticker))
+            krw_balance = self.account.balance("KRW")
+            crypto_balance = self.account.balance(self.ticker)
+            avg_buy_price = self.account.avg_buy_price(self.ticker)
+            current_price = float(current_price or self.trade_manager.current_price())
            
             print("\n=== Current Investment Status ===")
             print(f"보유 현금: {krw_balance:,.0f} KRW")
@@ -553,10 +788,13 @@ class EnhancedCryptoTrader:
 
 
 
-    def get_orderbook_data(self):
-        """호가 데이터 조회"""
+    def get_orderbook_data(self, orderbook=None):
+        """호가 데이터 조회 (orderbook: 일괄 조회한 원본 호가)"""
         try:
-            orderbook = pyupbit.get_orderbook(ticker=self.ticker)
+            if orderbook is None and self.feed:
+                book = self.feed.book(self.ticker)
+                orderbook = book.as_orderbook() if book else None
+            orderbook = orderbook or pyupbit.get_orderbook(ticker=self.ticker)
             if not orderbook or len(orderbook) == 0:
                 return None
                
@@ -591,35 +829,37 @@ class EnhancedCryptoTrader:
 
 
 
+    def get_indicator_frame(self, interval, count=OHLCV_LOOKBACK):
+        """OHLCV 조회(로컬 캔들 저장소) + 기술적 지표 추가"""
+        df = self.candles.get(self.ticker, interval, count)
+        return self.add_technical_indicators(df)
+
+
     def get_ohlcv_data(self):
         """차트 데이터 수집 및 기술적 분석"""
         try:
-            daily_data = pyupbit.get_ohlcv(self.ticker, interval="day", count=30)
-            daily_data = self.add_technical_indicators(daily_data)
-           
-            hourly_data = pyupbit.get_ohlcv(self.ticker, interval="minute60", count=24)
-            hourly_data = self.add_technical_indicators(hourly_data)
-           
-            daily_data_dict = []
-            for index, row in daily_data.iterrows():
-                day_data = row.to_dict()
-                day_data['date'] = index.strftime('%Y-%m-%d')
-                daily_data_dict.append(day_data)
-               
-            hourly_data_dict = []
-            for index, row in hourly_data.iterrows():
-                hour_data = row.to_dict()
-                hour_data['date'] = index.strftime('%Y-%m-%d %H:%M:%S')
-                hourly_data_dict.append(hour_data)
+            # ma120까지 계산되도록 충분한 구간을 로컬 저장소에서 조회
+            daily_data = self.get_indicator_frame("day")
            
+            hourly_data = self.get_indicator_frame("minute60")
+            return self.summarize_ohlcv(daily_data, hourly_data)
+        except Exception as e:
+            print(f"Error in get_ohlcv_data: {e}")
+            return None
+
+
+    def summarize_ohlcv(self, daily_data, hourly_data):
+        """지표 포함 일봉/시간봉 -> 프롬프트용 요약"""
+        try:
             print("\n=== Latest Technical Indicators ===")
             print(f"RSI: {daily_data['rsi'].iloc[-1]:.2f}")
             print(f"MACD: {daily_data['macd'].iloc[-1]:.2f}")
             print(f"BB Position: {daily_data['bb_pband'].iloc[-1]:.2f}")
            
+            # 컬럼 단위 양자화 인코딩 (행별 dict 생성 없음)
             return {
-                "daily_data": daily_data_dict[-7:],
-                "hourly_data": hourly_data_dict[-6:],
+                "daily_data": encode_table(daily_data.tail(7), "%Y-%m-%d"),
+                "hourly_data": encode_table(hourly_data.tail(6), "%Y-%m-%d %H:%M"),
                 "latest_indicators": {
                     "rsi": daily_data['rsi'].iloc[-1],
                     "macd": daily_data['macd'].iloc[-1],
@@ -628,27 +868,94 @@ class EnhancedCryptoTrader:
                 }
             }
         except Exception as e:
-            print(f"Error in get_ohlcv_data: {e}")
+            print(f"Error in summarize_ohlcv: {e}")
             return None
-    def capture_and_analyze_chart(self):
+
+
+    def build_market_snapshot(self, prefetched=None):
+        """사이클 시작 시 모든 시장 데이터를 한 번에 동시 수집
+
+        prefetched: 여러 티커가 함께 쓰는 값 (PortfolioRunner가 한 번만 조회)
+            price / orderbook: 일괄 조회한 현재가, 원본 호가
+            fear_greed / news: 티커와 무관한 소스 (있으면 다시 조회하지 않음)
+            captured_at: 위 값들의 수집 시각
+        """
+        prefetched = prefetched or {}
+        shared = {name: prefetched[name] for name in ("fear_greed", "news") if name in prefetched}
+        sources = {
+            "status": (lambda: self.get_current_status(prefetched.get("price")), SOURCE_TIMEOUTS["current_status"]),
+            "orderbook": lambda: self.get_orderbook_data(prefetched.get("orderbook")),
+            "daily": (lambda: self.get_indicator_frame("day"), SOURCE_TIMEOUTS["ohlcv"]),
+            "hourly": (lambda: self.get_indicator_frame("minute60"), SOURCE_TIMEOUTS["ohlcv"]),
+            "fear_greed": self.get_fear_greed_index,
+            "news": self.get_crypto_news,
+        }
+        sources, timings = gather_sources({name: job for name, job in sources.items() if name not in shared})
+        sources.update(shared)
+        captured_at = {name: t["captured_at"] for name, t in timings.items() if "captured_at" in t}
+        captured_at.update({name: at for name, at in prefetched.get("captured_at", {}).items() if name in shared})
+
+        daily, hourly = sources["daily"], sources["hourly"]
+        ohlcv = self.summarize_ohlcv(daily, hourly) if daily is not None and hourly is not None else None
+        if ohlcv is not None:
+            captured_at["ohlcv"] = max(captured_at["daily"], captured_at["hourly"])
+
+        status = sources["status"]
+        price = status["current_price"] if status else None
+        if status:
+            captured_at["price"] = captured_at["status"]
+
+        return MarketSnapshot(
+            ticker=self.ticker,
+            status=status,
+            price=price,
+            orderbook=sources["orderbook"],
+            daily=daily,
+            hourly=hourly,
+            ohlcv=ohlcv,
+            fear_greed=sources["fear_greed"],
+            news=sources["news"],
+            captured_at=captured_at,
+        )
+
+
+    def capture_and_analyze_chart(self, hourly=None):
         """차트 캡처 및 분석"""
+        screenshot_path = None
         try:
-            current_time = datetime.now().strftime("%Y%m%d_%H%M%S")
-            screenshot_path = f"chart_{current_time}.png"
-           
-            url = f"https://upbit.com/exchange?code=CRIX.UPBIT.{self.ticker}"
-            capture_success = capture_full_page(url, screenshot_path)
-           
-            if not capture_success:
-                return None
-           
+            url = chart_url(self.ticker)
+            with get_tracer().span("chart.capture", mode=CHART_MODE):
+                if CHART_MODE == 'render':
+                    # 브라우저 없이 1시간 봉 데이터로 직접 렌더링
+                    if hourly is None:
+                        hourly = self.get_indicator_frame("minute60")
+                    if hourly is None or hourly.empty:
+                        return None
+                    png = render_indicator_chart(hourly, title=f"{self.ticker} 1H")
+                elif USE_CHART_WORKER:
+                    # 상주 브라우저 워커에서 바로 PNG 바이트 수신
+                    png = get_chart_worker(url).capture()
+                    if png is None:
+                        return None
+                else:
+                    current_time = datetime.now().strftime("%Y%m%d_%H%M%S")
+                    screenshot_path = f"chart_{current_time}.png"
+                    capture_success = capture_full_page(url, screenshot_path)
+
+                    if not capture_success:
+                        return None
+
+                    with open(screenshot_path, "rb") as image_file:
+                        png = image_file.read()
+
             # 이미지를 base64로 인코딩
-            with open(screenshot_path, "rb") as image_file:
-                base64_image = base64.b64encode(image_file.read()).decode("utf-8")
+            base64_image = base64.b64encode(png).decode("utf-8")
            
-            # OpenAI Vision API 호출
-            response = self.client.chat.completions.create(
+            # OpenAI Vision API 호출 (이미지는 매번 달라 캐시하지 않음)
+            response = self.llm.chat(
+                "chart_vision",
                 model="gpt-4o-mini",
+                use_cache=False,
                 messages=[
                         {
                             "role": "user",
@@ -673,13 +980,14 @@ class EnhancedCryptoTrader:
             analysis_result = response.choices[0].message.content
            
             # 임시 파일 삭제
-            os.remove(screenshot_path)
+            if screenshot_path:
+                os.remove(screenshot_path)
            
             return analysis_result
            
         except Exception as e:
             print(f"Error in capture_and_analyze_chart: {e}")
-            if os.path.exists(screenshot_path):
+            if screenshot_path and os.path.exists(screenshot_path):
                 os.remove(screenshot_path)
             return None
 
@@ -702,7 +1010,7 @@ class EnhancedCryptoTrader:
                 "hl": "en"
             }
            
-            response = requests.get(base_url, params=params)
+            response = self.http.get(base_url, params=params)
             if response.status_code == 200:
                 news_data = response.json()
                
@@ -745,40 +1053,17 @@ class EnhancedCryptoTrader:
 
 
     def get_youtube_analysis(self):
-        """유튜브 영상 자막 분석"""
+        """유튜브 영상 자막 분석 (strategy.txt가 바뀔 때만 재계산)"""
         try:
-            with open('strategy.txt', 'r', encoding='utf-8') as f:
-                content = f.read()
-            # all_transcripts = []
-       
-            # for video_id in self.youtube_channels:
-            #     try:
-            #         # 한국어 자막 가져오기 시도
-            #         transcript = YouTubeTranscriptApi.get_transcript(video_id, languages=['ko'])
-            #         text = ' '.join([entry['text'] for entry in transcript])
-                   
-            #         all_transcripts.append({
-            #             'video_id': video_id,
-            #             'content': text
-            #         })
-                       
-            #     except Exception as e:
-            #         print(f"Error processing transcript for video {video_id}: {e}")
-            #         # 사용 가능한 자막 목록 출력
-            #         try:
-            #             available_transcripts = YouTubeTranscriptApi.list_transcripts(video_id)
-            #             print(f"Available transcripts for {video_id}:")
-            #             for transcript in available_transcripts:
-            #                 print(f"- {transcript.language_code}")
-            #         except Exception as e:
-            #             print(f"Could not list available transcripts: {e}")
-            #         continue
-           
-           
-            # if not all_transcripts:
-            #     return None
+            return self.strategy_digest.get()
+        except Exception as e:
+            print(f"Error in get_youtube_analysis: {e}")
+            return None
 
 
+    def analyze_strategy_text(self, content):
+        """strategy.txt 자막 전체를 LLM으로 분석"""
+        try:
             # 한국어 분석을 위한 시스템 메시지
             system_message = """You are an expert cryptocurrency trading analyst.
     Analyze Korean YouTube content related to cryptocurrency trading and provide insights.
@@ -818,7 +1103,8 @@ class EnhancedCryptoTrader:
     Provide analysis in JSON format with confidence scores."""
 
 
-            response = self.client.chat.completions.create(
+            response = self.llm.chat(
+                "strategy",
                 model="gpt-4o-mini",
                 messages=[
                     {"role": "system", "content": system_message},
@@ -838,40 +1124,52 @@ class EnhancedCryptoTrader:
 
 
         except Exception as e:
-            print(f"Error in get_youtube_analysis: {e}")
+            print(f"Error in analyze_strategy_text: {e}")
             return None
 
 
-    def get_ai_analysis(self, analysis_data):
+    def get_ai_analysis(self, snapshot):
         """AI 분석 및 매매 신호 생성 (Structured Outputs 적용)"""
         try:
-            # 차트 이미지 분석 수행
-            chart_analysis = self.capture_and_analyze_chart()
-            # 유튜브 분석 수행
-            youtube_analysis = self.get_youtube_analysis()
+            # 차트 이미지 분석 / 유튜브 분석 동시 수행
+            results, _ = gather_sources({
+                "chart_analysis": lambda: self.capture_and_analyze_chart(snapshot.hourly),
+                "youtube_analysis": self.get_youtube_analysis,
+            })
+            chart_analysis = results["chart_analysis"]
+            youtube_analysis = results["youtube_analysis"]
            
             # 과거 반성 일기 분석 추가
-            past_reflections = self.db.get_reflection_history(5)
+            reflection_columns, past_reflections = self.db.get_reflection_table(5, self.ticker)
            
-            # 분석 데이터 최적화
-            optimized_data = {
-                "current_status": analysis_data["current_status"],
-                "orderbook": analysis_data["orderbook"],
-                "ohlcv": analysis_data["ohlcv"],
-                "fear_greed": analysis_data["fear_greed"],
-                "news": analysis_data["news"],
+            # 분석 데이터 최적화 (priority가 낮은 섹션부터 토큰 예산에 맞춰 축소)
+            prompt = (PromptBuilder(PROMPT_TOKEN_BUDGET)
+                .add("current_status", snapshot.status, 100)
+                .add("ohlcv", snapshot.ohlcv, 90)
+                .add("fear_greed", snapshot.fear_greed, 80)
+                .add("chart_analysis", chart_analysis, 70)
+                .add("orderbook", snapshot.orderbook, 60)
+                .add("youtube_analysis", youtube_analysis, 50)
+                .add("news", snapshot.news, 40)
+                .add("past_reflections", encode_rows(past_reflections, reflection_columns, drop=("id", "trading_id")), 30))
+            market_data, report = prompt.build()
+            print_report(report, "Decision Prompt Tokens")
+            cycle_archive.record(analysis={
                 "chart_analysis": chart_analysis,
                 "youtube_analysis": youtube_analysis,
-                "past_reflections": past_reflections  # 반성 일기 데이터 추가
-            }
+                "past_reflections": {"columns": reflection_columns, "rows": past_reflections},
+                "market_data": market_data,
+                "prompt_report": report,
+            })
 
 
-            response = self.client.chat.completions.create(
+            response = self.llm.chat(
+                "decision",
                 model="gpt-5-mini",
                 messages=[
                     {
                         "role": "system",
-                        "content": """
+                        "content": f"""
                                 You are a cryptocurrency trading analyst. 
                                 Analyze the provided market data and generate a trading decision. 
 
@@ -879,14 +1177,14 @@ class EnhancedCryptoTrader:
                                 1. Even if the amount is small compared to the Bitcoin price, you should still proceed with the buy decision as long as it is 5000 KRW or more (since trading platform allows minimum market buy orders starting from 5000 KRW).  
                                 2. If the decision is 'buy' or 'sell', you must ensure that the order amount is at least 5000 KRW.  
                                 3. If the calculated buy or sell amount is less than 5000 KRW, change the decision to 'hold'.  
-                                4. If your confidence_score is less than 70, set the decision to 'hold'.
+                                4. If your confidence_score is less than {self.params.min_confidence:g}, set the decision to 'hold'.
                                 5. When buying, the available amount must be limited to 99% or less of the balance.
 
                                     """
                     },
                     {
                         "role": "user",
-                        "content": f"Market Data Analysis:\n{json.dumps(optimized_data, indent=2)}"
+                        "content": f"Market Data Analysis:\n{market_data}"
                     }
                 ],
                 response_format={
@@ -936,7 +1234,14 @@ class EnhancedCryptoTrader:
             )
 
 
-            # 응답 파싱
+            # 응답 파싱 (원본 응답은 파싱 전에 보관)
+            usage = getattr(response, "usage", None)
+            cycle_archive.record(response={
+                "model": getattr(response, "model", None),
+                "content": response.choices[0].message.content,
+                "prompt_tokens": getattr(usage, "prompt_tokens", None),
+                "completion_tokens": getattr(usage, "completion_tokens", None),
+            })
             result = json.loads(response.choices[0].message.content)
            
          
@@ -953,47 +1258,73 @@ class EnhancedCryptoTrader:
 
 
 
-    def execute_trade(self, decision, percentage, confidence_score, fear_greed_value,reason):
-            """매매 실행 로직"""
+    def execute_trade(self, decision, percentage, confidence_score, fear_greed_value,reason, price=None, decided_at=None):
+            """매매 실행 로직
+
+            price: 판단에 사용한 현재가 (스냅샷 값 재사용, 없으면 조회)
+            decided_at: AI 판단 완료 시각 (epoch 초, 판단 -> 체결 지연 측정)
+            """
             try:
-               
+                current_price = price or self.trade_manager.current_price()
                 trade_ratio = self.trade_manager.adjust_trade_ratio(percentage, fear_greed_value, decision)
-
-
-                if confidence_score >= 70:
-                    if decision == "buy":
-                        krw = self.upbit.get_balance("KRW")
-                        order_amount = krw * trade_ratio
-                        if order_amount <= 5000:
-                            order_amount = 5001
-                        if order_amount > 5000:
-                            order = self.trade_manager.execute_market_buy(order_amount)
+                order = None
+                # 포트폴리오의 티커들이 같은 잔고를 보고 동시에 매수하지 않도록 잔고 확인~제출을 하나씩 처리
+                # (제출 시 스냅샷이 무효화되어 다음 티커는 앞 주문에 묶인 KRW를 뺀 잔고를 다시 받음)
+                with self.account.order_lock:
+                    if cycle_archive.current_record() is not None:
+                        # 재실행 시 같은 주문 크기가 나오도록 판단 시점 잔고 보관 (KRW + 해당 코인)
+                        currency = self.ticker.split("-")[1]
+                        cycle_archive.record(trade={
+                            "accounts": [row for (cur, _), row in self.account.accounts().items() if cur in ("KRW", currency)],
+                            "price": current_price,
+                            "trade_ratio": trade_ratio,
+                        })
+
+
+                    # 주문 크기 규칙은 백테스트와 공유 (trade_rules)
+                    if confidence_score >= self.params.min_confidence:
+                        if decision == "buy":
+                            krw = self.account.balance("KRW")
+                            order_amount = trade_rules.buy_order(krw, trade_ratio, self.params)
+                            if order_amount is not None:
+                                order = self.trade_manager.execute_market_buy(order_amount, current_price, decided_at)
                          
-                            if order:
-                                print("\n=== Buy Order Executed ===")
-                                print(f"Trade Amount: {order_amount:,.0f} KRW ({trade_ratio*100:.1f}%)")
+                                if order:
+                                    print("\n=== Buy Order Submitted ===")
+                                    print(f"Trade Amount: {order_amount:,.0f} KRW ({trade_ratio*100:.1f}%), UUID: {order.uuid}")
                                
-                    elif decision == "sell":
-                        btc = self.upbit.get_balance(self.ticker)
-                        sell_amount = btc * trade_ratio
-                        if sell_amount*pyupbit.get_current_price(self.ticker) <= 5000:
-                            sell_amount = 5001/pyupbit.get_current_price(self.ticker)
-                        order = self.trade_manager.execute_market_sell(sell_amount)
+                        elif decision == "sell":
+                            btc = self.account.balance(self.ticker)
+                            sell_amount = trade_rules.sell_order_volume(btc, trade_ratio, current_price, self.params)
+                            order = self.trade_manager.execute_market_sell(sell_amount, current_price, decided_at)
                        
-                        if order:
-                            print("\n=== Sell Order Executed ===")
-                            print(f"Trade Amount: {sell_amount:.8f} BTC ({trade_ratio*100:.1f}%)")
+                            if order:
+                                print("\n=== Sell Order Submitted ===")
+                                print(f"Trade Amount: {sell_amount:.8f} BTC ({trade_ratio*100:.1f}%), UUID: {order.uuid}")
 
 
                 # 거래 상태 기록
-                balances = self.trade_manager.get_current_balances()
+                balances = self.trade_manager.get_current_balances(current_price)
                 trade_data = {
+                    'ticker': self.ticker,
                     'decision': decision,
                     'percentage': percentage,
                     'reason': reason,
                     **balances
                 }
-                self.db.record_trade(trade_data)
+                trading_id = self.db.record_trade(trade_data)
+                if order:
+                    # 체결 추적 중인 주문 기록에 거래 id 연결
+                    order.trading_id = trading_id
+                    self.db.save_order_fill(order)
+                trade = (cycle_archive.current_record() or {}).get("trade")
+                if trade is not None:
+                    trade["order"] = order and {
+                        "side": order.side, "requested": order.requested, "quote_price": order.quote_price,
+                        "uuid": order.uuid, "state": order.state,
+                    }
+                    trade["balances"] = balances
+                    cycle_archive.record(trading_id=trading_id)
                
             except Exception as e:
                 print(f"Error in execute_trade: {e}")
@@ -1001,55 +1332,199 @@ class EnhancedCryptoTrader:
 
 
 
-def ai_trading():
-    try:
-        trader = EnhancedCryptoTrader("KRW-BTC")
-       
-        # 과거 거래 분석 및 반성 수행
-        reflection = trader.analyze_past_decisions()
-        if reflection:
-            print("\n=== Trading Reflection ===")
-            print(json.dumps(reflection, indent=2))
+def run_trading_cycle(trader, snapshot):
+    """스냅샷 하나로 반성 -> AI 판단 -> 매매까지 진행 (입력/출력은 cycle_archive에 압축 보관)"""
+    with cycle_archive.get_cycle_archive().cycle(trader.ticker, params=asdict(trader.params)):
+        _run_trading_cycle(trader, snapshot)
 
 
+def _run_trading_cycle(trader, snapshot):
+    tracer = get_tracer()
+    cycle_archive.record(snapshot=cycle_archive.snapshot_fields(snapshot))
+    # 과거 거래 분석 및 반성 수행
+    with tracer.span("reflection"):
+        reflection = trader.analyze_past_decisions(snapshot)
+    cycle_archive.record(reflection=reflection)
+    if reflection:
+        print(f"\n=== Trading Reflection ({trader.ticker}) ===")
+        print(json.dumps(reflection, indent=2))
+   
+    if snapshot.is_complete():
+        with tracer.span("decision"):
+            ai_result = trader.get_ai_analysis(snapshot)
+        decided_at = time.time()
+        cycle_archive.record(result=ai_result, decided_at=decided_at)
        
-        current_status = trader.get_current_status()
-        orderbook_data = trader.get_orderbook_data()
-        ohlcv_data = trader.get_ohlcv_data()
-        fear_greed_data = trader.get_fear_greed_index()
-        news_data = trader.get_crypto_news()
-       
-        if all([current_status, orderbook_data, ohlcv_data, fear_greed_data, news_data]):
-            analysis_data = {
-                "current_status": current_status,
-                "orderbook": orderbook_data,
-                "ohlcv": ohlcv_data,
-                "fear_greed": fear_greed_data,
-                "news": news_data
-            }
+        if ai_result:
+            print(f"\n=== AI Analysis Result ({trader.ticker}) ===")
+            print(json.dumps(ai_result, indent=2))
            
-            ai_result = trader.get_ai_analysis(analysis_data)
+            # 반성 기반 조정사항 출력
+            print("\n=== Reflection-based Adjustments ===")
+            print(json.dumps(ai_result['reflection_based_adjustments'], indent=2))
            
-            if ai_result:
-                print("\n=== AI Analysis Result ===")
-                print(json.dumps(ai_result, indent=2))
-               
-                # 반성 기반 조정사항 출력
-                print("\n=== Reflection-based Adjustments ===")
-                print(json.dumps(ai_result['reflection_based_adjustments'], indent=2))
-               
+            with tracer.span("trade", decision=ai_result['decision']):
                 trader.execute_trade(
                     ai_result['decision'],
                     ai_result['percentage'],
                     ai_result['confidence_score'],
-                    fear_greed_data['current']['value'],
-                    ai_result['reason']
+                    snapshot.fear_greed_value,
+                    ai_result['reason'],
+                    price=snapshot.price,
+                    decided_at=decided_at
                 )
+
+
+def ai_trading():
+    try:
+        feed = get_market_feed(["KRW-BTC"]) if USE_MARKET_FEED else None
+        trader = EnhancedCryptoTrader("KRW-BTC", feed=feed)
+
+        tracer = get_tracer()
+        with tracer.span("cycle", ticker=trader.ticker):
+            # 시장 데이터는 사이클당 한 번만 동시 수집해 반성/판단이 함께 사용
+            with tracer.span("snapshot"):
+                snapshot = trader.build_market_snapshot()
+            run_trading_cycle(trader, snapshot)
+
+        trader.llm.print_summary()
        
     except Exception as e:
         print(f"Error in ai_trading: {e}")
 
 
+def fetch_quotes(tickers, feed=None):
+    """여러 티커 현재가를 한 번의 요청으로 조회 -> {ticker: price} (피드에 있는 티커는 요청 생략)"""
+    quotes = feed.prices(tickers) if feed else {}
+    missing = [t for t in tickers if t not in quotes]
+    if missing:
+        prices = pyupbit.get_current_price(missing)
+        if len(missing) == 1:  # pyupbit는 티커 1개면 dict 대신 숫자를 반환
+            prices = {missing[0]: prices}
+        quotes.update(prices or {})
+    return quotes
+
+
+def fetch_orderbooks(tickers, feed=None):
+    """여러 티커 호가를 한 번의 요청으로 조회 -> {ticker: 원본 호가} (피드에 있는 티커는 요청 생략)"""
+    books = {}
+    for ticker in tickers:
+        book = feed.book(ticker) if feed else None
+        if book:
+            books[ticker] = book.as_orderbook()
+    missing = [t for t in tickers if t not in books]
+    if missing:
+        orderbooks = pyupbit.get_orderbook(missing)
+        if isinstance(orderbooks, dict):
+            orderbooks = [orderbooks]
+        books.update({ob['market']: ob for ob in orderbooks or []})
+    return books
+
+
+class PortfolioRunner:
+    """여러 KRW 마켓을 한 프로세스에서 운용
+
+    - 현재가/호가는 전체 티커를 한 번에 조회
+    - 공포탐욕지수/뉴스/전략 분석은 사이클당 한 번만 조회해 모든 티커가 공유
+    - 거래 DB, 캔들 저장소, 계좌 스냅샷, LLM 게이트웨이(동시 호출 수 제한)를 공유
+    """
+
+    def __init__(self, tickers, max_workers=PORTFOLIO_WORKERS):
+        self.tickers = list(tickers)
+        self.max_workers = max_workers
+        self.db = DatabaseManager()
+        self.candles = CandleStore()
+        self.feed = get_market_feed(self.tickers) if USE_MARKET_FEED else None
+
+        self.lead = EnhancedCryptoTrader(self.tickers[0], db=self.db, candles=self.candles, feed=self.feed)
+        self.traders = {self.lead.ticker: self.lead}
+        for ticker in self.tickers[1:]:
+            self.traders[ticker] = EnhancedCryptoTrader(
+                ticker, db=self.db, candles=self.candles,
+                strategy_digest=self.lead.strategy_digest, account=self.lead.account, feed=self.feed)
+
+
+    def prefetch(self, tickers):
+        """티커 공통/일괄 조회 데이터 수집"""
+        lead = self.lead
+        with get_tracer().span("prefetch", tickers=len(tickers)):
+            results, timings = gather_sources({
+                "quotes": (lambda: fetch_quotes(tickers, self.feed), SOURCE_TIMEOUTS["current_status"]),
+                "orderbooks": (lambda: fetch_orderbooks(tickers, self.feed), SOURCE_TIMEOUTS["orderbook"]),
+                "fear_greed": lead.get_fear_greed_index,
+                "news": lead.get_crypto_news,
+                # 티커별 판단 전에 전략 분석 캐시를 채워 중복 LLM 호출 방지
+                "youtube_analysis": lead.get_youtube_analysis,
+            })
+        captured_at = {name: t["captured_at"] for name, t in timings.items() if "captured_at" in t}
+        return results, captured_at
+
+
+    def run_ticker(self, ticker, results, captured_at):
+        """일괄 조회 결과를 넘겨 티커 하나의 사이클 진행"""
+        trader = self.traders[ticker]
+        try:
+            prefetched = {
+                "price": (results["quotes"] or {}).get(ticker),
+                "orderbook": (results["orderbooks"] or {}).get(ticker),
+                "captured_at": captured_at,
+            }
+            # 공통 소스는 조회에 성공한 경우만 공유 (실패하면 티커별로 다시 시도)
+            for name in ("fear_greed", "news"):
+                if results[name] is not None:
+                    prefetched[name] = results[name]
+
+            tracer = get_tracer()
+            with tracer.span("cycle", ticker=ticker):
+                with tracer.span("snapshot"):
+                    snapshot = trader.build_market_snapshot(prefetched)
+                run_trading_cycle(trader, snapshot)
+        except Exception as e:
+            print(f"Error in run_ticker ({ticker}): {e}")
+
+
+    def run_cycle(self, tickers=None):
+        """전체(또는 트리거된 일부) 티커 사이클 실행"""
+        tickers = [t for t in tickers if t in self.traders] if tickers else self.tickers
+        print(f"\n=== Portfolio Cycle: {len(tickers)} tickers ===")
+        results, captured_at = self.prefetch(tickers)
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ticker") as pool:
+            list(pool.map(lambda t: self.run_ticker(t, results, captured_at), tickers))
+        self.lead.llm.print_summary()
+
+
+def build_trigger_engine(tickers, candles=None):
+    """티커별 최근 캔들로 지표 상태를 채운 트리거 엔진"""
+    engine = TriggerEngine()
+    candles = candles or CandleStore()
+    for ticker in tickers:
+        try:
+            engine.seed(ticker, candles.get(ticker, engine.config.interval, OHLCV_LOOKBACK))
+        except Exception as e:
+            print(f"Error seeding trigger for {ticker}: {e}")
+    return engine
+
+
+def poll_triggers(engine, feed=None):
+    """최신 가격/호가를 반영하고 발생한 트리거 이벤트 반환 (피드가 없으면 REST 일괄 조회)"""
+    tickers = engine.tickers
+    try:
+        prices = fetch_quotes(tickers, feed)
+        books = fetch_orderbooks(tickers, feed)
+    except Exception as e:
+        print(f"Error in poll_triggers: {e}")
+        return []
+
+    for ticker in tickers:
+        imbalance = None
+        book = books.get(ticker)
+        if book:
+            bid, ask = float(book['total_bid_size']), float(book['total_ask_size'])
+            imbalance = (bid - ask) / (bid + ask) if bid + ask else 0.0
+        engine.observe(ticker, prices.get(ticker), imbalance)
+    return engine.poll()
+
+
 
 
 # 메인 실행 코드
@@ -1071,17 +1546,39 @@ if __name__ == "__main__":
             raise ValueError(f"필수 환경 변수가 없습니다: {', '.join(missing_vars)}")
 
 
-        def run_trading():
+        portfolio = PortfolioRunner(TRADING_TICKERS) if len(TRADING_TICKERS) > 1 else None
+        watch_tickers = TRADING_TICKERS if portfolio else ["KRW-BTC"]
+        feed = get_market_feed(watch_tickers) if USE_MARKET_FEED else None
+        triggers = build_trigger_engine(watch_tickers) if USE_CYCLE_TRIGGERS else None
+
+        def run_trading(tickers=None):
             try:
                 current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                 print(f"\n[{current_time}] 트레이딩 시작...")
-                ai_trading()
+                if portfolio:
+                    portfolio.run_cycle(tickers)
+                else:
+                    ai_trading()
                 print(f"[{current_time}] 트레이딩 완료")
             except Exception as e:
                 print(f"실행 중 오류 발생: {e}")
+            if triggers:
+                # 정각/트리거 사이클 모두 쿨다운 시작 및 ATR 이동 기준가 갱신
+                for ticker in tickers or watch_tickers:
+                    triggers.mark_cycle(ticker)
+
+
+        if feed:
+            # 첫 사이클 전에 시세 구독을 시작해 초기 스냅샷 수신
+            feed.wait_ready(10)
+
+        if USE_CHART_WORKER:
+            # 첫 사이클 전에 브라우저 워커를 미리 띄워 페이지 로딩
+            for ticker in TRADING_TICKERS:
+                get_chart_worker(chart_url(ticker))
 
 
-        # 스케줄 설정
+        # 스케줄 설정 (트리거를 켜도 정각 사이클은 대체 경로로 유지)
         schedule.every().hour.at(":00").do(run_trading)  # 정각
 
 
@@ -1093,7 +1590,15 @@ if __name__ == "__main__":
         while True:
             try:
                 schedule.run_pending()
-                time.sleep(30)  # 30초마다 스케줄 체크
+                if triggers:
+                    events = poll_triggers(triggers, feed)
+                    for event in events:
+                        print(f"\n[trigger] {event.ticker} {event.name}: {event.detail}")
+                    if events:
+                        run_trading([event.ticker for event in events])
+                    time.sleep(TRIGGER_POLL_SECONDS)
+                else:
+                    time.sleep(30)  # 30초마다 스케줄 체크
             except KeyboardInterrupt:
                 print("\n사용자에 의해 봇이 종료되었습니다")
                 break
@@ -0,0 +1,320 @@
+"""과거 OHLCV로 매매 판단 파이프라인 백테스트
+
+- 판단은 교체 가능한 정책(policy)이 만든다: 결정적 규칙(RulePolicy), 기록된 판단(RecordedPolicy),
+  LLM 게이트웨이(LLMPolicy, LLM_BACKEND=stub 이면 스텁 응답)
+- 주문 크기/최소 금액/공포탐욕 조정은 실거래와 같은 trade_rules를 사용, 수수료는 업비트 기준
+- 지표/신호/평가금액/낙폭 계산은 NumPy 벡터 연산, 잔고 갱신만 실제 주문이 나가는 봉에서 수행
+"""
+import json
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+import trade_rules
+from candle_store import INTERVAL_SECONDS
+from indicators import add_indicators
+
+
+UPBIT_FEE = 0.0005  # KRW 마켓 거래 수수료 0.05%
+NEUTRAL_FEAR_GREED = 50  # 지수가 없을 때 (비율 조정 없음)
+SIGNAL_COLUMNS = ["decision", "percentage", "confidence_score"]
+
+
+def _hold_signals(index):
+    return pd.DataFrame({"decision": "hold", "percentage": 0, "confidence_score": 0}, index=index)
+
+
+# --- 정책 ---
+class RulePolicy:
+    """RSI/볼린저 밴드 기반 결정적 규칙 (벡터화)"""
+
+    def __init__(self, rsi_buy=30, rsi_sell=70, percentage=30, confidence=80):
+        self.rsi_buy = rsi_buy
+        self.rsi_sell = rsi_sell
+        self.percentage = percentage
+        self.confidence = confidence
+
+    def __call__(self, frame):
+        rsi = frame["rsi"].to_numpy()
+        pband = frame["bb_pband"].to_numpy()
+        buy = (rsi <= self.rsi_buy) | (pband < 0)
+        sell = (rsi >= self.rsi_sell) | (pband > 1)
+        decision = np.select([buy & ~sell, sell & ~buy], ["buy", "sell"], "hold")
+        active = decision != "hold"
+        return pd.DataFrame({
+            "decision": decision,
+            "percentage": np.where(active, self.percentage, 0),
+            "confidence_score": np.where(active, self.confidence, 0),
+        }, index=frame.index)
+
+
+class RecordedPolicy:
+    """기록된 판단 재생 (판단 시각이 속한 봉에 적용)
+
+    decisions: timestamp 인덱스 + decision / percentage / confidence_score 컬럼
+    """
+
+    def __init__(self, decisions):
+        self.decisions = decisions.sort_index()
+
+    @classmethod
+    def from_trading_db(cls, db_path="trading.db", ticker="KRW-BTC", confidence=trade_rules.DEFAULT_PARAMS.min_confidence):
+        """trading_history에서 판단 불러오기 (신뢰도는 저장되지 않아 confidence로 간주)"""
+        import sqlite3
+        with sqlite3.connect(db_path) as conn:
+            df = pd.read_sql_query(
+                "SELECT timestamp, decision, percentage FROM trading_history WHERE ticker = ? ORDER BY timestamp_ms, id",
+                conn, params=(ticker,), parse_dates=["timestamp"])
+        df["confidence_score"] = confidence
+        return cls(df.set_index("timestamp"))
+
+    def __call__(self, frame):
+        signals = _hold_signals(frame.index)
+        # 각 판단 시각 이하 중 가장 늦은 봉 (봉 시작 시각 기준)
+        pos = frame.index.searchsorted(self.decisions.index, side="right") - 1
+        valid = pos >= 0
+        rows = self.decisions[valid]
+        signals.iloc[pos[valid], [signals.columns.get_loc(c) for c in SIGNAL_COLUMNS]] = rows[SIGNAL_COLUMNS].to_numpy()
+        return signals
+
+
+DECISION_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "trading_decision",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "percentage": {"type": "integer"},
+                "confidence_score": {"type": "integer"},
+                "decision": {"type": "string", "enum": ["buy", "sell", "hold"]},
+                "reason": {"type": "string"},
+            },
+            "required": ["percentage", "confidence_score", "decision", "reason"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+
+class LLMPolicy:
+    """every 봉마다 최근 window 봉을 LLM 게이트웨이에 보내 판단 (응답 캐시로 재실행 시 비용 없음)"""
+
+    def __init__(self, gateway, every=24, window=24, model="gpt-5-mini"):
+        self.gateway = gateway
+        self.every = every
+        self.window = window
+        self.model = model
+
+    def __call__(self, frame):
+        from prompt_encoder import dumps, encode_table
+
+        signals = _hold_signals(frame.index)
+        for i in range(self.window, len(frame), self.every):
+            table = encode_table(frame.iloc[i - self.window:i + 1], "%Y-%m-%d %H:%M")
+            response = self.gateway.chat(
+                "backtest_decision",
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": "You are a cryptocurrency trading analyst. "
+                     "Return a buy/sell/hold decision with percentage (0-100) and confidence_score (0-100)."},
+                    {"role": "user", "content": f"Market Data Analysis:\n{dumps(table)}"},
+                ],
+                response_format=DECISION_FORMAT,
+            )
+            result = json.loads(response.choices[0].message.content)
+            signals.iloc[i] = [result["decision"], result["percentage"], result["confidence_score"]]
+        return signals
+
+
+# --- 시뮬레이션 ---
+@dataclass
+class BacktestResult:
+    equity: pd.Series
+    drawdown: pd.Series
+    trades: pd.DataFrame
+    stats: dict
+
+    def print_report(self, title="Backtest"):
+        print(f"\n=== {title} ===")
+        for name, value in self.stats.items():
+            if isinstance(value, float):
+                value = f"{value:,.4f}" if abs(value) < 100 else f"{value:,.0f}"
+            print(f"{name:<20} {value}")
+
+
+def align_fear_greed(index, fear_greed=None):
+    """일별 공포탐욕지수(Series) -> 봉별 값 (직전 값 유지, 없으면 중립 50)"""
+    if fear_greed is None or len(fear_greed) == 0:
+        return np.full(len(index), NEUTRAL_FEAR_GREED, dtype=float)
+    fear_greed = fear_greed.sort_index()
+    pos = fear_greed.index.searchsorted(index, side="right") - 1
+    values = fear_greed.to_numpy(dtype=float)
+    return np.where(pos >= 0, values[np.clip(pos, 0, None)], NEUTRAL_FEAR_GREED)
+
+
+DECISIONS = np.array(["hold", "buy", "sell"])  # 공유 메모리 등 숫자 배열로 넘길 때의 코드 순서
+
+
+def simulate_arrays(open_, close, decision, percentage, confidence, fear_greed, params=trade_rules.DEFAULT_PARAMS,
+                    initial_krw=1_000_000, fee=UPBIT_FEE, fill="next_open"):
+    """배열 입력 시뮬레이션 코어 (sweep 워커가 DataFrame 없이 호출)
+
+    decision: "hold"/"buy"/"sell" 문자열 배열
+    Returns: (평가금액, 낙폭, 코인 평가금액, 거래 목록 DataFrame, 거절 수)
+    """
+    n = len(close)
+    if fill == "next_open":
+        price = np.append(open_[1:], np.nan)
+        effective = np.arange(n) + 1  # 잔고 변화가 반영되는 봉
+    else:
+        price = close
+        effective = np.arange(n)
+
+    candidates = np.flatnonzero((decision != "hold") & (confidence >= params.min_confidence) & np.isfinite(price))
+
+    krw, coin, cost = float(initial_krw), 0.0, 0.0  # cost: 보유 코인 매수 원가(수수료 포함)
+    trade_rows = []
+    rejected = 0
+    for i in candidates:
+        plan = trade_rules.plan_order(decision[i], percentage[i], confidence[i], fear_greed[i], krw, coin, price[i], params)
+        if plan is None:
+            continue
+        side, amount = plan
+        if side == "buy":
+            paid = amount * (1 + fee)
+            if paid > krw:  # 거래소 잔고 부족 거절
+                rejected += 1
+                continue
+            volume = amount / price[i]
+            krw -= paid
+            coin += volume
+            cost += paid
+            pnl = 0.0
+            trade_fee = amount * fee
+        else:
+            if amount > coin:
+                rejected += 1
+                continue
+            gross = amount * price[i]
+            released = cost * (amount / coin)
+            pnl = gross * (1 - fee) - released
+            krw += gross * (1 - fee)
+            cost -= released
+            coin -= amount
+            trade_fee = gross * fee
+        trade_rows.append((i, effective[i], side, price[i], amount if side == "sell" else volume, trade_fee, pnl, krw, coin))
+
+    trades = pd.DataFrame(trade_rows, columns=["bar", "effective", "side", "price", "volume", "fee", "pnl", "krw", "coin"])
+
+    # 거래 사이 구간은 잔고가 일정하므로 마지막 거래 위치로 한 번에 채움
+    if len(trades):
+        pos = np.searchsorted(trades["effective"].to_numpy(), np.arange(n), side="right") - 1
+        krw_path = np.where(pos >= 0, trades["krw"].to_numpy()[np.clip(pos, 0, None)], initial_krw)
+        coin_path = np.where(pos >= 0, trades["coin"].to_numpy()[np.clip(pos, 0, None)], 0.0)
+    else:
+        krw_path = np.full(n, float(initial_krw))
+        coin_path = np.zeros(n)
+    equity = krw_path + coin_path * close
+    drawdown = equity / np.maximum.accumulate(equity) - 1
+    return equity, drawdown, coin_path * close, trades, rejected
+
+
+def simulate(frame, signals, fear_greed=None, params=trade_rules.DEFAULT_PARAMS, initial_krw=1_000_000,
+             fee=UPBIT_FEE, fill="next_open"):
+    """판단 신호 -> 체결/잔고/평가금액
+
+    fill: next_open(다음 봉 시가 체결, 기본) | close(판단 봉 종가 체결)
+    """
+    equity, drawdown, exposure_value, trades, rejected = simulate_arrays(
+        frame["open"].to_numpy(dtype=float),
+        frame["close"].to_numpy(dtype=float),
+        signals["decision"].to_numpy(),
+        signals["percentage"].to_numpy(dtype=float),
+        signals["confidence_score"].to_numpy(dtype=float),
+        align_fear_greed(frame.index, fear_greed),
+        params, initial_krw, fee, fill,
+    )
+    trades.index = frame.index[trades["bar"].to_numpy()] if len(trades) else pd.DatetimeIndex([])
+    return equity, drawdown, exposure_value, trades, rejected
+
+
+def performance(close, equity, drawdown, exposure_value, trades, rejected, interval="minute60", initial_krw=1_000_000):
+    """성과 지표 dict"""
+    returns = np.diff(equity) / equity[:-1]
+    bars_per_year = 365 * 86400 / INTERVAL_SECONDS.get(interval, 3600)
+    std = returns.std()
+    sells = trades[trades["side"] == "sell"]
+    return {
+        "bars": len(close),
+        "final_equity": float(equity[-1]),
+        "total_return": float(equity[-1] / initial_krw - 1),
+        "buy_hold_return": float(close[-1] / close[0] - 1),
+        "max_drawdown": float(drawdown.min()),
+        "sharpe": float(returns.mean() / std * np.sqrt(bars_per_year)) if std > 0 else 0.0,
+        "exposure": float(np.mean(exposure_value / equity)),
+        "trades": len(trades),
+        "buys": int((trades["side"] == "buy").sum()),
+        "sells": len(sells),
+        "rejected": rejected,
+        "win_rate": float((sells["pnl"] > 0).mean()) if len(sells) else 0.0,
+        "realized_pnl": float(sells["pnl"].sum()),
+        "fees": float(trades["fee"].sum()),
+    }
+
+
+def run_backtest(ohlcv, policy, fear_greed=None, interval="minute60", params=trade_rules.DEFAULT_PARAMS,
+                 initial_krw=1_000_000, fee=UPBIT_FEE, fill="next_open"):
+    """OHLCV(DataFrame) + 정책 -> BacktestResult"""
+    frame = add_indicators(ohlcv.copy())  # 호출 측 DataFrame(캐시된 캔들 등)에 컬럼을 추가하지 않음
+    frame["fear_greed"] = align_fear_greed(frame.index, fear_greed)
+    signals = policy(frame)
+    equity, drawdown, exposure_value, trades, rejected = simulate(
+        frame, signals, fear_greed, params, initial_krw, fee, fill)
+    stats = {
+        "start": str(frame.index[0]),
+        "end": str(frame.index[-1]),
+        **performance(frame["close"].to_numpy(dtype=float), equity, drawdown, exposure_value, trades, rejected,
+                      interval, initial_krw),
+    }
+    return BacktestResult(
+        equity=pd.Series(equity, index=frame.index, name="equity"),
+        drawdown=pd.Series(drawdown, index=frame.index, name="drawdown"),
+        trades=trades.drop(columns=["bar", "effective"]),
+        stats=stats,
+    )
+
+
+def fetch_fear_greed_history():
+    """alternative.me 전체 공포탐욕지수 기록 -> 날짜(KST naive) 인덱스 Series"""
+    from http_client import get_http_client
+
+    data = get_http_client().get("https://api.alternative.me/fng/", params={"limit": 0}).json()["data"]
+    index = pd.to_datetime([int(d["timestamp"]) for d in data], unit="s") + pd.Timedelta(hours=9)
+    return pd.Series([int(d["value"]) for d in data], index=index, name="fear_greed").sort_index()
+
+
+if __name__ == "__main__":
+    # 사용 예: python backtest.py KRW-BTC minute60 8760
+    import sys
+    from candle_store import CandleStore
+
+    ticker = sys.argv[1] if len(sys.argv) > 1 else "KRW-BTC"
+    interval = sys.argv[2] if len(sys.argv) > 2 else "minute60"
+    count = int(sys.argv[3]) if len(sys.argv) > 3 else 24 * 365
+
+    ohlcv = CandleStore().get(ticker, interval, count)
+    try:
+        fear_greed = fetch_fear_greed_history()
+    except Exception as e:
+        print(f"Error fetching fear and greed history: {e}")
+        fear_greed = None
+
+    started = time.perf_counter()
+    result = run_backtest(ohlcv, RulePolicy(), fear_greed, interval)
+    elapsed = time.perf_counter() - started
+    result.print_report(f"Backtest {ticker} {interval} (RulePolicy)")
+    print(f"{'elapsed':<20} {elapsed:.3f}s")
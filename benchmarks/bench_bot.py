@@ -0,0 +1,26 @@
+"""트레이더 쪽 핫패스: 지표 계산, OHLCV 요약/프롬프트 직렬화"""
+import contextlib
+import io
+
+from datagen import make_ohlcv
+
+
+def run(suite):
+    from autotrade import EnhancedCryptoTrader
+    from indicators import add_indicators
+    from prompt_encoder import dumps
+
+    for bars in (1_000, 100_000):
+        df = make_ohlcv(bars)
+        suite.bench(f"bot.add_technical_indicators[{bars}]", lambda df=df: add_indicators(df), bars=bars)
+
+    # get_ohlcv_data: 지표 포함 일봉/시간봉(조회 구간 200봉) -> 요약 -> 프롬프트 JSON
+    daily = add_indicators(make_ohlcv(200, "1D"))
+    hourly = add_indicators(make_ohlcv(200, "1h", seed=8))
+
+    def serialize():
+        with contextlib.redirect_stdout(io.StringIO()):  # 요약 시 출력하는 지표 로그 제외
+            summary = EnhancedCryptoTrader.summarize_ohlcv(None, daily, hourly)
+        return dumps(summary)
+
+    suite.bench("bot.get_ohlcv_data.serialize", serialize, bars=200)
@@ -0,0 +1,120 @@
+"""서버 쪽 핫패스: 브로드캐스트 직렬화, DTO 변환, /history·/reflections, WS bootstrap (합성 trading.db)"""
+import asyncio
+import json
+import math
+import os
+import sys
+from datetime import datetime, timedelta
+
+from harness import ROOT
+
+
+SERVER_DIR = ROOT / "server"
+DTO_ROWS = 10_000
+
+
+def _import_server(db_path):
+    """server 모듈은 평면 import(from db import ...)를 쓰므로 경로/DB 지정 후 import"""
+    os.environ["TRADING_DB_PATH"] = str(db_path)
+    if str(SERVER_DIR) not in sys.path:
+        sys.path.insert(0, str(SERVER_DIR))
+    from fastapi import FastAPI
+    import bootstrap, broadcast, models, router, schemas
+
+    app = FastAPI()  # 백그라운드 폴러(lifespan) 없이 라우터만
+    app.include_router(router.api_router)
+    return app, bootstrap, broadcast, models, router, schemas
+
+
+class _CollectingSubscriber:
+    """bootstrap 프레임만 받아두는 구독자 (전송 없음)"""
+
+    def __init__(self):
+        self.frames = []
+
+    def offer(self, msg):
+        self.frames.append(msg)
+        return True
+
+
+class ASGIClient:
+    """HTTP 서버 없이 ASGI 앱을 직접 호출 (라우팅/의존성/응답 직렬화 포함)"""
+
+    def __init__(self, app):
+        self.app = app
+        self.loop = asyncio.new_event_loop()
+
+    def get(self, path, query=""):
+        messages = []
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query.encode(),
+            "root_path": "", "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 0), "server": ("bench", 80),
+        }
+        self.loop.run_until_complete(self.app(scope, receive, send))
+        status = messages[0]["status"]
+        if status != 200:
+            raise RuntimeError(f"GET {path}?{query} -> {status}")
+        return b"".join(m.get("body", b"") for m in messages[1:])
+
+
+def _history_rows(models, n):
+    base = datetime(2024, 1, 1)
+    return [models.TradingHistory(
+        id=i, timestamp=base + timedelta(minutes=10 * i), ticker="KRW-BTC", decision=("buy", "sell", "hold")[i % 3],
+        percentage=float(i % 100), reason="RSI oversold near the lower band; partial entry.",
+        btc_balance=0.01, krw_balance=1e6, btc_avg_buy_price=5e7, btc_krw_price=5e7 + i,
+    ) for i in range(n)]
+
+
+def run(suite, db_path):
+    app, bootstrap, broadcast, models, router, schemas = _import_server(db_path)
+
+    # broadcast: bootstrap 크기 신호 목록 + 중첩 dict, 일부 NaN/inf 포함
+    payload = [{
+        "id": i, "ts": datetime(2024, 1, 1) + timedelta(minutes=i), "ticker": "BTC/KRW",
+        "price": math.nan if i % 97 == 0 else 5e7 + i, "type": "HOLD", "confidence": math.inf if i % 89 == 0 else 70.0,
+        "reason": "Momentum fading after a strong rally.", "meta": {"rsi": 55.5, "bands": [1.0, 2.0, 3.0]},
+    } for i in range(DTO_ROWS)]
+    suite.bench(f"server.broadcast.sanitize_dumps[{DTO_ROWS}]",
+                lambda: json.dumps({"event": "signal", "data": broadcast.sanitize("signal", payload)},
+                                   default=str, ensure_ascii=False),
+                rows=DTO_ROWS)
+
+    rows = _history_rows(models, DTO_ROWS)
+    suite.bench(f"server.model_validate[{DTO_ROWS}]",
+                lambda: [schemas.TradingHistoryOut.model_validate(r) for r in rows], rows=DTO_ROWS)
+    dtos = [schemas.TradingHistoryOut.model_validate(r) for r in rows]
+    suite.bench(f"server._to_signal[{DTO_ROWS}]", lambda: [router._to_signal(d) for d in dtos], rows=DTO_ROWS)
+
+    # 엔드포인트: 최신 페이지, 과거 커서 페이지, 티커 필터
+    client = ASGIClient(app)
+    cases = {
+        "history.latest[500]": ("/history", "limit=500"),
+        "history.cursor[100]": ("/history", "limit=100&cursor=2021-06-01T00:00:00"),
+        "history.ticker[100]": ("/history", "limit=100&ticker=KRW-ETH"),
+        "history.rollup_1h[500]": ("/history", "limit=500&resolution=1h"),
+        "history.rollup_1d.ticker[500]": ("/history", "limit=500&resolution=1d&ticker=KRW-ETH"),
+        "history.rollup_1w.cursor[100]": ("/history", "limit=100&resolution=1w&cursor=2021-06-01T00:00:00"),
+        "latest": ("/latest", ""),
+        "reflections.latest[500]": ("/reflections", "limit=500"),
+        "reflections.cursor[100]": ("/reflections", "limit=100&cursor=2021-06-01T00:00:00"),
+        "reflections.trading_id": ("/reflections", "trading_id=500000"),
+    }
+    for name, (path, query) in cases.items():
+        suite.bench(f"server.{name}", lambda path=path, query=query: client.get(path, query), db=db_path.name)
+
+    # WS 접속 1건당 bootstrap 비용: DB 조회+검증+직렬화 vs 미리 직렬화한 링 버퍼 프레임
+    suite.bench("server.ws_bootstrap.db", lambda: router._bootstrap_from_db(_CollectingSubscriber()), db=db_path.name)
+    cache = bootstrap.BootstrapCache()
+    seed = _CollectingSubscriber()
+    router._bootstrap_from_db(seed)
+    cache.seed(*(json.loads(frame)["data"] for frame in seed.frames))
+    suite.bench("server.ws_bootstrap.cached", lambda: [_CollectingSubscriber().offer(f) for f in cache.frames()])
@@ -0,0 +1,103 @@
+"""합성 데이터 생성 (네트워크 없이 재현 가능, 고정 시드)
+
+- OHLCV: 로그 정규 랜덤 워크 가격
+- trading.db: 트레이더와 같은 스키마(DatabaseManager)에 거래 기록 N행 + 반성 일기 N/10행
+"""
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from harness import DATA_DIR
+
+
+SEED = 7
+REASONS = [
+    "RSI oversold with price near the lower Bollinger band; fear index supports a partial entry.",
+    "Momentum fading after a strong rally, MACD crossed below signal; trimming the position.",
+    "No clear edge: mixed signals between daily trend and hourly structure, holding.",
+]
+
+
+def make_ohlcv(bars, interval="1h", seed=SEED, start="2020-01-01 09:00"):
+    rng = np.random.default_rng(seed)
+    close = 5e7 * np.exp(np.cumsum(rng.normal(0, 0.006, bars)))
+    open_ = np.r_[close[0], close[:-1]]
+    spread = np.abs(rng.normal(0, 0.003, bars))
+    index = pd.date_range(start, periods=bars, freq=interval)
+    return pd.DataFrame({
+        "open": open_,
+        "high": np.maximum(open_, close) * (1 + spread),
+        "low": np.minimum(open_, close) * (1 - spread),
+        "close": close,
+        "volume": rng.gamma(2.0, 5.0, bars),
+        "value": close * rng.gamma(2.0, 5.0, bars),
+    }, index=index)
+
+
+def trading_db_path(rows):
+    from migrations import SCHEMA_VERSION
+    return DATA_DIR / f"trading_{rows}_v{SCHEMA_VERSION}.db"
+
+
+def make_trading_db(rows, path=None, seed=SEED):
+    """거래 기록 rows행짜리 trading.db 생성 (이미 있으면 재사용). 경로 반환"""
+    from autotrade import DatabaseManager
+
+    path = path or trading_db_path(rows)
+    if path.exists():
+        return path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.unlink(missing_ok=True)
+
+    started = time.perf_counter()
+    DatabaseManager(str(tmp)).conn.close()  # 스키마는 트레이더와 동일하게
+    rng = np.random.default_rng(seed)
+    base = datetime(2020, 1, 1, 9)
+    tickers = ["KRW-BTC", "KRW-ETH", "KRW-XRP", "KRW-SOL"]
+    decisions = ["buy", "sell", "hold"]
+
+    conn = sqlite3.connect(tmp)
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA journal_mode = MEMORY")
+    chunk = 100_000
+    for offset in range(0, rows, chunk):
+        n = min(chunk, rows - offset)
+        price = 5e7 * np.exp(rng.normal(0, 0.2, n))
+        conn.executemany("""
+            INSERT INTO trading_history (
+                timestamp, timestamp_ms, ticker, decision, percentage, reason,
+                btc_balance, krw_balance, btc_avg_buy_price, btc_krw_price
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [(
+            base + timedelta(minutes=10 * (offset + i)),
+            int((base + timedelta(minutes=10 * (offset + i))).timestamp() * 1000),
+            tickers[(offset + i) % len(tickers)],
+            decisions[int(rng.integers(3))],
+            float(rng.integers(0, 100)),
+            REASONS[(offset + i) % len(REASONS)],
+            float(rng.random()),
+            float(rng.random() * 1e7),
+            float(price[i] * 0.98),
+            float(price[i]),
+        ) for i in range(n)])
+
+    conn.execute("""
+        INSERT INTO trading_reflection (
+            trading_id, reflection_date, reflection_date_ms, market_condition, decision_analysis,
+            improvement_points, success_rate, learning_points
+        )
+        SELECT id, timestamp, timestamp_ms, 'Sideways market with low volume.', 'Entries were early relative to support.',
+               'Wait for confirmation on the hourly close.', 55.0, 'Respect the daily trend.'
+        FROM trading_history WHERE id % 10 = 0
+    """)
+    conn.execute("ANALYZE")
+    conn.commit()
+    conn.execute("PRAGMA journal_mode = WAL")  # 실제 trading.db와 같은 저널 모드로 측정
+    conn.close()
+    tmp.rename(path)
+    print(f"generated {path} ({rows:,} rows) in {time.perf_counter() - started:.1f}s")
+    return path
@@ -0,0 +1,145 @@
+"""벤치마크 공통: 반복 측정, 결과 JSON, 비교
+
+- 측정은 timeit처럼 한 라운드가 ROUND_SECONDS 이상 되도록 반복 횟수를 정하고 ROUNDS번 반복
+- 호출 1회당 시간(초)의 min/median/mean/stdev를 기록 (비교는 median 기준)
+- 결과 파일에 커밋/파이썬/플랫폼 정보를 함께 남겨 커밋 간 비교
+"""
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parents[1]
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+DATA_DIR = Path(__file__).resolve().parent / ".data"   # 생성한 합성 데이터 캐시
+
+ROUNDS = int(os.getenv("BENCH_ROUNDS", "5"))
+ROUND_SECONDS = float(os.getenv("BENCH_ROUND_SECONDS", "0.2"))
+REGRESSION_THRESHOLD = 0.10  # median이 이 비율 이상 느려지면 회귀로 표시
+
+
+def _calls_per_round(fn):
+    """한 라운드가 ROUND_SECONDS 이상 걸리는 호출 횟수 (1, 2, 5, 10, 20 ...)"""
+    number = 1
+    while True:
+        for factor in (1, 2, 5):
+            n = number * factor
+            started = time.perf_counter()
+            for _ in range(n):
+                fn()
+            if time.perf_counter() - started >= ROUND_SECONDS:
+                return n
+        number *= 10
+
+
+def measure(fn, rounds=ROUNDS):
+    """fn() 1회당 소요 시간 통계 (초)"""
+    fn()  # 워밍업 (캐시/지연 import)
+    number = _calls_per_round(fn)
+    samples = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(rounds):
+            started = time.perf_counter()
+            for _ in range(number):
+                fn()
+            samples.append((time.perf_counter() - started) / number)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return {
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "mean": statistics.fmean(samples),
+        "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "rounds": rounds,
+        "calls_per_round": number,
+    }
+
+
+class Suite:
+    """이름 -> 측정 결과 모음"""
+
+    def __init__(self):
+        self.results = {}
+
+    def bench(self, name, fn, **params):
+        stats = measure(fn)
+        stats["params"] = params
+        self.results[name] = stats
+        print(f"{name:<44} {stats['median'] * 1000:12.3f} ms  (±{stats['stdev'] * 1000:.3f}, x{stats['calls_per_round']})")
+        return stats
+
+
+def _git(*args):
+    try:
+        return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, timeout=10).stdout.strip()
+    except Exception:
+        return ""
+
+
+def metadata():
+    return {
+        "commit": _git("rev-parse", "--short", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "rounds": ROUNDS,
+    }
+
+
+def write_results(suite, path=None):
+    """결과 JSON 저장 (기본: results/<커밋>.json)"""
+    meta = metadata()
+    if path is None:
+        RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+        path = RESULTS_DIR / f"{meta['commit'] or 'unknown'}{'-dirty' if meta['dirty'] else ''}.json"
+    path = Path(path)
+    path.write_text(json.dumps({"meta": meta, "results": suite.results}, indent=2, sort_keys=True))
+    print(f"\nresults -> {path}")
+    return path
+
+
+def compare(base_path, head_path, threshold=REGRESSION_THRESHOLD):
+    """두 결과 파일의 median 비교. 회귀한 벤치마크 이름 목록 반환"""
+    base = json.loads(Path(base_path).read_text())
+    head = json.loads(Path(head_path).read_text())
+    print(f"base {base['meta']['commit']} ({base['meta']['created_at']})  ->  "
+          f"head {head['meta']['commit']} ({head['meta']['created_at']})")
+    if base["meta"]["platform"] != head["meta"]["platform"]:
+        print("warning: results come from different platforms")
+
+    regressions = []
+    for name in sorted(set(base["results"]) | set(head["results"])):
+        old, new = base["results"].get(name), head["results"].get(name)
+        if old is None or new is None:
+            print(f"{name:<44} {'(only in ' + ('head' if old is None else 'base') + ')':>30}")
+            continue
+        ratio = new["median"] / old["median"] if old["median"] else float("inf")
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            flag = "  faster"
+        print(f"{name:<44} {old['median'] * 1000:10.3f} -> {new['median'] * 1000:10.3f} ms  x{ratio:5.2f}{flag}")
+    return regressions
+
+
+if __name__ == "__main__":
+    # 사용 예: python benchmarks/harness.py results/abc123.json results/def456.json [0.1]
+    if len(sys.argv) < 3:
+        print("usage: python benchmarks/harness.py BASE.json HEAD.json [threshold]")
+        sys.exit(2)
+    threshold = float(sys.argv[3]) if len(sys.argv) > 3 else REGRESSION_THRESHOLD
+    sys.exit(1 if compare(sys.argv[1], sys.argv[2], threshold) else 0)
@@ -0,0 +1,38 @@
+"""오프라인 마이크로 벤치마크 실행
+
+사용 예:
+    python benchmarks/run.py                 # 전체, results/<커밋>.json 저장
+    python benchmarks/run.py bot             # 트레이더 쪽만
+    python benchmarks/run.py server out.json # 서버 쪽만, 결과 경로 지정
+    python benchmarks/harness.py results/a.json results/b.json   # 두 결과 비교 (회귀 시 종료 코드 1)
+
+BENCH_DB_ROWS(기본 1,000,000)로 엔드포인트용 합성 trading.db 행 수 조절 (benchmarks/.data에 캐시)
+"""
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(1, str(Path(__file__).resolve().parents[1]))  # 프로젝트 루트 모듈 (autotrade, indicators ...)
+
+import bench_bot
+import bench_server
+from datagen import make_trading_db
+from harness import Suite, write_results
+
+
+BENCH_DB_ROWS = int(os.getenv("BENCH_DB_ROWS", "1000000"))
+
+
+if __name__ == "__main__":
+    target = sys.argv[1] if len(sys.argv) > 1 else "all"
+    output = sys.argv[2] if len(sys.argv) > 2 else None
+
+    suite = Suite()
+    if target in ("all", "bot"):
+        print("\n=== Bot ===")
+        bench_bot.run(suite)
+    if target in ("all", "server"):
+        db_path = make_trading_db(BENCH_DB_ROWS)
+        print("\n=== Server ===")
+        bench_server.run(suite, db_path)
+    write_results(suite, output)
@@ -0,0 +1,136 @@
+"""로컬 OHLCV 캔들 저장소 (SQLite)
+
+(ticker, interval) 별로 캔들을 저장해두고, 첫 백필 이후에는 마지막 저장 캔들
+이후 것만 업비트에서 받아온다. 임의 길이의 조회 구간은 로컬 DB에서 바로 제공한다.
+"""
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+import pyupbit
+
+
+KST = timezone(timedelta(hours=9))
+COLUMNS = ["open", "high", "low", "close", "volume", "value"]
+
+# interval -> 캔들 하나의 길이(초). month는 근사치(최대 31일)
+INTERVAL_SECONDS = {
+    "minute1": 60, "minute3": 180, "minute5": 300, "minute10": 600,
+    "minute15": 900, "minute30": 1800, "minute60": 3600, "minute240": 14400,
+    "day": 86400, "week": 604800, "month": 86400 * 31,
+}
+
+
+def _to_epoch(index):
+    """KST naive DatetimeIndex -> 정수 초 (KST 벽시계 기준)"""
+    return (pd.DatetimeIndex(index).as_unit("s").asi8).tolist()
+
+
+def _from_epoch(values):
+    return pd.to_datetime(values, unit="s")
+
+
+class CandleStore:
+    """티커/봉 단위별 증분 캔들 저장소"""
+
+    def __init__(self, db_path="candles.db", min_refresh_seconds=5):
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.min_refresh_seconds = min_refresh_seconds
+        self._synced_at = {}     # (ticker, interval) -> 마지막 동기화 시각(monotonic)
+        self._exhausted = set()  # 더 과거 캔들이 없는 (ticker, interval)
+        self.setup_database()
+
+    def setup_database(self):
+        with self.lock:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS candles (
+                    ticker TEXT NOT NULL,
+                    interval TEXT NOT NULL,
+                    ts INTEGER NOT NULL,
+                    open REAL NOT NULL,
+                    high REAL NOT NULL,
+                    low REAL NOT NULL,
+                    close REAL NOT NULL,
+                    volume REAL NOT NULL,
+                    value REAL,
+                    PRIMARY KEY (ticker, interval, ts)
+                ) WITHOUT ROWID
+            """)
+            self.conn.commit()
+
+    # --- 조회 ---
+    def get(self, ticker, interval, count):
+        """최신 캔들 count개 반환 (필요한 만큼만 API에서 받아 저장 후 로컬 조회)"""
+        self.sync(ticker, interval, count)
+        return self.read(ticker, interval, count)
+
+    def read(self, ticker, interval, count):
+        """로컬 저장소에서 최신 캔들 count개를 시간 오름차순 DataFrame으로 반환"""
+        with self.lock:
+            rows = self.conn.execute("""
+                SELECT ts, open, high, low, close, volume, value FROM candles
+                WHERE ticker = ? AND interval = ?
+                ORDER BY ts DESC
+                LIMIT ?
+            """, (ticker, interval, count)).fetchall()
+        rows.reverse()
+        df = pd.DataFrame([r[1:] for r in rows], columns=COLUMNS, index=_from_epoch([r[0] for r in rows]))
+        return df
+
+    def bounds(self, ticker, interval):
+        """(가장 오래된 ts, 가장 최근 ts, 개수)"""
+        with self.lock:
+            return self.conn.execute("""
+                SELECT MIN(ts), MAX(ts), COUNT(*) FROM candles
+                WHERE ticker = ? AND interval = ?
+            """, (ticker, interval)).fetchone()
+
+    # --- 동기화 ---
+    def sync(self, ticker, interval, count):
+        """마지막 저장 캔들 이후 구간 + 부족한 과거 구간만 API에서 받아 저장"""
+        key = (ticker, interval)
+        synced_at = self._synced_at.get(key)
+        first_ts, last_ts, stored = self.bounds(ticker, interval)
+        if synced_at is not None and time.monotonic() - synced_at < self.min_refresh_seconds and stored >= count:
+            return
+
+        if not stored:
+            # 최초 백필
+            df = pyupbit.get_ohlcv(ticker, interval=interval, count=count)
+            self._upsert(ticker, interval, df)
+            if df is not None and len(df) < count:
+                self._exhausted.add(key)
+        else:
+            # 마지막 캔들(진행 중일 수 있음)부터 다시 받아 덮어씀
+            step = INTERVAL_SECONDS.get(interval, 86400)
+            now_kst = _to_epoch([datetime.now(KST).replace(tzinfo=None)])[0]
+            missing = (now_kst - last_ts) // step + 1
+            self._upsert(ticker, interval, pyupbit.get_ohlcv(ticker, interval=interval, count=int(missing)))
+
+            # 요청 구간이 저장분보다 길면 과거 구간 추가 백필
+            if stored < count and key not in self._exhausted:
+                # to는 UTC 기준(미포함)이라 KST 첫 캔들 시각에서 9시간을 뺌
+                to = _from_epoch([first_ts])[0] - timedelta(hours=9)
+                older = pyupbit.get_ohlcv(ticker, interval=interval, count=count - stored, to=to)
+                self._upsert(ticker, interval, older)
+                if older is None or len(older) < count - stored:
+                    self._exhausted.add(key)
+
+        self._synced_at[key] = time.monotonic()
+
+    def _upsert(self, ticker, interval, df):
+        if df is None or df.empty:
+            return 0
+        df = df.reindex(columns=COLUMNS)
+        values = df.to_numpy(dtype=float).tolist()
+        rows = [(ticker, interval, ts, *v) for ts, v in zip(_to_epoch(df.index), values)]
+        with self.lock:
+            self.conn.executemany("""
+                INSERT OR REPLACE INTO candles (ticker, interval, ts, open, high, low, close, volume, value)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+            self.conn.commit()
+        return len(rows)
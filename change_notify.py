@@ -0,0 +1,37 @@
+"""trading.db 변경 알림 (트레이더 -> 서버 watcher, 로컬 Unix 소켓)
+
+- CHANGE_NOTIFY_SOCKET 경로가 설정된 경우에만 전송 (서버 main과 같은 값)
+- 커밋 직후 테이블 이름을 datagram 하나로 보냄: 서버는 폴링 간격을 기다리지 않고 바로 새 행 조회
+- 서버가 없거나 수신 버퍼가 차 있으면 조용히 무시 (서버는 PRAGMA data_version 폴링으로도 감지)
+"""
+import os
+import socket
+import threading
+
+
+CHANGE_NOTIFY_SOCKET = os.getenv('CHANGE_NOTIFY_SOCKET', '')
+
+_sock = None
+_sock_lock = threading.Lock()
+
+
+def _socket():
+    global _sock
+    with _sock_lock:
+        if _sock is None:
+            _sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            _sock.setblocking(False)  # 기록 경로를 절대 막지 않음
+        return _sock
+
+
+def notify(table, path=None):
+    """table에 커밋했음을 알림 -> 전송 여부"""
+    path = path or CHANGE_NOTIFY_SOCKET
+    if not path:
+        return False
+    try:
+        _socket().sendto(table.encode(), path)
+        return True
+    except OSError:
+        # FileNotFoundError/ConnectionRefusedError: 서버 미실행, BlockingIOError: 수신 버퍼 가득
+        return False
@@ -0,0 +1,108 @@
+"""OHLCV + 기술적 지표 차트 로컬 렌더링
+
+브라우저 스크린샷 대신 add_technical_indicators 결과 DataFrame에서 직접
+캔들, 볼린저 밴드, 이동평균선, RSI, MACD를 그려 메모리 상의 PNG로 반환한다.
+"""
+import io
+
+import numpy as np
+import matplotlib
+matplotlib.use("Agg")  # 디스플레이 없는 환경(EC2/라즈베리파이)용 백엔드
+from matplotlib.figure import Figure
+from matplotlib.collections import PolyCollection
+
+
+UP_COLOR = "#c84a31"    # 업비트 상승(빨강)
+DOWN_COLOR = "#1261c4"  # 업비트 하락(파랑)
+MA_COLORS = {"ma5": "#f2a900", "ma20": "#8e44ad", "ma60": "#16a085", "ma120": "#7f8c8d"}
+
+
+def _bars(ax, x, bottom, height, colors, width=0.6, alpha=1.0):
+    """막대들을 PolyCollection 하나로 그림 (ax.bar는 막대마다 patch를 만들어 느림)"""
+    half = width / 2
+    top = bottom + height
+    verts = np.stack([
+        np.column_stack([x - half, bottom]),
+        np.column_stack([x - half, top]),
+        np.column_stack([x + half, top]),
+        np.column_stack([x + half, bottom]),
+    ], axis=1)
+    ax.add_collection(PolyCollection(verts, facecolors=colors, linewidths=0, alpha=alpha))
+    ax.update_datalim(np.column_stack([np.r_[x - half, x + half], np.r_[bottom, top]]))
+    ax.autoscale_view()
+
+
+def _draw_candles(ax, x, df):
+    """캔들 몸통/꼬리를 한 번에 그림"""
+    o = df["open"].to_numpy(dtype=float)
+    h = df["high"].to_numpy(dtype=float)
+    l = df["low"].to_numpy(dtype=float)
+    c = df["close"].to_numpy(dtype=float)
+    colors = np.where(c >= o, UP_COLOR, DOWN_COLOR)
+
+    ax.vlines(x, l, h, colors=colors, linewidth=0.8)
+    body_low = np.minimum(o, c)
+    body_height = np.abs(c - o)
+    # 시가=종가인 봉도 보이도록 최소 높이 부여
+    min_height = (np.nanmax(h) - np.nanmin(l)) * 0.001
+    _bars(ax, x, body_low, np.maximum(body_height, min_height), colors)
+
+
+def render_indicator_chart(df, title="", bars=120, dpi=100, size=(12, 8)):
+    """지표가 추가된 DataFrame을 차트 PNG 바이트로 렌더링"""
+    df = df.tail(bars)
+    x = np.arange(len(df))
+
+    fig = Figure(figsize=size, dpi=dpi)
+    grid = fig.add_gridspec(3, 1, height_ratios=[3, 1, 1], hspace=0.05,
+                            left=0.07, right=0.98, top=0.95, bottom=0.06)
+    ax_price = fig.add_subplot(grid[0])
+    ax_rsi = fig.add_subplot(grid[1], sharex=ax_price)
+    ax_macd = fig.add_subplot(grid[2], sharex=ax_price)
+
+    # 1) 가격: 캔들 + 볼린저 밴드 + 이동평균선
+    _draw_candles(ax_price, x, df)
+    if {"bb_high", "bb_low", "bb_mid"}.issubset(df.columns):
+        ax_price.fill_between(x, df["bb_low"].to_numpy(dtype=float), df["bb_high"].to_numpy(dtype=float),
+                              color="#95a5a6", alpha=0.15, linewidth=0)
+        ax_price.plot(x, df["bb_mid"].to_numpy(dtype=float), color="#95a5a6", linewidth=0.8, label="BB mid")
+    for col, color in MA_COLORS.items():
+        if col in df.columns and df[col].notna().any():
+            ax_price.plot(x, df[col].to_numpy(dtype=float), color=color, linewidth=1.0, label=col.upper())
+    ax_price.set_title(title, loc="left")
+    ax_price.legend(loc="upper left", fontsize=8, ncol=5)
+    ax_price.grid(alpha=0.2)
+
+    # 2) RSI
+    if "rsi" in df.columns:
+        ax_rsi.plot(x, df["rsi"].to_numpy(dtype=float), color="#8e44ad", linewidth=1.0)
+        ax_rsi.axhline(70, color=UP_COLOR, linewidth=0.6, linestyle="--")
+        ax_rsi.axhline(30, color=DOWN_COLOR, linewidth=0.6, linestyle="--")
+        ax_rsi.set_ylim(0, 100)
+    ax_rsi.set_ylabel("RSI")
+    ax_rsi.grid(alpha=0.2)
+
+    # 3) MACD
+    if {"macd", "macd_signal", "macd_diff"}.issubset(df.columns):
+        diff = np.nan_to_num(df["macd_diff"].to_numpy(dtype=float))
+        _bars(ax_macd, x, np.zeros_like(diff), diff, np.where(diff >= 0, UP_COLOR, DOWN_COLOR), alpha=0.6)
+        ax_macd.plot(x, df["macd"].to_numpy(dtype=float), color="#2c3e50", linewidth=1.0, label="MACD")
+        ax_macd.plot(x, df["macd_signal"].to_numpy(dtype=float), color="#e67e22", linewidth=1.0, label="Signal")
+        ax_macd.legend(loc="upper left", fontsize=8)
+    ax_macd.set_ylabel("MACD")
+    ax_macd.grid(alpha=0.2)
+
+    # x축 눈금: 시간 인덱스 일부만 표시
+    if len(df):
+        step = max(1, len(df) // 8)
+        ticks = x[::step]
+        labels = [ts.strftime("%m-%d %H:%M") if hasattr(ts, "strftime") else str(ts) for ts in df.index[::step]]
+        ax_macd.set_xticks(ticks)
+        ax_macd.set_xticklabels(labels, fontsize=8)
+    for ax in (ax_price, ax_rsi):
+        ax.tick_params(labelbottom=False)
+
+    buf = io.BytesIO()
+    # 비전 모델 입력용이므로 압축률보다 인코딩 속도 우선
+    fig.savefig(buf, format="png", pil_kwargs={"compress_level": 1})
+    return buf.getvalue()
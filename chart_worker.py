@@ -0,0 +1,266 @@
+"""상주 헤드리스 브라우저 차트 캡처 워커
+
+매 사이클마다 Chrome을 새로 띄우는 대신, 별도 프로세스에서 브라우저를 계속 띄워두고
+업비트 차트(1시간 봉 선택 상태)를 유지한 채 파이프(IPC)로 캡처 요청에 응답한다.
+메모리가 기준치를 넘거나 페이지가 오래되면/응답이 없으면 브라우저를 다시 띄운다.
+"""
+import os
+import signal
+import time
+import atexit
+import threading
+import multiprocessing as mp
+
+
+# 워커 설정 (환경 변수로 조정)
+MAX_RSS_MB = int(os.getenv('CHART_WORKER_MAX_RSS_MB', '700'))          # 브라우저 전체 메모리 한도
+MAX_PAGE_AGE = int(os.getenv('CHART_WORKER_MAX_PAGE_AGE', '3600'))     # 페이지 새로고침 주기(초)
+CAPTURE_TIMEOUT = int(os.getenv('CHART_WORKER_CAPTURE_TIMEOUT', '60'))  # 캡처 응답 대기(초)
+
+
+def _proc_children():
+    """/proc 기준 ppid -> [pid] 맵 (리눅스 전용)"""
+    children = {}
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat", "r") as f:
+                stat = f.read()
+            # comm에 공백/괄호가 들어갈 수 있어 마지막 ')' 이후를 파싱
+            ppid = int(stat[stat.rindex(")") + 2:].split()[1])
+            children.setdefault(ppid, []).append(int(name))
+        except (OSError, ValueError):
+            continue
+    return children
+
+
+def _tree_rss_mb(root_pid):
+    """root_pid와 모든 자식 프로세스의 RSS 합계(MB). /proc이 없으면 0"""
+    if not root_pid or not os.path.isdir("/proc"):
+        return 0.0
+    children = _proc_children()
+    total_kb = 0
+    stack = [root_pid]
+    while stack:
+        pid = stack.pop()
+        stack.extend(children.get(pid, []))
+        try:
+            with open(f"/proc/{pid}/status", "r") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+                        break
+        except OSError:
+            continue
+    return total_kb / 1024.0
+
+
+class _Browser:
+    """워커 프로세스 내부의 브라우저 상태"""
+
+    def __init__(self, url, max_rss_mb, max_page_age):
+        self.url = url
+        self.max_rss_mb = max_rss_mb
+        self.max_page_age = max_page_age
+        self.driver = None
+        self.loaded_at = 0.0
+
+    def start(self):
+        from autotrade import create_driver, load_chart_page
+
+        self.quit()
+        started = time.perf_counter()
+        self.driver = create_driver()
+        load_chart_page(self.driver, self.url)
+        self.loaded_at = time.monotonic()
+        print(f"[chart_worker] 브라우저 준비 완료 ({time.perf_counter() - started:.1f}s)")
+
+    def quit(self):
+        if self.driver:
+            try:
+                self.driver.quit()
+            except Exception:
+                pass
+        self.driver = None
+
+    def rss_mb(self):
+        try:
+            return _tree_rss_mb(self.driver.service.process.pid)
+        except Exception:
+            return 0.0
+
+    def ensure_healthy(self):
+        """메모리 초과/페이지 노후/응답 없음이면 재시작, 아니면 차트 준비 상태 확인"""
+        from autotrade import wait_for_chart_ready
+
+        if self.driver is None:
+            self.start()
+            return
+        rss = self.rss_mb()
+        if self.max_rss_mb and rss > self.max_rss_mb:
+            print(f"[chart_worker] 메모리 {rss:.0f}MB > {self.max_rss_mb}MB, 재시작")
+            self.start()
+            return
+        if time.monotonic() - self.loaded_at > self.max_page_age:
+            print("[chart_worker] 페이지가 오래되어 재시작")
+            self.start()
+            return
+        try:
+            wait_for_chart_ready(self.driver, timeout=5)
+        except Exception as e:
+            print(f"[chart_worker] 차트 응답 없음({e}), 재시작")
+            self.start()
+
+    def capture(self):
+        from autotrade import grab_chart_png
+
+        self.ensure_healthy()
+        return grab_chart_png(self.driver)
+
+
+def _worker_main(conn, url, max_rss_mb, max_page_age):
+    """워커 프로세스 진입점: ("capture",) 요청에 ("ok", png, 소요시간) 또는 ("error", 메시지, 소요시간)으로 응답"""
+    if hasattr(os, "setsid"):
+        os.setsid()  # chromedriver/Chrome이 워커와 같은 프로세스 그룹에 남도록 (부모가 그룹째 정리)
+
+    def _on_sigterm(signum, frame):
+        # terminate()(시간 초과 재시작, daemon 종료) 시에도 아래 finally의 browser.quit()이 실행되도록
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, _on_sigterm)
+    browser = _Browser(url, max_rss_mb, max_page_age)
+    try:
+        try:
+            browser.start()  # 첫 요청 전에 미리 준비
+        except Exception as e:
+            print(f"[chart_worker] 초기 로딩 실패: {e}")
+            browser.quit()
+
+        while True:
+            # 요청이 없을 때도 주기적으로 메모리/노후 상태를 점검
+            if not conn.poll(60):
+                try:
+                    browser.ensure_healthy()
+                except Exception as e:
+                    print(f"[chart_worker] 상태 점검 실패: {e}")
+                    browser.quit()
+                continue
+
+            try:
+                request = conn.recv()
+            except EOFError:
+                break
+            if request[0] == "stop":
+                break
+
+            started = time.perf_counter()
+            try:
+                png = browser.capture()
+                conn.send(("ok", png, time.perf_counter() - started))
+            except Exception as e:
+                browser.quit()  # 다음 요청에서 새로 띄움
+                conn.send(("error", str(e), time.perf_counter() - started))
+    finally:
+        browser.quit()
+
+
+class ChartWorker:
+    """상주 차트 캡처 워커 프로세스 핸들"""
+
+    def __init__(self, url, max_rss_mb=MAX_RSS_MB, max_page_age=MAX_PAGE_AGE, capture_timeout=CAPTURE_TIMEOUT):
+        self.url = url
+        self.max_rss_mb = max_rss_mb
+        self.max_page_age = max_page_age
+        self.capture_timeout = capture_timeout
+        self._ctx = mp.get_context("spawn")  # 스레드가 떠 있는 상태에서 fork하지 않도록 spawn 사용
+        self._lock = threading.Lock()
+        self._process = None
+        self._conn = None
+
+    def start(self):
+        """워커 프로세스 시작 (이미 살아있으면 무시)"""
+        if self._process is not None and self._process.is_alive():
+            return
+        self._close()
+        parent_conn, child_conn = self._ctx.Pipe()
+        self._process = self._ctx.Process(
+            target=_worker_main,
+            args=(child_conn, self.url, self.max_rss_mb, self.max_page_age),
+            name="chart-worker",
+            daemon=True,
+        )
+        self._process.start()
+        child_conn.close()
+        self._conn = parent_conn
+
+    def capture(self):
+        """현재 차트 PNG 바이트 반환 (실패 시 None)"""
+        with self._lock:
+            try:
+                self.start()
+                self._conn.send(("capture",))
+                if not self._conn.poll(self.capture_timeout):
+                    print("[chart_worker] 캡처 응답 시간 초과, 워커 재시작")
+                    self._kill()
+                    return None
+                status, payload, elapsed = self._conn.recv()
+            except (EOFError, OSError, BrokenPipeError) as e:
+                print(f"[chart_worker] IPC 오류: {e}")
+                self._kill()
+                return None
+
+        if status != "ok":
+            print(f"[chart_worker] 캡처 실패: {payload}")
+            return None
+        print(f"[chart_worker] 캡처 완료 ({elapsed * 1000:.0f}ms)")
+        return payload
+
+    def stop(self):
+        with self._lock:
+            if self._process is not None and self._process.is_alive():
+                try:
+                    self._conn.send(("stop",))
+                    self._process.join(10)
+                except Exception:
+                    pass
+            self._kill()
+
+    def _kill(self):
+        if self._process is not None:
+            if self._process.is_alive():
+                self._process.terminate()  # 워커가 SIGTERM을 받아 브라우저를 정리하고 종료
+                self._process.join(5)
+            # 정리가 멈췄거나 남은 chromedriver/Chrome이 있으면 워커 프로세스 그룹째 강제 종료
+            if hasattr(os, "killpg"):
+                try:
+                    os.killpg(self._process.pid, signal.SIGKILL)
+                except (ProcessLookupError, PermissionError):
+                    pass
+            self._process.join(1)
+        self._close()
+
+    def _close(self):
+        if self._conn is not None:
+            self._conn.close()
+        self._conn = None
+        self._process = None
+
+
+_workers = {}
+
+
+def get_chart_worker(url):
+    """URL별 워커 싱글턴 (최초 호출 시 프로세스 시작)"""
+    worker = _workers.get(url)
+    if worker is None:
+        worker = _workers[url] = ChartWorker(url)
+        worker.start()
+    return worker
+
+
+@atexit.register
+def _stop_workers():
+    for worker in _workers.values():
+        worker.stop()
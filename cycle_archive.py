@@ -0,0 +1,402 @@
+"""매매 사이클 입력/출력 압축 보관 + 결정적 재실행(replay)
+
+- 사이클마다 스냅샷, 과거 반성, 차트/유튜브 분석, 최적화된 프롬프트(market_data), 모델 원본 응답,
+  판단 결과(reflection_based_adjustments 포함), 주문 직전 잔고와 주문 결과를 JSON 하나로 묶어 zlib 압축
+- trading.db와 분리된 cycle_archive.db(CYCLE_ARCHIVE_PATH)에 저장 (몇 년치 1시간 사이클도 작게 유지)
+- 기록은 contextvars로 전파: 사이클 안의 어느 단계(스레드 풀 포함)든 record(...)로 필드 추가
+- replay: 보관한 사이클을 get_ai_analysis/execute_trade에 다시 흘려 프롬프트/판단/주문이 같은지 비교하고
+  소요 시간 측정 (LLM은 보관한 응답을 돌려주는 스텁, 업비트는 메모리 가짜 객체, 거래 DB는 임시 파일)
+"""
+import contextvars
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from datetime import date, datetime
+
+from migrations import configure
+
+
+CYCLE_ARCHIVE = os.getenv('CYCLE_ARCHIVE', 'true').lower() == 'true'
+CYCLE_ARCHIVE_PATH = os.getenv('CYCLE_ARCHIVE_PATH', 'cycle_archive.db')
+COMPRESS_LEVEL = 9  # 사이클당 한 번 기록이라 압축률 우선
+
+_current = contextvars.ContextVar("cycle_record", default=None)
+
+
+def _json_default(value):
+    if hasattr(value, "item"):  # numpy 스칼라
+        return value.item()
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def encode(record):
+    """사이클 기록 -> (zlib 압축 JSON, 원본 크기)"""
+    raw = json.dumps(record, ensure_ascii=False, default=_json_default).encode("utf-8")
+    return zlib.compress(raw, COMPRESS_LEVEL), len(raw)
+
+
+def decode(payload):
+    return json.loads(zlib.decompress(payload))
+
+
+def snapshot_fields(snapshot):
+    """MarketSnapshot -> 보관용 dict (지표 DataFrame 원본은 제외, 프롬프트용 ohlcv 인코딩은 포함)"""
+    return {
+        "ticker": snapshot.ticker,
+        "status": snapshot.status,
+        "price": snapshot.price,
+        "orderbook": snapshot.orderbook,
+        "ohlcv": snapshot.ohlcv,
+        "fear_greed": snapshot.fear_greed,
+        "news": snapshot.news,
+        "captured_at": snapshot.captured_at,
+    }
+
+
+def current_record():
+    return _current.get()
+
+
+def record(**fields):
+    """진행 중인 사이클 기록에 필드 추가 (사이클 밖이면 무시)"""
+    current = _current.get()
+    if current is not None:
+        current.update(fields)
+
+
+@contextmanager
+def capture(ticker, **fields):
+    """with 블록 안의 record(...) 호출을 dict 하나로 모음 (저장은 하지 않음)"""
+    current = {"ticker": ticker, "started_at": time.time(), **fields}
+    token = _current.set(current)
+    try:
+        yield current
+    finally:
+        _current.reset(token)
+
+
+class CycleArchive:
+    """사이클 기록 저장소 (스레드 안전, 포트폴리오 티커 스레드가 공유)"""
+
+    def __init__(self, db_path=CYCLE_ARCHIVE_PATH, enabled=CYCLE_ARCHIVE):
+        self.db_path = db_path
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            configure(self._conn)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS cycles (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    ticker TEXT NOT NULL,
+                    started_at_ms INTEGER NOT NULL,
+                    duration_ms REAL,
+                    decision TEXT,
+                    trading_id INTEGER,
+                    raw_size INTEGER NOT NULL,
+                    payload BLOB NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cycles_ticker_ts ON cycles (ticker, started_at_ms)")
+            self._conn.commit()
+        return self._conn
+
+    @contextmanager
+    def cycle(self, ticker, **fields):
+        """사이클 하나를 기록하고 끝나면 압축 저장"""
+        with capture(ticker, **fields) as current:
+            try:
+                yield current
+            finally:
+                current["duration_ms"] = (time.time() - current["started_at"]) * 1000
+                self.save(current)
+
+    def save(self, current):
+        """사이클 기록 저장 -> cycles.id (비활성/실패 시 None)"""
+        if not self.enabled:
+            return None
+        try:
+            payload, raw_size = encode(current)
+            result = current.get("result") or {}
+            with self._lock:
+                conn = self._connect()
+                cursor = conn.execute("""
+                    INSERT INTO cycles (
+                        ticker, started_at_ms, duration_ms, decision, trading_id, raw_size, payload
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, (current["ticker"], int(current["started_at"] * 1000), current.get("duration_ms"),
+                      result.get("decision"), current.get("trading_id"), raw_size, payload))
+                conn.commit()
+                return cursor.lastrowid
+        except Exception as e:
+            print(f"Error in CycleArchive.save: {e}")
+            return None
+
+    def load(self, cycle_id):
+        """cycles.id -> 사이클 기록 dict (없으면 None)"""
+        with self._lock:
+            row = self._connect().execute("SELECT payload FROM cycles WHERE id = ?", (cycle_id,)).fetchone()
+        return decode(row[0]) if row else None
+
+    def ids(self, ticker=None, limit=None):
+        """최근 순 사이클 id 목록"""
+        sql = "SELECT id FROM cycles"
+        params = []
+        if ticker:
+            sql += " WHERE ticker = ?"
+            params.append(ticker)
+        sql += " ORDER BY started_at_ms DESC, id DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            return [row[0] for row in self._connect().execute(sql, params)]
+
+    def print_recent(self, ticker=None, limit=20):
+        with self._lock:
+            conn = self._connect()
+            rows = conn.execute(f"""
+                SELECT id, ticker, started_at_ms, duration_ms, decision, trading_id, raw_size, length(payload)
+                FROM cycles {"WHERE ticker = ?" if ticker else ""}
+                ORDER BY started_at_ms DESC, id DESC LIMIT ?
+            """, ([ticker] if ticker else []) + [limit]).fetchall()
+            count, raw, stored = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(raw_size), 0), COALESCE(SUM(length(payload)), 0) FROM cycles").fetchone()
+
+        print(f"\n=== Cycle Archive ({self.db_path}) ===")
+        print(f"{count} cycles, {raw / 1024:,.0f} KiB raw -> {stored / 1024:,.0f} KiB stored"
+              f" (x{raw / stored if stored else 0:.1f})")
+        for cycle_id, ticker_, started_ms, duration_ms, decision, trading_id, raw_size, size in rows:
+            started = datetime.fromtimestamp(started_ms / 1000).strftime("%Y-%m-%d %H:%M:%S")
+            print(f"#{cycle_id:<6} {started}  {ticker_:<10} {decision or '-':<5} trade={trading_id or '-':<7} "
+                  f"{(duration_ms or 0) / 1000:6.1f}s  {raw_size / 1024:6.1f} -> {size / 1024:5.1f} KiB")
+
+
+_archive = None
+_archive_lock = threading.Lock()
+
+
+def get_cycle_archive():
+    """프로세스 공용 CycleArchive"""
+    global _archive
+    with _archive_lock:
+        if _archive is None:
+            _archive = CycleArchive()
+        return _archive
+
+
+# --- replay ---
+class ReplayUpbit:
+    """보관한 잔고를 돌려주고 주문은 판단 시점 가격에 바로 체결된 것으로 응답하는 가짜 업비트 클라이언트"""
+
+    def __init__(self, accounts, fill_price=None):
+        self.accounts = accounts or []
+        self.fill_price = fill_price
+        self.orders = {}
+
+    def get_balances(self):
+        return self.accounts
+
+    def _order(self, ticker, side, amount):
+        order_uuid = f"replay-{len(self.orders) + 1}"
+        self.orders[order_uuid] = {"uuid": order_uuid, "market": ticker, "side": side, "amount": float(amount)}
+        return {"uuid": order_uuid, "state": "wait"}
+
+    def buy_market_order(self, ticker, price):
+        return self._order(ticker, "bid", price)
+
+    def sell_market_order(self, ticker, volume):
+        return self._order(ticker, "ask", volume)
+
+    def get_order(self, order_uuid):
+        order = self.orders[order_uuid]
+        price = self.fill_price or 1.0
+        volume = order["amount"] / price if order["side"] == "bid" else order["amount"]
+        return {"uuid": order_uuid, "state": "done", "executed_volume": str(volume), "paid_fee": "0",
+                "trades": [{"funds": str(volume * price), "volume": str(volume)}]}
+
+
+def _replay_snapshot(archived):
+    from autotrade import MarketSnapshot
+
+    fields = archived["snapshot"]
+    return MarketSnapshot(
+        ticker=fields["ticker"],
+        status=fields["status"],
+        price=fields["price"],
+        orderbook=fields["orderbook"],
+        daily=None,
+        hourly=None,
+        ohlcv=fields["ohlcv"],
+        fear_greed=fields["fear_greed"],
+        news=fields["news"],
+        captured_at=fields.get("captured_at") or {},
+    )
+
+
+def replay(archived, llm=None, workdir=None):
+    """보관한 사이클 하나를 get_ai_analysis -> execute_trade로 다시 실행
+
+    llm: None이면 보관한 판단을 그대로 돌려주는 스텁 (결정적), 실제 게이트웨이를 넘기면 같은 입력으로 재판단
+    반환: {"mismatches": [...], "timings": {...}, "replayed": 재실행 기록}
+    """
+    from autotrade import DatabaseManager, EnhancedCryptoTrader
+    from candle_store import CandleStore
+    from llm_gateway import LLMGateway, StubOpenAI
+    from trade_rules import TradingParams
+
+    ticker = archived["ticker"]
+    snapshot = _replay_snapshot(archived)
+    analysis = archived.get("analysis") or {}
+    trade = archived.get("trade") or {}
+
+    if llm is None:
+        result = archived.get("result")
+        llm = LLMGateway(StubOpenAI(responses={"trading_decision": result} if result else None), cache_size=0)
+    upbit = ReplayUpbit(trade.get("accounts"), snapshot.price)
+
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        db = DatabaseManager(os.path.join(tmp, "replay.db"))
+        trader = EnhancedCryptoTrader(ticker, db=db, candles=CandleStore(":memory:"), upbit=upbit, llm=llm)
+        if archived.get("params"):
+            trader.params = trader.trade_manager.params = TradingParams(**archived["params"])
+        trader.executor.poll_initial = 0
+
+        # 외부 입력은 보관한 값으로 고정
+        trader.capture_and_analyze_chart = lambda hourly=None: analysis.get("chart_analysis")
+        trader.get_youtube_analysis = lambda: analysis.get("youtube_analysis")
+        reflections = analysis.get("past_reflections") or {"columns": [], "rows": []}
+        db.get_reflection_table = lambda limit=10, ticker=None: (reflections["columns"], reflections["rows"])
+
+        timings = {}
+        with capture(ticker) as replayed:
+            started = time.perf_counter()
+            result = trader.get_ai_analysis(snapshot)
+            timings["analysis_ms"] = (time.perf_counter() - started) * 1000
+            replayed["result"] = result
+            if result:
+                started = time.perf_counter()
+                trader.execute_trade(
+                    result['decision'],
+                    result['percentage'],
+                    result['confidence_score'],
+                    snapshot.fear_greed_value,
+                    result['reason'],
+                    price=snapshot.price,
+                    decided_at=time.time()
+                )
+                timings["trade_ms"] = (time.perf_counter() - started) * 1000
+        trader.executor.wait_all(5)
+        db.conn.close()
+
+    return {"mismatches": compare(archived, replayed), "timings": timings, "replayed": replayed}
+
+
+def _order_key(trade):
+    order = (trade or {}).get("order")
+    return (order["side"], round(order["requested"], 8)) if order else None
+
+
+def compare(archived, replayed):
+    """보관 기록과 재실행 기록에서 달라진 항목 이름 목록"""
+    # JSON 왕복 후 값으로 비교 (튜플/넘파이 스칼라 차이 무시)
+    archived = json.loads(json.dumps(archived, default=_json_default))
+    replayed = json.loads(json.dumps(replayed, default=_json_default))
+    mismatches = []
+    if (archived.get("analysis") or {}).get("market_data") != (replayed.get("analysis") or {}).get("market_data"):
+        mismatches.append("market_data")
+    if archived.get("result") != replayed.get("result"):
+        mismatches.append("result")
+    if _order_key(archived.get("trade")) != _order_key(replayed.get("trade")):
+        mismatches.append("order")
+    return mismatches
+
+
+if __name__ == "__main__":
+    # 사용 예: python cycle_archive.py list [KRW-BTC] [20]
+    #          python cycle_archive.py show 42
+    #          python cycle_archive.py replay 42          (보관한 응답으로 결정적 재실행)
+    #          python cycle_archive.py replay all KRW-BTC  (전체 회귀 확인 + 소요 시간)
+    #          python cycle_archive.py replay 42 live      (같은 입력으로 실제 모델 재판단)
+    import statistics
+    import sys
+
+    from dotenv import load_dotenv
+    from tracing import get_tracer
+
+    # autotrade가 import하는 모듈과 같은 contextvar/저장소를 쓰도록 __main__ 대신 모듈로 접근
+    import cycle_archive
+
+    load_dotenv()
+    archive = cycle_archive.get_cycle_archive()
+    command = sys.argv[1] if len(sys.argv) > 1 else "list"
+
+    if command == "list":
+        ticker = sys.argv[2] if len(sys.argv) > 2 else None
+        limit = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+        archive.print_recent(ticker, limit)
+
+    elif command == "show":
+        print(json.dumps(archive.load(int(sys.argv[2])), indent=2, ensure_ascii=False))
+
+    elif command == "replay":
+        get_tracer().enabled = False  # 재실행 span은 trading.db에 남기지 않음
+        target = sys.argv[2] if len(sys.argv) > 2 else "all"
+        extra = sys.argv[3:]
+        live = "live" in extra
+        llm = None
+        if live:
+            from llm_gateway import get_llm_gateway
+            llm = get_llm_gateway()
+
+        if target == "all":
+            tickers = [arg for arg in extra if arg != "live"]
+            cycle_ids = list(reversed(archive.ids(tickers[0] if tickers else None)))
+        else:
+            cycle_ids = [int(target)]
+
+        failed, skipped, analysis_ms, trade_ms = [], [], [], []
+        for cycle_id in cycle_ids:
+            archived = archive.load(cycle_id)
+            if archived is None:
+                print(f"#{cycle_id}: not found")
+                failed.append(cycle_id)
+                continue
+            if "snapshot" not in archived or "analysis" not in archived:
+                print(f"#{cycle_id}: no decision inputs recorded (incomplete snapshot), skipped")
+                skipped.append(cycle_id)
+                continue
+            outcome = cycle_archive.replay(archived, llm=llm)
+            timings = outcome["timings"]
+            analysis_ms.append(timings.get("analysis_ms", 0))
+            if "trade_ms" in timings:
+                trade_ms.append(timings["trade_ms"])
+            status = "ok" if not outcome["mismatches"] else "MISMATCH " + ", ".join(outcome["mismatches"])
+            if outcome["mismatches"]:
+                failed.append(cycle_id)
+            print(f"#{cycle_id} {archived['ticker']}: {status} "
+                  f"(analysis {timings.get('analysis_ms', 0):.1f}ms, trade {timings.get('trade_ms', 0):.1f}ms)")
+
+        # 입력이 없어 건너뛴 사이클은 일치로 세지 않음
+        matched = len(cycle_ids) - len(failed) - len(skipped)
+        print(f"\n=== Replay: {matched} matched / {len(skipped)} skipped / {len(cycle_ids)} total"
+              f"{f' ({len(failed)} failed)' if failed else ''} ===")
+        if analysis_ms:
+            print(f"get_ai_analysis median {statistics.median(analysis_ms):.1f}ms, "
+                  f"execute_trade median {statistics.median(trade_ms) if trade_ms else 0:.1f}ms")
+        # 실제 모델 재판단은 달라지는 것이 정상이라 종료 코드에 반영하지 않음
+        sys.exit(1 if failed and not live else 0)
+
+    else:
+        print(f"unknown command: {command}")
+        sys.exit(2)
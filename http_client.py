@@ -0,0 +1,179 @@
+"""공용 HTTP 클라이언트 (업비트 + 외부 API)
+
+- requests.Session 커넥션 풀 재사용 (keep-alive, TLS 핸드셰이크 1회)
+- 기본 타임아웃, 지터가 들어간 지수 백오프 재시도 (서명 요청은 nonce 재사용 거절 때문에 재시도 없음)
+- 업비트 Remaining-Req 헤더 기반 그룹별 토큰 버킷 속도 제한
+- pyupbit 내부 HTTP 호출도 같은 클라이언트를 거치도록 연결 (install_pyupbit)
+"""
+import random
+import re
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+DEFAULT_TIMEOUT = (3.05, 10)  # (연결, 읽기) 초
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.3
+BACKOFF_CAP = 5.0
+RETRY_STATUS = {429, 500, 502, 503, 504}
+DEFAULT_RATE = 8.0  # 그룹 한도를 모를 때 초당 요청 수 (업비트 주문 그룹 한도)
+
+REMAINING_REQ_RE = re.compile(r"group=([a-z\-]+); min=([0-9]+); sec=([0-9]+)")
+
+
+class TokenBucket:
+    """초당 rate개 토큰이 채워지는 버킷. 서버가 알려준 잔여량으로 보정된다."""
+
+    def __init__(self, rate=DEFAULT_RATE):
+        self.rate = rate
+        self.capacity = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """토큰 1개 확보 (없으면 채워질 때까지 대기)"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def observe(self, remaining_sec):
+        """Remaining-Req의 sec 값(이번 초 남은 요청 수)으로 보정"""
+        with self.lock:
+            self._refill(time.monotonic())
+            # 처음 본 그룹은 관측된 최대 잔여량 + 1을 초당 한도로 추정
+            if remaining_sec + 1 > self.capacity:
+                self.capacity = self.rate = float(remaining_sec + 1)
+            self.tokens = min(self.tokens, float(remaining_sec))
+
+    def penalize(self, seconds):
+        """429 수신 시 일정 시간 요청 중지"""
+        with self.lock:
+            self.tokens = -self.rate * seconds
+            self.updated = time.monotonic()
+
+
+class HttpClient:
+    """커넥션 풀 + 타임아웃 + 재시도 + 업비트 속도 제한"""
+
+    def __init__(self, pool_size=16, timeout=DEFAULT_TIMEOUT, max_retries=MAX_RETRIES):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self._buckets = {}       # 업비트 그룹 -> TokenBucket
+        self._path_groups = {}   # 요청 경로 -> 업비트 그룹 (응답 헤더로 학습)
+        self._lock = threading.Lock()
+
+    # --- 업비트 속도 제한 ---
+    def _bucket(self, group):
+        with self._lock:
+            bucket = self._buckets.get(group)
+            if bucket is None:
+                bucket = self._buckets[group] = TokenBucket()
+            return bucket
+
+    def _upbit_bucket(self, url):
+        parts = urlsplit(url)
+        if not parts.netloc.endswith("upbit.com"):
+            return None, None
+        group = self._path_groups.get(parts.path, "default")
+        return parts.path, self._bucket(group)
+
+    def _observe(self, path, response):
+        matched = REMAINING_REQ_RE.search(response.headers.get("Remaining-Req", ""))
+        if matched is None:
+            return
+        group, remaining_sec = matched.group(1), int(matched.group(3))
+        self._path_groups[path] = group
+        self._bucket(group).observe(remaining_sec)
+
+    # --- 요청 ---
+    @staticmethod
+    def _backoff(attempt):
+        # full jitter: 0 ~ min(cap, base * 2^attempt)
+        return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        # 주문(POST/DELETE)은 서버가 처리하지 않았다고 확신할 수 있는 경우만 재시도
+        idempotent = method.upper() in ("GET", "HEAD", "OPTIONS")
+        # 서명 요청(JWT nonce)은 같은 헤더로 다시 보내면 업비트가 401로 거절하므로 한 번만 전송
+        signed = any(name.lower() == "authorization" for name in (kwargs.get("headers") or {}))
+        max_retries = 0 if signed else self.max_retries
+        path, bucket = self._upbit_bucket(url)
+
+        attempt = 0
+        while True:
+            if bucket is not None:
+                bucket.acquire()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                retryable = idempotent or isinstance(e, requests.ConnectTimeout)
+                if not retryable or attempt >= max_retries:
+                    raise
+                time.sleep(self._backoff(attempt))
+                attempt += 1
+                continue
+
+            if path is not None:
+                self._observe(path, response)
+                # 그룹이 새로 학습됐으면 다음 요청부터 해당 버킷 사용
+                bucket = self._bucket(self._path_groups.get(path, "default"))
+
+            retry_status = response.status_code in RETRY_STATUS if idempotent else response.status_code == 429
+            if response.status_code == 429 and bucket is not None:
+                bucket.penalize(1.0)
+            if not retry_status or attempt >= max_retries:
+                return response
+            retry_after = response.headers.get("Retry-After")
+            delay = float(retry_after) if retry_after and retry_after.isdigit() else self._backoff(attempt)
+            time.sleep(delay)
+            attempt += 1
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request("DELETE", url, **kwargs)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_http_client():
+    """프로세스 공용 HTTP 클라이언트"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
+
+
+def install_pyupbit(client=None):
+    """pyupbit의 모든 REST 호출(시세/주문)이 공용 클라이언트를 거치도록 연결"""
+    import pyupbit.request_api
+
+    # pyupbit.request_api는 모듈 전역 requests.get/post/delete만 사용
+    pyupbit.request_api.requests = client or get_http_client()
@@ -0,0 +1,325 @@
+"""기술적 지표 엔진
+
+- compute_indicators / add_indicators: 대량 백필용 NumPy 벡터화 계산
+- IndicatorEngine: 새 캔들마다 O(1)로 갱신되는 스트리밍 계산
+
+두 경로 모두 기존 ta 라이브러리(볼린저 밴드, RSI, MACD, SMA, ATR)와 같은 결과를 낸다.
+"""
+import math
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+BB_WINDOW = 20
+BB_DEV = 2
+RSI_WINDOW = 14
+MACD_FAST, MACD_SLOW, MACD_SIGN = 12, 26, 9
+MA_WINDOWS = (5, 20, 60, 120)
+ATR_WINDOW = 14
+
+INDICATOR_COLUMNS = [
+    "bb_high", "bb_mid", "bb_low", "bb_pband", "rsi",
+    "macd", "macd_signal", "macd_diff",
+    *[f"ma{w}" for w in MA_WINDOWS], "atr",
+]
+
+
+# --- 벡터화 경로 ---
+def _ewm(x, alpha, block=64):
+    """adjust=False 지수평활 (y0 = x0). 블록 단위 하삼각 행렬곱으로 벡터화"""
+    n = len(x)
+    out = np.empty(n)
+    if n == 0:
+        return out
+    d = 1.0 - alpha
+    j = np.arange(block)
+    lag = j[:, None] - j[None, :]
+    # 블록 내부 기여분: y[j] += alpha * d^(j-k) * x[k] (k <= j)
+    weights = np.where(lag >= 0, alpha * d ** np.clip(lag, 0, None), 0.0)
+    carry = d ** (j + 1)  # 직전 블록 마지막 값의 기여분
+
+    nb = -(-n // block)
+    padded = np.zeros(nb * block)
+    padded[:n] = x
+    inner = padded.reshape(nb, block) @ weights.T
+    prev = x[0]
+    res = inner  # 제자리 갱신
+    for i in range(nb):
+        res[i] += carry * prev
+        prev = res[i, -1]
+    out[:] = res.reshape(-1)[:n]
+    return out
+
+
+def _ema_masked(x, alpha, min_periods):
+    """첫 유효값부터 평활하고 min_periods 이전은 NaN (pandas ewm(adjust=False)와 동일)"""
+    out = np.full(len(x), np.nan)
+    valid = np.flatnonzero(~np.isnan(x))
+    if len(valid) == 0:
+        return out
+    start = valid[0]
+    out[start:] = _ewm(x[start:], alpha)
+    out[start:start + min_periods - 1] = np.nan
+    return out
+
+
+def _rolling(x, window, fn):
+    out = np.full(len(x), np.nan)
+    if len(x) >= window:
+        out[window - 1:] = fn(sliding_window_view(x, window), axis=1)
+    return out
+
+
+def compute_indicators(high, low, close):
+    """고가/저가/종가 배열 -> {지표명: 배열}"""
+    high = np.asarray(high, dtype=float)
+    low = np.asarray(low, dtype=float)
+    close = np.asarray(close, dtype=float)
+    n = len(close)
+    out = {}
+
+    # 볼린저 밴드
+    mid = _rolling(close, BB_WINDOW, np.mean)
+    std = _rolling(close, BB_WINDOW, np.std)
+    out["bb_high"] = mid + BB_DEV * std
+    out["bb_mid"] = mid
+    out["bb_low"] = mid - BB_DEV * std
+    width = out["bb_high"] - out["bb_low"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out["bb_pband"] = (close - out["bb_low"]) / width
+    out["bb_pband"][width == 0] = np.nan
+
+    # RSI (Wilder)
+    diff = np.diff(close, prepend=np.nan)
+    up = np.where(diff > 0, diff, 0.0)
+    down = np.where(diff < 0, -diff, 0.0)
+    ema_up = _ema_masked(up, 1.0 / RSI_WINDOW, RSI_WINDOW)
+    ema_dn = _ema_masked(down, 1.0 / RSI_WINDOW, RSI_WINDOW)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out["rsi"] = np.where(ema_dn == 0, 100.0, 100.0 - 100.0 / (1.0 + ema_up / ema_dn))
+
+    # MACD
+    ema_fast = _ema_masked(close, 2.0 / (MACD_FAST + 1), MACD_FAST)
+    ema_slow = _ema_masked(close, 2.0 / (MACD_SLOW + 1), MACD_SLOW)
+    out["macd"] = ema_fast - ema_slow
+    out["macd_signal"] = _ema_masked(out["macd"], 2.0 / (MACD_SIGN + 1), MACD_SIGN)
+    out["macd_diff"] = out["macd"] - out["macd_signal"]
+
+    # 이동평균선
+    for w in MA_WINDOWS:
+        out[f"ma{w}"] = mid if w == BB_WINDOW else _rolling(close, w, np.mean)
+
+    # ATR (ta와 동일하게 초기 구간은 0)
+    prev_close = np.concatenate([[np.nan], close[:-1]])
+    tr = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    atr = np.zeros(n)
+    if n >= ATR_WINDOW:
+        seed = tr[:ATR_WINDOW].mean()
+        atr[ATR_WINDOW - 1:] = _ewm(np.concatenate([[seed], tr[ATR_WINDOW:]]), 1.0 / ATR_WINDOW)
+    out["atr"] = atr
+    return out
+
+
+def add_indicators(df):
+    """OHLCV DataFrame에 지표 컬럼 추가 (add_technical_indicators와 같은 컬럼)"""
+    values = compute_indicators(df["high"].to_numpy(), df["low"].to_numpy(), df["close"].to_numpy())
+    for col in INDICATOR_COLUMNS:
+        df[col] = values[col]
+    return df
+
+
+def compare_with_ta(df):
+    """ta 라이브러리 결과와의 컬럼별 최대 상대오차 (검증용)"""
+    import ta
+
+    close = df["close"]
+    bb = ta.volatility.BollingerBands(close=close)
+    macd = ta.trend.MACD(close=close)
+    reference = {
+        "bb_high": bb.bollinger_hband(), "bb_mid": bb.bollinger_mavg(),
+        "bb_low": bb.bollinger_lband(), "bb_pband": bb.bollinger_pband(),
+        "rsi": ta.momentum.RSIIndicator(close=close).rsi(),
+        "macd": macd.macd(), "macd_signal": macd.macd_signal(), "macd_diff": macd.macd_diff(),
+        "atr": ta.volatility.AverageTrueRange(high=df["high"], low=df["low"], close=close).average_true_range(),
+    }
+    for w in MA_WINDOWS:
+        reference[f"ma{w}"] = ta.trend.SMAIndicator(close=close, window=w).sma_indicator()
+
+    ours = compute_indicators(df["high"].to_numpy(), df["low"].to_numpy(), close.to_numpy())
+    errors = {}
+    for col, ref in reference.items():
+        a, b = ours[col], ref.to_numpy(dtype=float)
+        if not np.array_equal(np.isnan(a), np.isnan(b)):
+            errors[col] = math.inf
+            continue
+        mask = ~np.isnan(a)
+        scale = np.maximum(np.abs(b[mask]), 1.0)
+        errors[col] = float(np.max(np.abs(a[mask] - b[mask]) / scale)) if mask.any() else 0.0
+    return errors
+
+
+# --- 스트리밍 경로 ---
+class _Ema:
+    """adjust=False 지수평활 누산기"""
+    __slots__ = ("alpha", "min_periods", "value", "count")
+
+    def __init__(self, alpha, min_periods):
+        self.alpha = alpha
+        self.min_periods = min_periods
+        self.value = math.nan
+        self.count = 0
+
+    def update(self, x):
+        if x != x:  # NaN 입력은 무시 (첫 유효값부터 시작)
+            return self.output()
+        self.value = x if self.count == 0 else self.value + self.alpha * (x - self.value)
+        self.count += 1
+        return self.output()
+
+    def output(self):
+        return self.value if self.count >= self.min_periods else math.nan
+
+
+class IndicatorEngine:
+    """캔들 단위 O(1) 지표 갱신 엔진
+
+    update()는 새 캔들을 추가하고, 같은 시각의 캔들이 다시 들어오면(진행 중 봉 갱신)
+    직전 상태로 되돌린 뒤 다시 반영한다.
+    """
+
+    def __init__(self):
+        self.size = max(MA_WINDOWS + (BB_WINDOW,))
+        self.buf = [0.0] * self.size  # 최근 종가 링버퍼
+        self.pos = 0
+        self.count = 0
+        self.sums = {w: 0.0 for w in MA_WINDOWS}
+        # 볼린저 분산: 기준값 K 대비 편차 합/제곱합 (큰 가격에서 정밀도 손실 방지)
+        self.bb_k = 0.0
+        self.bb_s1 = 0.0
+        self.bb_s2 = 0.0
+
+        self.ema_up = _Ema(1.0 / RSI_WINDOW, RSI_WINDOW)
+        self.ema_dn = _Ema(1.0 / RSI_WINDOW, RSI_WINDOW)
+        self.ema_fast = _Ema(2.0 / (MACD_FAST + 1), MACD_FAST)
+        self.ema_slow = _Ema(2.0 / (MACD_SLOW + 1), MACD_SLOW)
+        self.ema_sign = _Ema(2.0 / (MACD_SIGN + 1), MACD_SIGN)
+        self.prev_close = math.nan
+        self.tr_sum = 0.0
+        self.atr = 0.0
+
+        self.last_ts = None
+        self.last = None
+        self._undo = None
+
+    @classmethod
+    def from_frame(cls, df):
+        """과거 캔들로 상태를 채운 엔진 생성"""
+        engine = cls()
+        for ts, h, l, c in zip(df.index, df["high"].to_numpy(dtype=float),
+                               df["low"].to_numpy(dtype=float), df["close"].to_numpy(dtype=float)):
+            engine.update(ts, h, l, c)
+        return engine
+
+    def _snapshot(self):
+        return (
+            self.buf[self.pos], self.pos, self.count, dict(self.sums),
+            self.bb_k, self.bb_s1, self.bb_s2,
+            [(e.value, e.count) for e in (self.ema_up, self.ema_dn, self.ema_fast, self.ema_slow, self.ema_sign)],
+            self.prev_close, self.tr_sum, self.atr, self.last_ts, self.last,
+        )
+
+    def _restore(self, snap):
+        (overwritten, self.pos, self.count, self.sums, self.bb_k, self.bb_s1, self.bb_s2,
+         emas, self.prev_close, self.tr_sum, self.atr, self.last_ts, self.last) = snap
+        self.buf[self.pos] = overwritten
+        for e, (value, count) in zip((self.ema_up, self.ema_dn, self.ema_fast, self.ema_slow, self.ema_sign), emas):
+            e.value, e.count = value, count
+
+    def _ago(self, k):
+        """k개 전 종가 (k=1이 직전)"""
+        return self.buf[(self.pos - k) % self.size]
+
+    def _resum(self):
+        """누적 합 오차 정리 (링버퍼 한 바퀴마다 한 번, 분할상환 O(1))"""
+        n = self.count
+        for w in MA_WINDOWS:
+            m = min(w, n)
+            self.sums[w] = math.fsum(self._ago(k) for k in range(1, m + 1))
+        m = min(BB_WINDOW, n)
+        self.bb_k = self._ago(1)
+        self.bb_s1 = sum(self._ago(k) - self.bb_k for k in range(1, m + 1))
+        self.bb_s2 = sum((self._ago(k) - self.bb_k) ** 2 for k in range(1, m + 1))
+
+    def update(self, ts, high, low, close):
+        """캔들 하나 반영 후 해당 캔들의 지표 dict 반환"""
+        if self._undo is not None and ts == self.last_ts:
+            self._restore(self._undo)
+        self._undo = self._snapshot()
+
+        # 링버퍼/이동합 갱신
+        for w in MA_WINDOWS:
+            self.sums[w] += close - (self._ago(w) if self.count >= w else 0.0)
+        old_bb = self._ago(BB_WINDOW) if self.count >= BB_WINDOW else None
+        self.bb_s1 += close - self.bb_k
+        self.bb_s2 += (close - self.bb_k) ** 2
+        if old_bb is not None:
+            self.bb_s1 -= old_bb - self.bb_k
+            self.bb_s2 -= (old_bb - self.bb_k) ** 2
+        self.buf[self.pos] = close
+        self.pos = (self.pos + 1) % self.size
+        self.count += 1
+        if self.pos == 0:
+            self._resum()
+
+        out = {}
+        # 볼린저 밴드
+        if self.count >= BB_WINDOW:
+            mid = self.bb_k + self.bb_s1 / BB_WINDOW
+            var = max(self.bb_s2 / BB_WINDOW - (self.bb_s1 / BB_WINDOW) ** 2, 0.0)
+            std = math.sqrt(var)
+            out["bb_high"], out["bb_mid"], out["bb_low"] = mid + BB_DEV * std, mid, mid - BB_DEV * std
+            width = out["bb_high"] - out["bb_low"]
+            out["bb_pband"] = (close - out["bb_low"]) / width if width != 0 else math.nan
+        else:
+            out["bb_high"] = out["bb_mid"] = out["bb_low"] = out["bb_pband"] = math.nan
+
+        # RSI
+        diff = close - self.prev_close if self.prev_close == self.prev_close else math.nan
+        up = self.ema_up.update(diff if diff > 0 else 0.0)
+        dn = self.ema_dn.update(-diff if diff < 0 else 0.0)
+        if up != up or dn != dn:
+            out["rsi"] = math.nan
+        else:
+            out["rsi"] = 100.0 if dn == 0 else 100.0 - 100.0 / (1.0 + up / dn)
+
+        # MACD
+        fast = self.ema_fast.update(close)
+        slow = self.ema_slow.update(close)
+        macd = fast - slow
+        out["macd"] = macd
+        out["macd_signal"] = self.ema_sign.update(macd)
+        out["macd_diff"] = macd - out["macd_signal"]
+
+        # 이동평균선
+        for w in MA_WINDOWS:
+            out[f"ma{w}"] = self.sums[w] / w if self.count >= w else math.nan
+
+        # ATR
+        if self.prev_close == self.prev_close:
+            tr = max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+        else:
+            tr = high - low
+        if self.count < ATR_WINDOW:
+            self.tr_sum += tr
+            self.atr = 0.0
+        elif self.count == ATR_WINDOW:
+            self.atr = (self.tr_sum + tr) / ATR_WINDOW
+        else:
+            self.atr = (self.atr * (ATR_WINDOW - 1) + tr) / ATR_WINDOW
+        out["atr"] = self.atr
+
+        self.prev_close = close
+        self.last_ts = ts
+        self.last = out
+        return out
@@ -0,0 +1,258 @@
+"""LLM 호출 게이트웨이
+
+- (모델 + 메시지 + 옵션) 해시 기반 응답 캐시 (TTL + 크기 제한 LRU)
+- 호출별 타임아웃, 지연시간/토큰 사용량 기록 (llm.<이름> span으로 trace_spans에도 저장)
+- 동시 호출 수 제한 (여러 티커가 동시에 돌 때 API 한도 보호)
+- 네트워크 없이 파이프라인을 돌릴 수 있는 OpenAI 호환 스텁 백엔드 (LLM_BACKEND=stub)
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import nullcontext
+from types import SimpleNamespace
+
+from tracing import get_tracer
+
+
+# 호출 이름별 기본 타임아웃(초)
+LLM_TIMEOUTS = {
+    "reflection": 60,
+    "chart_vision": 60,
+    "strategy": 120,
+    "decision": 120,
+}
+DEFAULT_TIMEOUT = 60
+
+
+def cache_key(model, messages, **options):
+    """모델/메시지/옵션의 정규화 JSON 해시"""
+    payload = json.dumps({"model": model, "messages": messages, "options": options},
+                         sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """TTL + LRU 응답 캐시 (스레드 안전)"""
+
+    def __init__(self, ttl_seconds=3600, max_entries=256):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._data = OrderedDict()  # key -> (저장 시각, 응답)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or time.monotonic() - item[0] > self.ttl_seconds:
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class LLMGateway:
+    """모든 chat.completions 호출이 거쳐가는 단일 진입점"""
+
+    def __init__(self, client, cache_ttl=3600, cache_size=256, timeouts=None, max_concurrency=None):
+        self.client = client
+        # 캐시 미스 호출만 슬롯을 차지 (None이면 제한 없음)
+        self._slots = threading.BoundedSemaphore(max_concurrency) if max_concurrency else nullcontext()
+        self.cache = ResponseCache(cache_ttl, cache_size)
+        self.timeouts = {**LLM_TIMEOUTS, **(timeouts or {})}
+        self.calls = []  # 호출 기록 (name, model, latency, cached, prompt_tokens, completion_tokens)
+        self._lock = threading.Lock()
+
+    def chat(self, name, model, messages, use_cache=True, timeout=None, **options):
+        """client.chat.completions.create 대체. 응답 객체를 그대로 반환"""
+        key = cache_key(model, messages, **options) if use_cache else None
+        started = time.perf_counter()
+
+        with get_tracer().span(f"llm.{name}", model=model) as span:
+            response = self.cache.get(key) if key else None
+            cached = response is not None
+            if not cached:
+                with self._slots:
+                    response = self.client.chat.completions.create(
+                        model=model,
+                        messages=messages,
+                        timeout=timeout or self.timeouts.get(name, DEFAULT_TIMEOUT),
+                        **options,
+                    )
+                if key:
+                    self.cache.put(key, response)
+
+            usage = getattr(response, "usage", None)
+            record = {
+                "name": name,
+                "model": model,
+                "latency": time.perf_counter() - started,
+                "cached": cached,
+                "prompt_tokens": 0 if cached else getattr(usage, "prompt_tokens", 0) or 0,
+                "completion_tokens": 0 if cached else getattr(usage, "completion_tokens", 0) or 0,
+            }
+            span.set(record["prompt_tokens"], record["completion_tokens"], cached=cached)
+        with self._lock:
+            self.calls.append(record)
+        return response
+
+    def drain_calls(self):
+        """지금까지의 호출 기록을 꺼내고 비움 (사이클 단위 집계용)"""
+        with self._lock:
+            calls, self.calls = self.calls, []
+        return calls
+
+    def print_summary(self, calls=None):
+        calls = self.drain_calls() if calls is None else calls
+        if not calls:
+            return
+        print("\n=== LLM Calls ===")
+        for c in calls:
+            tag = "cache" if c["cached"] else f"{c['prompt_tokens']}+{c['completion_tokens']} tok"
+            print(f"{c['name']:<14} {c['model']:<12} {c['latency']:7.2f}s  {tag}")
+        print(f"cache hits/misses: {self.cache.hits}/{self.cache.misses}")
+
+
+# --- 스텁 백엔드 ---
+def _instance_from_schema(schema):
+    """JSON 스키마를 만족하는 결정적인 예시 값 생성"""
+    if "enum" in schema:
+        return schema["enum"][0]
+    typ = schema.get("type")
+    if typ == "object":
+        props = schema.get("properties", {})
+        return {k: _instance_from_schema(v) for k, v in props.items()}
+    if typ == "array":
+        return [_instance_from_schema(schema.get("items", {"type": "string"}))]
+    if typ == "integer":
+        return int(schema.get("minimum", 0))
+    if typ == "number":
+        return float(schema.get("minimum", 0))
+    if typ == "boolean":
+        return False
+    return "stub"
+
+
+# 시스템 프롬프트 문구 -> json_object 응답 예시
+STUB_JSON_RESPONSES = [
+    ('"market_condition"', {
+        "market_condition": "stub market condition",
+        "decision_analysis": "stub decision analysis",
+        "improvement_points": "stub improvement points",
+        "success_rate": 50,
+        "learning_points": "stub learning points",
+    }),
+]
+# json_schema 이름 -> 기본 응답 (없으면 스키마에서 생성)
+STUB_SCHEMA_RESPONSES = {
+    "trading_decision": {
+        "percentage": 0,
+        "confidence_score": 0,
+        "decision": "hold",
+        "reason": "stub backend: no signal",
+        "reflection_based_adjustments": {
+            "risk_adjustment": "none",
+            "strategy_improvement": "none",
+            "confidence_factors": [],
+        },
+    },
+}
+STUB_TEXT_RESPONSE = "Stub chart analysis: sideways trend, no clear support/resistance break."
+
+
+def _message_text(messages):
+    parts = []
+    for m in messages:
+        content = m.get("content")
+        if isinstance(content, str):
+            parts.append(content)
+        elif isinstance(content, list):
+            parts.extend(p.get("text", "") for p in content if isinstance(p, dict))
+    return "\n".join(parts)
+
+
+class _StubCompletions:
+    def __init__(self, owner):
+        self.owner = owner
+
+    def create(self, model, messages, response_format=None, timeout=None, **_):
+        owner = self.owner
+        if owner.latency:
+            time.sleep(owner.latency)
+
+        fmt = (response_format or {}).get("type")
+        if fmt == "json_schema":
+            spec = response_format["json_schema"]
+            body = owner.responses.get(spec.get("name"))
+            if body is None:
+                body = _instance_from_schema(spec["schema"])
+            content = json.dumps(body, ensure_ascii=False)
+        elif fmt == "json_object":
+            text = _message_text(messages)
+            body = next((resp for marker, resp in STUB_JSON_RESPONSES if marker in text), {"summary": "stub analysis"})
+            content = json.dumps(body, ensure_ascii=False)
+        else:
+            content = STUB_TEXT_RESPONSE
+
+        prompt_tokens = len(_message_text(messages)) // 4
+        return SimpleNamespace(
+            id=f"stub-{int(time.time() * 1000)}",
+            model=model,
+            choices=[SimpleNamespace(index=0, finish_reason="stop",
+                                     message=SimpleNamespace(role="assistant", content=content))],
+            usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=len(content) // 4,
+                                  total_tokens=prompt_tokens + len(content) // 4),
+        )
+
+
+class StubOpenAI:
+    """OpenAI 클라이언트 호환 스텁 (client.chat.completions.create만 지원)
+
+    responses: json_schema 이름 -> 고정 응답 dict (예: {"trading_decision": {...}})
+    latency: 호출당 인위적 지연(초), 부하 테스트용
+    """
+
+    def __init__(self, responses=None, latency=0.0):
+        self.responses = {**STUB_SCHEMA_RESPONSES, **(responses or {})}
+        self.latency = latency
+        self.chat = SimpleNamespace(completions=_StubCompletions(self))
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_llm_gateway():
+    """프로세스 공용 게이트웨이 (LLM_BACKEND=stub 이면 스텁 백엔드 사용)"""
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            if os.getenv("LLM_BACKEND", "openai").lower() == "stub":
+                client = StubOpenAI(latency=float(os.getenv("LLM_STUB_LATENCY", "0")))
+            else:
+                from openai import OpenAI
+                client = OpenAI()
+            _gateway = LLMGateway(
+                client,
+                cache_ttl=int(os.getenv("LLM_CACHE_TTL", "3600")),
+                cache_size=int(os.getenv("LLM_CACHE_SIZE", "256")),
+                max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "4")),
+            )
+        return _gateway
@@ -0,0 +1,382 @@
+"""업비트 실시간 시세 WebSocket 피드
+
+- ticker / trade / orderbook 채널 구독, 티커별 최신 시세와 호가(전체 depth)를 메모리에 유지
+- 수신 스레드 하나가 불변 객체(Quote/Book/Trade)를 만들어 dict 항목을 통째로 교체하므로
+  읽는 쪽은 락 없이 참조만 가져간다 (조회 수 µs, HTTP 왕복 없음)
+- 연결이 끊기면 지수 백오프로 재연결, 오래된 값은 max_age로 걸러 REST로 대체
+- 녹화한 메시지를 재생하는 로컬 가짜 서버 (FakeUpbitServer)로 오프라인 테스트
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+
+import websockets
+
+
+UPBIT_WS_URL = "wss://api.upbit.com/websocket/v1"
+CHANNELS = ("ticker", "trade", "orderbook")
+FEED_MAX_AGE = float(os.getenv("MARKET_FEED_MAX_AGE", "5"))  # 이보다 오래된 값은 사용하지 않음(초)
+
+
+@dataclass(frozen=True, slots=True)
+class Quote:
+    code: str
+    price: float
+    timestamp: int          # 거래소 기준 ms
+    received_at: float      # 로컬 monotonic
+    change_rate: float = 0.0
+    acc_trade_volume_24h: float = 0.0
+
+
+@dataclass(frozen=True, slots=True)
+class Trade:
+    code: str
+    price: float
+    volume: float
+    side: str               # ASK(매도 체결) | BID(매수 체결)
+    timestamp: int
+    received_at: float
+
+
+@dataclass(frozen=True, slots=True)
+class Book:
+    code: str
+    timestamp: int
+    received_at: float
+    bids: tuple             # ((가격, 수량), ...) 높은 가격 순
+    asks: tuple             # ((가격, 수량), ...) 낮은 가격 순
+    total_bid_size: float
+    total_ask_size: float
+
+    @property
+    def best_bid(self):
+        return self.bids[0][0] if self.bids else None
+
+    @property
+    def best_ask(self):
+        return self.asks[0][0] if self.asks else None
+
+    @property
+    def mid(self):
+        if not self.bids or not self.asks:
+            return None
+        return (self.bids[0][0] + self.asks[0][0]) / 2
+
+    @property
+    def spread(self):
+        if not self.bids or not self.asks:
+            return None
+        return self.asks[0][0] - self.bids[0][0]
+
+    @property
+    def imbalance(self):
+        """(매수 잔량 - 매도 잔량) / 전체 잔량, -1 ~ 1"""
+        total = self.total_bid_size + self.total_ask_size
+        return (self.total_bid_size - self.total_ask_size) / total if total else 0.0
+
+    def as_orderbook(self):
+        """pyupbit.get_orderbook 단일 티커 응답과 같은 형태"""
+        return {
+            "market": self.code,
+            "timestamp": self.timestamp,
+            "total_ask_size": self.total_ask_size,
+            "total_bid_size": self.total_bid_size,
+            "orderbook_units": [
+                {"ask_price": a[0], "bid_price": b[0], "ask_size": a[1], "bid_size": b[1]}
+                for a, b in zip(self.asks, self.bids)
+            ],
+        }
+
+
+def _age(item):
+    return time.monotonic() - item.received_at
+
+
+class MarketFeed:
+    """업비트 공개 WebSocket 구독 + 티커별 인메모리 시세/호가"""
+
+    def __init__(self, codes, url=UPBIT_WS_URL, channels=CHANNELS, max_age=FEED_MAX_AGE):
+        self.codes = list(codes)
+        self.url = url
+        self.channels = tuple(channels)
+        self.max_age = max_age
+
+        # 수신 스레드만 쓰고, 항목 단위로 통째 교체 (읽기 측 락 불필요)
+        self._quotes = {}
+        self._books = {}
+        self._trades = {}
+        self.messages = 0
+        self.reconnects = 0
+
+        self._ready = threading.Event()
+        self._thread = None
+        self._loop = None
+        self._task = None
+        self._stopping = False
+
+    # --- 조회 (락 없음) ---
+    def quote(self, code, max_age=None):
+        """최신 Quote (max_age초보다 오래됐으면 None)"""
+        return self._fresh(self._quotes.get(code), max_age)
+
+    def book(self, code, max_age=None):
+        """최신 호가 Book (max_age초보다 오래됐으면 None)"""
+        return self._fresh(self._books.get(code), max_age)
+
+    def last_trade(self, code, max_age=None):
+        return self._fresh(self._trades.get(code), max_age)
+
+    def price(self, code, max_age=None):
+        """현재가 (체결/시세 중 최신 값, 없거나 오래됐으면 None)"""
+        candidates = [x for x in (self.quote(code, max_age), self.last_trade(code, max_age)) if x is not None]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda x: x.timestamp).price
+
+    def prices(self, codes, max_age=None):
+        """{code: price} (신선한 값이 있는 티커만)"""
+        out = {}
+        for code in codes:
+            price = self.price(code, max_age)
+            if price is not None:
+                out[code] = price
+        return out
+
+    def _fresh(self, item, max_age):
+        max_age = self.max_age if max_age is None else max_age
+        if item is None or (max_age and _age(item) > max_age):
+            return None
+        return item
+
+    # --- 수신 처리 ---
+    def _subscription(self):
+        request = [{"ticket": f"autotrade-{uuid.uuid4().hex[:8]}"}]
+        request += [{"type": channel, "codes": self.codes} for channel in self.channels]
+        request.append({"format": "DEFAULT"})
+        return request
+
+    def handle_message(self, raw):
+        """메시지 1건 반영 (bytes/str JSON)"""
+        msg = json.loads(raw)
+        kind, code = msg.get("type"), msg.get("code")
+        now = time.monotonic()
+        if kind == "ticker":
+            self._quotes[code] = Quote(
+                code, float(msg["trade_price"]), int(msg.get("timestamp", 0)), now,
+                float(msg.get("signed_change_rate", 0.0)), float(msg.get("acc_trade_volume_24h", 0.0)))
+            if not self._ready.is_set() and all(c in self._quotes for c in self.codes):
+                self._ready.set()
+        elif kind == "trade":
+            self._trades[code] = Trade(
+                code, float(msg["trade_price"]), float(msg["trade_volume"]), msg.get("ask_bid", ""),
+                int(msg.get("trade_timestamp", msg.get("timestamp", 0))), now)
+        elif kind == "orderbook":
+            units = msg.get("orderbook_units", [])
+            self._books[code] = Book(
+                code, int(msg.get("timestamp", 0)), now,
+                tuple((float(u["bid_price"]), float(u["bid_size"])) for u in units),
+                tuple((float(u["ask_price"]), float(u["ask_size"])) for u in units),
+                float(msg.get("total_bid_size", 0.0)), float(msg.get("total_ask_size", 0.0)))
+        self.messages += 1
+
+    async def _run(self):
+        backoff = 1
+        while not self._stopping:
+            try:
+                async with websockets.connect(self.url, ping_interval=60, max_size=None) as ws:
+                    await ws.send(json.dumps(self._subscription()))
+                    backoff = 1
+                    async for raw in ws:
+                        self.handle_message(raw)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                if self._stopping:
+                    break
+                print(f"[market_feed] connection error: {e} ({backoff}s 후 재연결)")
+            self.reconnects += 1
+            try:
+                await asyncio.sleep(backoff)
+            except asyncio.CancelledError:
+                break
+            backoff = min(backoff * 2, 30)
+
+    def _thread_main(self):
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._task = self._loop.create_task(self._run())
+            self._loop.run_until_complete(self._task)
+        finally:
+            self._loop.close()
+
+    # --- 수명 관리 ---
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._thread_main, name="market-feed", daemon=True)
+            self._thread.start()
+        return self
+
+    def wait_ready(self, timeout=5.0):
+        """모든 티커의 첫 시세를 받을 때까지 대기"""
+        return self._ready.wait(timeout)
+
+    def stop(self, timeout=5.0):
+        self._stopping = True
+        if self._loop is not None and self._task is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._task.cancel)
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+_feeds = {}
+_feeds_lock = threading.Lock()
+
+
+def get_market_feed(codes, url=UPBIT_WS_URL):
+    """티커 목록별 공용 피드 (처음 호출 시 시작)"""
+    key = (tuple(codes), url)
+    with _feeds_lock:
+        feed = _feeds.get(key)
+        if feed is None:
+            feed = _feeds[key] = MarketFeed(codes, url).start()
+        return feed
+
+
+# --- 녹화/재생 (오프라인 테스트용) ---
+def load_messages(path):
+    """녹화 파일(JSON lines) -> 메시지 dict 목록"""
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+async def _record(codes, path, seconds, channels, url):
+    feed = MarketFeed(codes, url, channels)
+    deadline = time.monotonic() + seconds
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        async with websockets.connect(url, max_size=None) as ws:
+            await ws.send(json.dumps(feed._subscription()))
+            while time.monotonic() < deadline:
+                try:
+                    raw = await asyncio.wait_for(ws.recv(), deadline - time.monotonic())
+                except asyncio.TimeoutError:
+                    break
+                f.write((raw.decode("utf-8") if isinstance(raw, bytes) else raw) + "\n")
+                count += 1
+    return count
+
+
+def record_messages(codes, path, seconds=60, channels=CHANNELS, url=UPBIT_WS_URL):
+    """실제 업비트 WebSocket 메시지를 seconds초 동안 파일로 녹화"""
+    return asyncio.run(_record(codes, path, seconds, channels, url))
+
+
+class FakeUpbitServer:
+    """녹화한 메시지를 업비트와 같은 형식(바이너리 JSON)으로 재생하는 로컬 WebSocket 서버
+
+    구독 요청의 type/codes에 맞는 메시지만 순서대로 보낸다.
+    interval: 메시지 사이 간격(초), loop: 끝까지 보내면 처음부터 반복
+    """
+
+    def __init__(self, messages, host="127.0.0.1", port=0, interval=0.0, loop=False):
+        self.messages = list(messages)
+        self.host = host
+        self.port = port
+        self.interval = interval
+        self.loop = loop
+        self.connections = 0
+        self._thread = None
+        self._loop = None
+        self._stop = None
+        self._started = threading.Event()
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}"
+
+    async def _handler(self, ws, *_):
+        self.connections += 1
+        request = json.loads(await ws.recv())
+        wanted = {(item["type"], code) for item in request if "type" in item for code in item.get("codes", [])}
+        selected = [m for m in self.messages if (m.get("type"), m.get("code")) in wanted]
+        try:
+            while True:
+                for msg in selected:
+                    await ws.send(json.dumps(msg).encode("utf-8"))
+                    if self.interval:
+                        await asyncio.sleep(self.interval)
+                if not self.loop:
+                    break
+            await ws.wait_closed()
+        except websockets.ConnectionClosed:
+            pass
+
+    async def _serve(self):
+        self._stop = asyncio.Event()
+        async with websockets.serve(self._handler, self.host, self.port) as server:
+            self.port = next(iter(server.sockets)).getsockname()[1]
+            self._started.set()
+            await self._stop.wait()
+
+    def _thread_main(self):
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._loop.run_until_complete(self._serve())
+        finally:
+            self._loop.close()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._thread_main, name="fake-upbit-ws", daemon=True)
+        self._thread.start()
+        self._started.wait(5)
+        return self
+
+    def stop(self):
+        if self._loop is not None and self._stop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set)
+        if self._thread is not None:
+            self._thread.join(5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    # 사용 예: python market_feed.py record feed.jsonl 30 KRW-BTC KRW-ETH
+    #          python market_feed.py replay feed.jsonl
+    import sys
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "watch"
+    if command == "record":
+        path, seconds, codes = sys.argv[2], float(sys.argv[3]), sys.argv[4:] or ["KRW-BTC"]
+        print(f"{record_messages(codes, path, seconds)} messages recorded -> {path}")
+    elif command == "replay":
+        messages = load_messages(sys.argv[2])
+        codes = sorted({m["code"] for m in messages if "code" in m})
+        with FakeUpbitServer(messages) as server:
+            feed = MarketFeed(codes, server.url).start()
+            feed.wait_ready(5)
+            time.sleep(0.5)
+            for code in codes:
+                book = feed.book(code, max_age=0)
+                print(code, feed.price(code, max_age=0), book.best_bid if book else None, book.best_ask if book else None)
+            print(f"messages: {feed.messages}")
+            feed.stop()
+    else:
+        feed = MarketFeed(sys.argv[2:] or ["KRW-BTC"]).start()
+        try:
+            while True:
+                time.sleep(1)
+                for code in feed.codes:
+                    book = feed.book(code)
+                    print(code, feed.price(code), book.spread if book else None)
+        except KeyboardInterrupt:
+            feed.stop()
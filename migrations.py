@@ -0,0 +1,258 @@
+"""trading.db 스키마 버전 관리 (PRAGMA user_version)
+
+- MIGRATIONS[i]는 버전 i -> i+1 단계 (SQL 문자열 목록 또는 conn을 받는 함수)
+- 단계마다 BEGIN IMMEDIATE ~ COMMIT 한 트랜잭션으로 적용하고 user_version을 올림
+  (중간에 실패하면 그 단계는 통째로 롤백되어 이전 버전 그대로 남음)
+- WAL 모드: 트레이더(쓰기)와 서버/대시보드(읽기)가 서로 기다리지 않음
+- 시각은 정수 epoch(ms) 컬럼으로 정렬/범위 조회, 기존 DATETIME 텍스트 컬럼은 표시용으로 유지
+- 1시간/1일/1주 롤업 테이블은 trading_history INSERT 트리거가 바로 갱신 (장기 차트는 버킷 수만큼만 조회)
+"""
+
+
+def epoch_ms_sql(column):
+    """로컬 시각 텍스트 컬럼 -> UTC epoch ms (SQLite 'utc' 수정자는 입력을 로컬 시각으로 간주)"""
+    return f"CAST(ROUND((julianday({column}, 'utc') - 2440587.5) * 86400000) AS INTEGER)"
+
+
+def _v1_baseline(conn):
+    """버전 관리 이전 스키마 (기존 DB는 이미 있는 테이블을 그대로 사용)"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS trading_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp DATETIME NOT NULL,
+            ticker TEXT NOT NULL DEFAULT 'KRW-BTC',
+            decision TEXT NOT NULL,
+            percentage REAL NOT NULL,
+            reason TEXT NOT NULL,
+            btc_balance REAL NOT NULL,
+            krw_balance REAL NOT NULL,
+            btc_avg_buy_price REAL NOT NULL,
+            btc_krw_price REAL NOT NULL
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS trading_reflection (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            trading_id INTEGER NOT NULL,
+            reflection_date DATETIME NOT NULL,
+            market_condition TEXT NOT NULL,
+            decision_analysis TEXT NOT NULL,
+            improvement_points TEXT NOT NULL,
+            success_rate REAL NOT NULL,
+            learning_points TEXT NOT NULL,
+            FOREIGN KEY (trading_id) REFERENCES trading_history(id)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS order_fills (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            trading_id INTEGER,
+            ticker TEXT NOT NULL,
+            side TEXT NOT NULL,
+            order_uuid TEXT,
+            state TEXT NOT NULL,
+            requested REAL NOT NULL,
+            quote_price REAL,
+            executed_volume REAL NOT NULL,
+            executed_funds REAL NOT NULL,
+            avg_price REAL,
+            paid_fee REAL NOT NULL,
+            slippage_bps REAL,
+            decided_at DATETIME NOT NULL,
+            submitted_at DATETIME,
+            filled_at DATETIME,
+            decision_to_submit_ms REAL,
+            submit_ack_ms REAL,
+            submit_to_fill_ms REAL,
+            decision_to_fill_ms REAL,
+            error TEXT,
+            FOREIGN KEY (trading_id) REFERENCES trading_history(id)
+        )
+    """)
+    # 단일 티커 시절 DB에는 ticker 컬럼이 없음 (기존 행은 모두 KRW-BTC)
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(trading_history)")]
+    if "ticker" not in columns:
+        conn.execute("ALTER TABLE trading_history ADD COLUMN ticker TEXT NOT NULL DEFAULT 'KRW-BTC'")
+
+
+_V2_EPOCH_AND_INDEXES = [
+    # 정수 epoch(ms) 컬럼 + 기존 행 채우기
+    "ALTER TABLE trading_history ADD COLUMN timestamp_ms INTEGER",
+    f"UPDATE trading_history SET timestamp_ms = {epoch_ms_sql('timestamp')}",
+    "ALTER TABLE trading_reflection ADD COLUMN reflection_date_ms INTEGER",
+    f"UPDATE trading_reflection SET reflection_date_ms = {epoch_ms_sql('reflection_date')}",
+    # epoch 없이 텍스트 시각만 넣는 예전 버전 writer 대비
+    f"""CREATE TRIGGER IF NOT EXISTS trading_history_timestamp_ms AFTER INSERT ON trading_history
+        WHEN NEW.timestamp_ms IS NULL
+        BEGIN UPDATE trading_history SET timestamp_ms = {epoch_ms_sql('NEW.timestamp')} WHERE id = NEW.id; END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trading_reflection_date_ms AFTER INSERT ON trading_reflection
+        WHEN NEW.reflection_date_ms IS NULL
+        BEGIN UPDATE trading_reflection SET reflection_date_ms = {epoch_ms_sql('NEW.reflection_date')} WHERE id = NEW.id; END""",
+    # 커서 조회(ORDER BY 시각 DESC + 시각 < 커서 [+ 티커/거래 id])를 인덱스 범위 스캔으로
+    "CREATE INDEX IF NOT EXISTS idx_history_ts ON trading_history (timestamp_ms, id)",
+    "CREATE INDEX IF NOT EXISTS idx_history_ticker_ts ON trading_history (ticker, timestamp_ms, id)",
+    "CREATE INDEX IF NOT EXISTS idx_reflection_ts ON trading_reflection (reflection_date_ms, id)",
+    "CREATE INDEX IF NOT EXISTS idx_reflection_trading_ts ON trading_reflection (trading_id, reflection_date_ms, id)",
+    "CREATE INDEX IF NOT EXISTS idx_order_fills_trading ON order_fills (trading_id)",
+    "ANALYZE",
+]
+
+
+# 해상도 -> (롤업 테이블, 로컬 시각 텍스트 -> 버킷 시작 시각 SQL)
+# 버킷은 기록 시각과 같은 로컬 시각 기준 (일: 자정, 주: 월요일 자정)
+ROLLUPS = {
+    "1h": ("history_rollup_hourly", "strftime('%Y-%m-%d %H:00:00', {ts})"),
+    "1d": ("history_rollup_daily", "datetime({ts}, 'start of day')"),
+    "1w": ("history_rollup_weekly", "datetime({ts}, 'start of day', '-6 days', 'weekday 1')"),
+}
+
+
+def _rollup_statements(table, bucket_sql):
+    """롤업 테이블 + 증분 갱신 트리거 + 기존 행 채우기"""
+    bucket = bucket_sql.format(ts="NEW.timestamp")
+    # 버킷의 마지막 행 = (시각, id)가 가장 큰 행 (늦게 들어온 과거 행은 마지막 값을 바꾸지 않음)
+    newer = "(excluded.last_ms, excluded.last_id) > (last_ms, last_id)"
+    return [
+        f"""CREATE TABLE IF NOT EXISTS {table} (
+            ticker TEXT NOT NULL,
+            bucket_ms INTEGER NOT NULL,          -- 버킷 시작 UTC epoch ms
+            bucket_start DATETIME NOT NULL,      -- 버킷 시작 로컬 시각 (표시용)
+            rows INTEGER NOT NULL,
+            buy_count INTEGER NOT NULL,
+            sell_count INTEGER NOT NULL,
+            hold_count INTEGER NOT NULL,
+            percentage_sum REAL NOT NULL,        -- 평균 = percentage_sum / rows
+            last_id INTEGER NOT NULL,
+            last_ms INTEGER NOT NULL,
+            last_price REAL NOT NULL,
+            equity REAL NOT NULL,                -- 마지막 행 krw_balance + btc_balance * btc_krw_price
+            PRIMARY KEY (ticker, bucket_ms)
+        ) WITHOUT ROWID""",
+        f"CREATE INDEX IF NOT EXISTS idx_{table}_bucket ON {table} (bucket_ms)",
+        f"""CREATE TRIGGER IF NOT EXISTS trading_history_{table} AFTER INSERT ON trading_history
+        BEGIN
+            INSERT INTO {table} (
+                ticker, bucket_ms, bucket_start, rows, buy_count, sell_count, hold_count,
+                percentage_sum, last_id, last_ms, last_price, equity
+            ) VALUES (
+                NEW.ticker, {epoch_ms_sql(bucket)}, {bucket}, 1,
+                lower(NEW.decision) = 'buy', lower(NEW.decision) = 'sell',
+                lower(NEW.decision) NOT IN ('buy', 'sell'),
+                NEW.percentage, NEW.id, COALESCE(NEW.timestamp_ms, {epoch_ms_sql('NEW.timestamp')}),
+                NEW.btc_krw_price, NEW.krw_balance + NEW.btc_balance * NEW.btc_krw_price
+            )
+            ON CONFLICT (ticker, bucket_ms) DO UPDATE SET
+                rows = rows + 1,
+                buy_count = buy_count + excluded.buy_count,
+                sell_count = sell_count + excluded.sell_count,
+                hold_count = hold_count + excluded.hold_count,
+                percentage_sum = percentage_sum + excluded.percentage_sum,
+                last_price = CASE WHEN {newer} THEN excluded.last_price ELSE last_price END,
+                equity = CASE WHEN {newer} THEN excluded.equity ELSE equity END,
+                last_ms = CASE WHEN {newer} THEN excluded.last_ms ELSE last_ms END,
+                last_id = CASE WHEN {newer} THEN excluded.last_id ELSE last_id END;
+        END""",
+        f"""INSERT INTO {table} (
+                ticker, bucket_ms, bucket_start, rows, buy_count, sell_count, hold_count,
+                percentage_sum, last_id, last_ms, last_price, equity
+            )
+            SELECT ticker, bucket_ms, bucket_start, COUNT(*),
+                   SUM(lower(decision) = 'buy'), SUM(lower(decision) = 'sell'),
+                   SUM(lower(decision) NOT IN ('buy', 'sell')), SUM(percentage),
+                   MAX(CASE WHEN rn = 1 THEN id END), MAX(CASE WHEN rn = 1 THEN timestamp_ms END),
+                   MAX(CASE WHEN rn = 1 THEN btc_krw_price END),
+                   MAX(CASE WHEN rn = 1 THEN krw_balance + btc_balance * btc_krw_price END)
+            FROM (
+                SELECT h.*, {epoch_ms_sql(bucket_sql.format(ts='timestamp'))} AS bucket_ms,
+                       {bucket_sql.format(ts='timestamp')} AS bucket_start,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY ticker, {bucket_sql.format(ts='timestamp')}
+                           ORDER BY timestamp_ms DESC, id DESC
+                       ) AS rn
+                FROM trading_history h
+            )
+            GROUP BY ticker, bucket_ms""",
+    ]
+
+
+_V3_ROLLUPS = [statement for table, bucket_sql in ROLLUPS.values()
+               for statement in _rollup_statements(table, bucket_sql)]
+
+
+_V4_FILL_TIME_SOURCE = [
+    # filled_at 출처: trade(거래소 체결 시각) | poll(폴링으로 감지한 시각), 기존 행은 모두 폴링 기준
+    "ALTER TABLE order_fills ADD COLUMN fill_time_source TEXT",
+    "UPDATE order_fills SET fill_time_source = 'poll' WHERE filled_at IS NOT NULL",
+]
+
+
+_V5_TRACE_SPANS = [
+    # tracing.Tracer가 직접 만들던 테이블 (이미 있는 DB는 그대로 사용)
+    """CREATE TABLE IF NOT EXISTS trace_spans (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        trace_id TEXT NOT NULL,
+        span_id TEXT NOT NULL,
+        parent_id TEXT,
+        name TEXT NOT NULL,
+        ticker TEXT,
+        started_at REAL NOT NULL,
+        duration_ms REAL NOT NULL,
+        status TEXT NOT NULL,
+        prompt_tokens INTEGER NOT NULL DEFAULT 0,
+        completion_tokens INTEGER NOT NULL DEFAULT 0,
+        attrs TEXT
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_trace_spans_started ON trace_spans (started_at)",
+]
+
+
+MIGRATIONS = [
+    _v1_baseline,
+    _V2_EPOCH_AND_INDEXES,
+    _V3_ROLLUPS,
+    _V4_FILL_TIME_SOURCE,
+    _V5_TRACE_SPANS,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def configure(conn):
+    """연결마다 적용하는 설정 (WAL은 파일에 유지되지만 새 파일/예전 파일 모두 여기서 보장)"""
+    mode = conn.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+    if mode.lower() != "wal":
+        print(f"Warning: journal_mode is {mode}, not WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")  # WAL에서는 커밋 시 fsync 생략해도 손상 없음
+    conn.execute("PRAGMA busy_timeout = 5000")
+
+
+def migrate(conn):
+    """현재 user_version 이후 단계만 순서대로 적용 -> 적용한 단계 수"""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version > SCHEMA_VERSION:
+        raise RuntimeError(f"DB schema version {version} is newer than this code ({SCHEMA_VERSION})")
+
+    isolation_level = conn.isolation_level
+    conn.isolation_level = None  # DDL 포함 전체를 명시적 트랜잭션 하나로 묶기 위해 자동 BEGIN 해제
+    try:
+        for target in range(version + 1, SCHEMA_VERSION + 1):
+            step = MIGRATIONS[target - 1]
+            conn.execute("BEGIN IMMEDIATE")
+            # 트레이더와 Tracer가 같은 파일을 동시에 올릴 수 있으므로 쓰기 잠금을 잡은 뒤 버전을 다시 확인
+            if conn.execute("PRAGMA user_version").fetchone()[0] >= target:
+                conn.execute("COMMIT")
+                continue
+            try:
+                if callable(step):
+                    step(conn)
+                else:
+                    for statement in step:
+                        conn.execute(statement)
+                conn.execute(f"PRAGMA user_version = {target}")
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            print(f"trading.db schema migrated to version {target}")
+    finally:
+        conn.isolation_level = isolation_level
+    return SCHEMA_VERSION - version
@@ -0,0 +1,220 @@
+"""주문 실행 파이프라인
+
+- 시장가 주문을 제출하고, 백그라운드 스레드가 get_order를 지수 백오프로 폴링해 체결 완료까지 추적
+- 주문 UUID / 체결 수량·금액 / 평균 체결가 / 수수료를 order_fills 테이블에 기록
+  (제출 시 삽입, 완료되면 갱신, 거래 기록이 생기면 trading_history id 연결)
+- 판단 -> 제출 -> 접수 -> 체결 지연 시간과 판단 시점 현재가 대비 슬리피지 측정
+  (체결 시각은 get_order 응답의 마지막 trades[].created_at, 체결 내역이 없을 때만 폴링으로 감지한 시각)
+- 제출(order.submit)과 체결 추적(order.fill)은 주문을 낸 사이클의 trace에 span으로 기록
+"""
+import contextvars
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional
+
+from tracing import get_tracer
+
+
+ORDER_POLL_INITIAL = float(os.getenv("ORDER_POLL_INITIAL", "0.25"))  # 첫 체결 조회까지 대기(초)
+ORDER_POLL_MAX = float(os.getenv("ORDER_POLL_MAX", "5"))              # 폴링 간격 상한(초)
+ORDER_TRACK_TIMEOUT = float(os.getenv("ORDER_TRACK_TIMEOUT", "120"))  # 이 안에 끝나지 않으면 timeout으로 기록
+FINAL_STATES = ("done", "cancel")  # 시장가 매수는 남은 금액이 반환되면 cancel로 끝남
+
+
+def _ms(start, end):
+    return (end - start) * 1000 if start is not None and end is not None else None
+
+
+def _last_trade_at(trades):
+    """마지막 체결 시각 (trades[].created_at, "2024-01-01T09:00:00+09:00") -> epoch 초, 없으면 None"""
+    times = []
+    for trade in trades:
+        try:
+            times.append(datetime.fromisoformat(trade["created_at"]).timestamp())
+        except (KeyError, TypeError, ValueError):
+            pass
+    return max(times) if times else None
+
+
+@dataclass
+class OrderTicket:
+    """주문 하나의 제출~체결 기록 (시각은 epoch 초)"""
+    ticker: str
+    side: str                           # buy | sell
+    requested: float                    # 매수: KRW 금액, 매도: 코인 수량
+    quote_price: Optional[float]        # 판단에 사용한 현재가 (슬리피지 기준)
+    decided_at: float
+    submitted_at: Optional[float] = None
+    accepted_at: Optional[float] = None
+    filled_at: Optional[float] = None
+    fill_time_source: Optional[str] = None  # trade: 거래소 체결 시각, poll: 폴링으로 감지한 시각
+    uuid: Optional[str] = None
+    state: str = "new"                  # wait -> done/cancel | rejected | timeout
+    executed_volume: float = 0.0
+    executed_funds: float = 0.0
+    paid_fee: float = 0.0
+    error: Optional[str] = None
+    fill_id: Optional[int] = None       # order_fills.id
+    trading_id: Optional[int] = None    # trading_history.id
+    done: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def avg_price(self):
+        return self.executed_funds / self.executed_volume if self.executed_volume else None
+
+    @property
+    def slippage_bps(self):
+        """판단 시점 가격 대비 불리한 방향이 양수"""
+        if not self.avg_price or not self.quote_price:
+            return None
+        diff = self.avg_price / self.quote_price - 1
+        return (diff if self.side == "buy" else -diff) * 10000
+
+    @property
+    def latencies(self):
+        return {
+            "decision_to_submit_ms": _ms(self.decided_at, self.submitted_at),
+            "submit_ack_ms": _ms(self.submitted_at, self.accepted_at),
+            "submit_to_fill_ms": _ms(self.submitted_at, self.filled_at),
+            "decision_to_fill_ms": _ms(self.decided_at, self.filled_at),
+        }
+
+    def wait(self, timeout=None):
+        """체결 추적이 끝날 때까지 대기"""
+        return self.done.wait(timeout)
+
+
+class OrderExecutor:
+    """시장가 주문 제출 + 비동기 체결 추적
+
+    db: save_order_fill(ticket)을 가진 저장소 (DatabaseManager), 없으면 기록 생략
+    account: AccountSnapshot, 접수/체결 시 무효화
+    """
+
+    def __init__(self, upbit, db=None, account=None, poll_initial=ORDER_POLL_INITIAL,
+                 poll_max=ORDER_POLL_MAX, timeout=ORDER_TRACK_TIMEOUT):
+        self.upbit = upbit
+        self.db = db
+        self.account = account
+        self.poll_initial = poll_initial
+        self.poll_max = poll_max
+        self.timeout = timeout
+        self.pending = {}  # uuid -> 추적 중인 OrderTicket
+        self._lock = threading.Lock()
+
+    def _save(self, ticket):
+        if self.db is None:
+            return
+        try:
+            self.db.save_order_fill(ticket)
+        except Exception as e:
+            print(f"Error saving order fill: {e}")
+
+    def submit(self, ticker, side, amount, quote_price=None, decided_at=None):
+        """주문 제출 -> 접수된 OrderTicket (거절되면 None). 체결은 백그라운드에서 추적"""
+        ticket = OrderTicket(ticker, side, float(amount), quote_price, decided_at or time.time())
+        with get_tracer().span("order.submit", ticker=ticker, side=side) as span:
+            ticket.submitted_at = time.time()
+            try:
+                if side == "buy":
+                    order = self.upbit.buy_market_order(ticker, amount)
+                else:
+                    order = self.upbit.sell_market_order(ticker, amount)
+            except Exception as e:
+                order, ticket.error = None, str(e)
+            ticket.accepted_at = time.time()
+            if not isinstance(order, dict) or "uuid" not in order:
+                span.status = "error"
+        if self.account is not None:
+            self.account.invalidate()  # 접수 즉시 잔고가 묶이므로 다음 조회 때 다시 받음
+
+        if not isinstance(order, dict) or "uuid" not in order:
+            ticket.state = "rejected"
+            ticket.error = ticket.error or str(order)
+            ticket.done.set()
+            self._save(ticket)
+            print(f"Error submitting {side} order ({ticker}): {ticket.error}")
+            return None
+
+        ticket.uuid, ticket.state = order["uuid"], order.get("state", "wait")
+        self._save(ticket)
+        with self._lock:
+            self.pending[ticket.uuid] = ticket
+        # 추적 스레드도 같은 trace에 span을 남기도록 현재 context 전달
+        context = contextvars.copy_context()
+        threading.Thread(target=context.run, args=(self._track, ticket),
+                         name=f"order-{ticket.uuid[:8]}", daemon=True).start()
+        return ticket
+
+    def _track(self, ticket):
+        """완료 상태가 될 때까지 get_order 폴링 (0.25s, 0.5s, 1s ... 최대 poll_max 간격)"""
+        tracer = get_tracer()
+        with tracer.span("order.fill", ticker=ticket.ticker, side=ticket.side) as span:
+            delay = self.poll_initial
+            deadline = time.monotonic() + self.timeout
+            order = None
+            polls = 0
+            while True:
+                time.sleep(delay)
+                polls += 1
+                try:
+                    order = self.upbit.get_order(ticket.uuid)
+                except Exception as e:
+                    print(f"Error polling order {ticket.uuid}: {e}")
+                if isinstance(order, dict) and order.get("state") in FINAL_STATES:
+                    break
+                if time.monotonic() >= deadline:
+                    break
+                delay = min(delay * 2, self.poll_max)
+            self._complete(ticket, order)
+            span.set(state=ticket.state, polls=polls)
+            if ticket.state == "timeout":
+                span.status = "error"
+        tracer.flush()  # 사이클이 먼저 끝났을 수 있으므로 바로 기록
+
+    def _complete(self, ticket, order):
+        detected_at = time.time()
+        trades = []
+        if isinstance(order, dict):
+            trades = order.get("trades") or []
+            ticket.executed_volume = float(order.get("executed_volume") or 0)
+            ticket.executed_funds = sum(float(t["funds"]) for t in trades)
+            ticket.paid_fee = float(order.get("paid_fee") or 0)
+        final = isinstance(order, dict) and order.get("state") in FINAL_STATES
+        ticket.state = order["state"] if final else "timeout"
+        # 폴링 간격(0.25s~)이 지연 시간에 섞이지 않도록 거래소 체결 시각 우선
+        traded_at = _last_trade_at(trades)
+        if traded_at is not None:
+            ticket.filled_at, ticket.fill_time_source = traded_at, "trade"
+        else:
+            ticket.filled_at, ticket.fill_time_source = detected_at, "poll"
+
+        if self.account is not None:
+            self.account.invalidate()
+        self._save(ticket)
+        with self._lock:
+            self.pending.pop(ticket.uuid, None)
+        ticket.done.set()
+        self.print_fill(ticket)
+
+    def wait_all(self, timeout=None):
+        """추적 중인 모든 주문이 끝날 때까지 대기 (종료 전 호출)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            tickets = list(self.pending.values())
+        for ticket in tickets:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            ticket.wait(remaining)
+
+    @staticmethod
+    def print_fill(ticket):
+        print(f"\n=== Order {ticket.state} ({ticket.ticker} {ticket.side}) ===")
+        print(f"UUID: {ticket.uuid}")
+        if ticket.avg_price:
+            print(f"Filled: {ticket.executed_volume:.8f} @ {ticket.avg_price:,.0f} KRW "
+                  f"(fee {ticket.paid_fee:,.2f}, slippage {ticket.slippage_bps or 0:+.1f}bp)")
+        print(" / ".join(f"{name} {value:,.0f}" for name, value in ticket.latencies.items() if value is not None)
+              + f" (fill time: {ticket.fill_time_source})")
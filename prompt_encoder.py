@@ -0,0 +1,172 @@
+"""LLM 프롬프트용 시장 데이터 압축 인코딩
+
+- OHLCV/지표 테이블을 컬럼 단위로 양자화(유효숫자 기준 반올림)해 직렬화
+- NaN/None 값과 중복 컬럼 제거
+- 토큰 예산을 넘으면 우선순위가 낮은 섹션부터 줄이거나 제외
+- 섹션별 토큰 수 리포트
+"""
+import json
+import math
+
+import numpy as np
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("o200k_base")
+except Exception:  # tiktoken 미설치/인코딩 다운로드 불가 시 근사치 사용
+    _ENCODING = None
+
+
+SIG_DIGITS = 5  # 테이블 숫자 유효숫자
+# 컬럼별 고정 소수 자릿수 (나머지는 크기에 따라 자동)
+COLUMN_DECIMALS = {"rsi": 1, "bb_pband": 3, "volume": 4}
+# 다른 컬럼에서 유도 가능한 중복 컬럼 (bb_mid == ma20, macd_diff == macd - macd_signal)
+REDUNDANT_COLUMNS = ("bb_mid", "macd_diff", "value")
+
+
+def count_tokens(text):
+    """토큰 수 (tiktoken 없으면 ASCII 4글자당 1토큰, 비ASCII 1글자당 1토큰으로 근사)"""
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    ascii_chars = sum(1 for ch in text if ch < "\x80")
+    return math.ceil(ascii_chars / 4) + (len(text) - ascii_chars)
+
+
+def dumps(data):
+    """공백 없는 JSON 직렬화"""
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def quantize(value, sig_digits=SIG_DIGITS):
+    """스칼라/중첩 구조의 float를 유효숫자 기준으로 반올림하고 NaN/None 필드 제거"""
+    if isinstance(value, dict):
+        out = {}
+        for k, v in value.items():
+            v = quantize(v, sig_digits)
+            if v is not None:
+                out[k] = v
+        return out
+    if isinstance(value, (list, tuple)):
+        return [quantize(v, sig_digits) for v in value]
+    if isinstance(value, (float, np.floating)):
+        value = float(value)
+        if not math.isfinite(value):
+            return None
+        if value == 0:
+            return 0
+        decimals = sig_digits - 1 - int(math.floor(math.log10(abs(value))))
+        if decimals <= 0:
+            return int(round(value))  # 정수부(KRW 가격/잔고)는 자르지 않음
+        return round(value, decimals)
+    if isinstance(value, np.integer):
+        return int(value)
+    return value
+
+
+def _column_decimals(name, values):
+    if name in COLUMN_DECIMALS:
+        return COLUMN_DECIMALS[name]
+    finite = np.abs(values[np.isfinite(values)])
+    finite = finite[finite > 0]
+    if finite.size == 0:
+        return 0
+    magnitude = int(math.floor(math.log10(np.median(finite))))
+    return max(0, SIG_DIGITS - 1 - magnitude)
+
+
+def encode_table(df, date_format="%Y-%m-%d %H:%M", drop=REDUNDANT_COLUMNS):
+    """DataFrame -> {"date": [...], 컬럼: [...]} 컬럼 단위 인코딩 (행별 dict 생성 없음)"""
+    df = df.drop(columns=[c for c in drop if c in df.columns]).dropna(axis=1, how="all")
+    out = {"date": list(df.index.strftime(date_format)) if hasattr(df.index, "strftime") else df.index.tolist()}
+    for name in df.columns:
+        values = df[name].to_numpy(dtype=float)
+        decimals = _column_decimals(name, values)
+        finite = np.isfinite(values)
+        rounded = np.round(np.where(finite, values, 0.0), decimals)
+        column = (rounded.astype(np.int64) if decimals == 0 else rounded).tolist()
+        if not finite.all():
+            column = [v if ok else None for v, ok in zip(column, finite.tolist())]
+        out[name] = column
+    return out
+
+
+def encode_rows(rows, columns, drop=()):
+    """DB 조회 결과(튜플 목록) -> {컬럼: [...]} 컬럼 단위 인코딩"""
+    keep = [i for i, c in enumerate(columns) if c not in drop]
+    return {columns[i]: quantize([row[i] for row in rows]) for i in keep}
+
+
+def _table_len(data):
+    lengths = [len(v) for v in data.values() if isinstance(v, list)]
+    return max(lengths) if lengths else 0
+
+
+def _shrink(data):
+    """섹션을 대략 절반 크기로 줄인 값 반환 (더 줄일 수 없으면 None)"""
+    if isinstance(data, str):
+        return data[: len(data) // 2] + "…" if len(data) > 200 else None
+    if isinstance(data, list):
+        return data[: len(data) // 2] if len(data) > 1 else None
+    if isinstance(data, dict):
+        n = _table_len(data)
+        if n > 1 and all(isinstance(v, list) and len(v) == n for v in data.values()):
+            # 컬럼 테이블: 최신(뒤쪽) 행 유지
+            return {k: v[-(n // 2):] for k, v in data.items()}
+        # 중첩 dict: 가장 큰 하위 항목부터 줄임
+        sizes = sorted(((len(dumps(v)), k) for k, v in data.items()), reverse=True)
+        for _, key in sizes:
+            smaller = _shrink(data[key])
+            if smaller is not None:
+                return {**data, key: smaller}
+    return None
+
+
+class PromptBuilder:
+    """우선순위/토큰 예산 기반 프롬프트 조립기 (priority가 낮을수록 먼저 줄임)"""
+
+    def __init__(self, budget_tokens=None):
+        self.budget_tokens = budget_tokens
+        self.sections = []  # (name, data, priority)
+
+    def add(self, name, data, priority=50):
+        self.sections.append((name, quantize(data), priority))
+        return self
+
+    def build(self):
+        """(JSON 문자열, 리포트) 반환"""
+        sections = {name: data for name, data, _ in self.sections}
+        tokens = {name: count_tokens(dumps(data)) for name, data in sections.items()}
+        trimmed = {}
+
+        if self.budget_tokens:
+            for name, _, _ in sorted(self.sections, key=lambda s: s[2]):
+                while sum(tokens.values()) > self.budget_tokens and name in sections:
+                    smaller = _shrink(sections[name]) if sections[name] is not None else None
+                    if smaller is None:
+                        del sections[name]
+                        tokens[name] = 0
+                        trimmed[name] = "dropped"
+                    else:
+                        sections[name] = smaller
+                        tokens[name] = count_tokens(dumps(smaller))
+                        trimmed[name] = "trimmed"
+                if sum(tokens.values()) <= self.budget_tokens:
+                    break
+
+        text = dumps(sections)
+        report = {
+            "sections": {name: tokens[name] for name, _, _ in self.sections},
+            "total": count_tokens(text),
+            "budget": self.budget_tokens,
+            "trimmed": trimmed,
+        }
+        return text, report
+
+
+def print_report(report, title="Prompt Tokens"):
+    print(f"\n=== {title} ===")
+    for name, n in report["sections"].items():
+        note = f" ({report['trimmed'][name]})" if name in report["trimmed"] else ""
+        print(f"{name:<20} {n:>6}{note}")
+    budget = f" / {report['budget']}" if report["budget"] else ""
+    print(f"{'total':<20} {report['total']:>6}{budget}")
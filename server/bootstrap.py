@@ -0,0 +1,55 @@
+# server/bootstrap.py
+# /ws/updates 접속 시 보내는 bootstrap 프레임 캐시
+# - 최근 N건 신호/반성을 메모리 링 버퍼(deque)에 보관 (watcher가 시작 시 채우고 새 행이 오면 추가)
+# - 프레임은 새 데이터가 들어올 때만 다시 직렬화, 새 연결은 DB 조회/검증/직렬화 없이 문자열 두 개만 전송
+from __future__ import annotations
+from collections import deque
+from typing import Iterable, Optional, Tuple
+import os
+
+from broadcast import encode_message
+
+BOOTSTRAP_SIZE = int(os.getenv("WS_BOOTSTRAP_SIZE", "120"))
+
+class BootstrapCache:
+    """최근 신호/반성 링 버퍼 + 미리 직렬화한 bootstrap 프레임"""
+
+    def __init__(self, size: int = BOOTSTRAP_SIZE):
+        self.signals: deque = deque(maxlen=size)      # _to_signal_dto dict, 시간 오름차순
+        self.reflections: deque = deque(maxlen=size)  # TradingReflectionOut.model_dump(), 시간 오름차순
+        self.ready = False                            # watcher가 채우기 전에는 라우터가 DB로 대체
+        self.rebuilds = 0
+        self._frames: Optional[Tuple[str, str]] = None
+
+    def seed(self, signals: Iterable[dict], reflections: Iterable[dict]):
+        """시작 시 최근 N건으로 채움"""
+        self.signals.clear()
+        self.reflections.clear()
+        self.signals.extend(signals)
+        self.reflections.extend(reflections)
+        self.ready = True
+        self._rebuild()
+
+    def add(self, signals: Iterable[dict] = (), reflections: Iterable[dict] = ()):
+        """새 행 추가 (watcher 한 번의 조회 결과를 묶어 프레임은 한 번만 재생성)"""
+        signals, reflections = list(signals), list(reflections)
+        if not signals and not reflections:
+            return
+        self.signals.extend(signals)
+        self.reflections.extend(reflections)
+        if self.ready:
+            self._rebuild()
+
+    def _rebuild(self):
+        self._frames = (
+            encode_message("bootstrap", list(self.signals)),
+            encode_message("bootstrap_reflections", list(self.reflections)),
+        )
+        self.rebuilds += 1
+
+    def frames(self) -> Optional[Tuple[str, str]]:
+        """(bootstrap, bootstrap_reflections) 직렬화 문자열, 준비 전이면 None"""
+        return self._frames if self.ready else None
+
+# watcher(쓰기)와 /ws/updates(읽기)가 공유, 둘 다 이벤트 루프 스레드에서만 접근
+bootstrap_cache = BootstrapCache()
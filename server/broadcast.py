@@ -1,11 +1,143 @@
 # server/broadcast.py
+# WebSocket 팬아웃: 메시지는 한 번만 직렬화하고, 구독자마다 제한된 송신 큐 + 전용 writer 태스크로 전송
+# (느린 클라이언트 하나가 다른 구독자나 ws_writer 큐를 막지 않음)
 from __future__ import annotations
-from typing import Any, Dict, Set, Tuple
+from typing import Any, Dict, Optional, Tuple
 from fastapi import WebSocket
-import asyncio, json, math
+import asyncio, itertools, json, math, os, time
+
+# 구독자별 송신 큐 크기 / 느린 구독자 정책
+SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "256"))
+# drop_oldest: 큐가 차면 가장 오래된 메시지를 버림 (WS_MAX_DROPS번 연속 버리고 writer가 멈춰 있으면 연결 종료)
+# disconnect:  큐가 찼을 때 writer가 멈춰 있으면 바로 연결 종료 (전송 중이면 가장 오래된 메시지를 버림)
+# 멈춤: WS_STALL_SECONDS 동안 보낼 메시지가 있는데 전송을 하나도 끝내지 못함 (몰아서 온 메시지로 큐만 찬 정상 구독자는 끊지 않음)
+SLOW_CONSUMER_POLICY = os.getenv("WS_SLOW_CONSUMER_POLICY", "drop_oldest").lower()
+MAX_DROPS = int(os.getenv("WS_MAX_DROPS", "1024"))
+STALL_SECONDS = float(os.getenv("WS_STALL_SECONDS", "5"))
+SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "10"))  # 한 번의 전송이 이보다 오래 걸리면 끊긴 연결로 간주
+
+_client_ids = itertools.count(1)
+
+class Subscriber:
+    """구독자 하나: 송신 큐 + writer 태스크 + 전송 지표"""
+
+    def __init__(self, ws: WebSocket, registry: "SubscriberRegistry", maxsize: int = SEND_QUEUE_SIZE):
+        client = getattr(ws, "client", None)
+        self.ws = ws
+        self.registry = registry
+        self.client_id = f"{client.host}:{client.port}#{next(_client_ids)}" if client else f"ws#{next(_client_ids)}"
+        self.queue: "asyncio.Queue[Tuple[float, str]]" = asyncio.Queue(maxsize)
+        self.sent = 0
+        self.dropped = 0
+        self.consecutive_drops = 0
+        self.send_seconds_sum = 0.0     # ws.send_text 소요 시간 합계
+        self.send_seconds_max = 0.0
+        self.lag_seconds_last = 0.0     # 마지막 메시지의 큐 대기 + 전송 시간
+        self.last_progress = time.perf_counter()  # 마지막 전송 완료 (또는 빈 큐에 새 메시지가 들어온) 시각
+        self.closed = False
+        self.task = asyncio.create_task(self._run(), name=f"ws-writer-{self.client_id}")
+
+    def stalled(self, now: float) -> bool:
+        """보낼 메시지가 있는데 STALL_SECONDS 동안 전송을 끝내지 못함"""
+        return now - self.last_progress >= STALL_SECONDS
+
+    def offer(self, msg: str) -> bool:
+        """큐에 적재 (논블로킹). 정책에 따라 오래된 메시지를 버리거나 연결을 끊음 -> 적재 여부"""
+        if self.closed:
+            return False
+        now = time.perf_counter()
+        item = (now, msg)
+        if self.queue.empty():
+            self.last_progress = now  # 쉬고 있던 writer는 지금부터 멈춤 여부를 잼
+        try:
+            self.queue.put_nowait(item)
+            self.consecutive_drops = 0
+            return True
+        except asyncio.QueueFull:
+            pass
+        stalled = self.stalled(now)
+        if SLOW_CONSUMER_POLICY == "disconnect" and stalled:
+            self.close("send queue full")
+            return False
+        self.queue.get_nowait()
+        self.queue.task_done()
+        self.dropped += 1
+        self.consecutive_drops += 1
+        if self.consecutive_drops >= MAX_DROPS and stalled:
+            self.close(f"dropped {self.consecutive_drops} messages in a row")
+            return False
+        self.queue.put_nowait(item)
+        return True
+
+    async def _run(self):
+        try:
+            while True:
+                enqueued_at, msg = await self.queue.get()
+                started = time.perf_counter()
+                try:
+                    # wait_for와 달리 태스크를 따로 만들지 않아 바로 끝나는 전송은 양보 없이 이어서 처리
+                    async with asyncio.timeout(SEND_TIMEOUT):
+                        await self.ws.send_text(msg)
+                except Exception as e:
+                    self.close(f"send failed: {e!r}")
+                    return
+                finally:
+                    self.queue.task_done()
+                finished = time.perf_counter()
+                self.last_progress = finished
+                self.sent += 1
+                self.send_seconds_sum += finished - started
+                self.send_seconds_max = max(self.send_seconds_max, finished - started)
+                self.lag_seconds_last = finished - enqueued_at
+        except asyncio.CancelledError:
+            pass
+
+    def close(self, reason: Optional[str] = None):
+        """구독 해제 + writer 종료 (느린 구독자는 소켓도 닫아 클라이언트가 재접속하게 함)"""
+        if self.closed:
+            return
+        self.closed = True
+        self.registry.discard(self.ws)
+        if reason:
+            print(f"[ws] closing {self.client_id}: {reason}")
+            asyncio.create_task(self._close_socket())
+        if asyncio.current_task() is not self.task:
+            self.task.cancel()
+
+    async def _close_socket(self):
+        try:
+            await self.ws.close(code=1013)  # try again later
+        except Exception:
+            pass
+
+class SubscriberRegistry:
+    """WebSocket -> Subscriber"""
+
+    def __init__(self):
+        self._subs: Dict[WebSocket, Subscriber] = {}
+
+    def add(self, ws: WebSocket) -> Subscriber:
+        sub = Subscriber(ws, self)
+        self._subs[ws] = sub
+        return sub
+
+    def discard(self, ws: WebSocket):
+        sub = self._subs.pop(ws, None)
+        if sub is not None and not sub.closed:
+            sub.close()
+
+    def publish(self, msg: str) -> int:
+        """직렬화된 메시지를 모든 구독자 큐에 적재 -> 적재한 구독자 수"""
+        return sum(1 for sub in list(self._subs.values()) if sub.offer(msg))
+
+    def __iter__(self):
+        return iter(list(self._subs.values()))
+
+    def __len__(self):
+        return len(self._subs)
 
 # 연결된 구독자
-subscribers: Set[WebSocket] = set()
+subscribers = SubscriberRegistry()
 
 # 브로드캐스트 작업 큐 (event, data)
 _queue: "asyncio.Queue[Tuple[str, Any]]" = asyncio.Queue()
@@ -29,30 +161,53 @@ def sanitize(event: str, data: Any) -> Any:
         return [sanitize(event, x) for x in data]
     return _finite_or_none(data)
 
-async def _broadcast(event: str, payload: Any):
-    # dead connection 제거하며 전송
-    dead = []
-    msg = json.dumps({"event": event, "data": payload}, default=str, ensure_ascii=False)
-    for ws in list(subscribers):
-        try:
-            await ws.send_text(msg)
-        except Exception:
-            dead.append(ws)
-    for ws in dead:
-        subscribers.discard(ws)
+def encode_message(event: str, data: Any) -> str:
+    """정규화 + JSON 직렬화 (구독자 수와 무관하게 메시지당 한 번)"""
+    return json.dumps({"event": event, "data": sanitize(event, data)}, default=str, ensure_ascii=False)
+
+def _broadcast(event: str, payload: Any):
+    # 같은 문자열 객체를 모든 구독자 큐에 공유 (전송은 구독자별 writer 태스크가 병렬로)
+    subscribers.publish(encode_message(event, payload))
 
 def enqueue(event: str, data: Any):
     """폴러/서비스 코드에서 호출: 큐에 적재(논블로킹)"""
     _queue.put_nowait((event, data))
 
 async def ws_writer():
-    """큐의 메시지를 소비해 정규화 후 브로드캐스트"""
+    """큐의 메시지를 직렬화해 구독자 큐로 분배 (전송을 기다리지 않음)"""
     while True:
         event, data = await _queue.get()
         try:
-            safe = sanitize(event, data)
-            await _broadcast(event, safe)
+            _broadcast(event, data)
         except Exception as e:
             print("[ws_writer] send error:", e, "event=", event)
         finally:
             _queue.task_done()
+        # 쌓인 메시지가 있으면 get()이 양보하지 않으므로, 몰아서 온 메시지(backfill 등)를
+        # 모두 분배하기 전에 구독자 writer들이 보낼 기회를 줌
+        await asyncio.sleep(0)
+
+def render_ws_metrics() -> str:
+    """구독자별 큐 깊이 / 전송 지연 / 전송·버림 수 (Prometheus 텍스트)"""
+    subs = list(subscribers)
+    lines = [
+        "# HELP ws_subscribers Connected WebSocket subscribers",
+        "# TYPE ws_subscribers gauge",
+        f"ws_subscribers {len(subs)}",
+        "# HELP ws_broadcast_backlog Messages waiting to be fanned out",
+        "# TYPE ws_broadcast_backlog gauge",
+        f"ws_broadcast_backlog {_queue.qsize()}",
+    ]
+    metrics = [
+        ("ws_send_queue_depth", "gauge", "Messages queued for the subscriber", lambda s: s.queue.qsize()),
+        ("ws_messages_sent_total", "counter", "Messages sent to the subscriber", lambda s: s.sent),
+        ("ws_messages_dropped_total", "counter", "Messages dropped by the slow-consumer policy", lambda s: s.dropped),
+        ("ws_send_seconds_sum", "counter", "Total time spent in send_text", lambda s: f"{s.send_seconds_sum:.6f}"),
+        ("ws_send_seconds_max", "gauge", "Slowest single send_text", lambda s: f"{s.send_seconds_max:.6f}"),
+        ("ws_delivery_lag_seconds", "gauge", "Queue wait + send time of the last message",
+         lambda s: f"{s.lag_seconds_last:.6f}"),
+    ]
+    for name, typ, help_text, value in metrics:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {typ}"]
+        lines += [f'{name}{{client="{s.client_id}"}} {value(s)}' for s in subs]
+    return "\n".join(lines) + "\n"
@@ -2,14 +2,16 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from pathlib import Path
+import os
 
-# trading.db = project root (server/의 한 단계 위)
-DB_PATH = (Path(__file__).resolve().parents[1] / "trading.db")
-DATABASE_URL = f"sqlite:///{DB_PATH.as_posix()}?mode=ro"
+# trading.db = project root (server/의 한 단계 위), TRADING_DB_PATH로 다른 파일 지정 (벤치마크 등)
+DB_PATH = Path(os.getenv("TRADING_DB_PATH") or Path(__file__).resolve().parents[1] / "trading.db").resolve()
+# 읽기 전용: file: URI + uri=true 여야 mode=ro가 적용됨 (트레이더가 WAL 모드로 기록, 읽기와 서로 막지 않음)
+DATABASE_URL = f"sqlite:///file:{DB_PATH.as_posix()}?mode=ro&uri=true"
 
 engine = create_engine(
     DATABASE_URL,
-    connect_args={"check_same_thread": False, "uri": True},  # sqlite URI 모드
+    connect_args={"check_same_thread": False},
     pool_pre_ping=True,
 )
 
@@ -7,27 +7,26 @@ import asyncio, uvicorn
 
 from router import api_router
 from broadcast import ws_writer, enqueue
-from watcher import poll_new_rows_loop, poll_new_reflections_loop
+from watcher import watch_changes_loop
 from db import SessionLocal
+from bootstrap import bootstrap_cache
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     print("[lifespan] starting tasks…")
     writer_task = asyncio.create_task(ws_writer())
-    poll_task = asyncio.create_task(
-        poll_new_rows_loop(SessionLocal, enqueue, interval_seconds=3, start_from_latest=True, bootstrap_last=120)
-    )
-     # NEW
-    poll_reflection_task = asyncio.create_task(
-        poll_new_reflections_loop(SessionLocal, enqueue, interval_seconds=5, start_from_latest=True, bootstrap_last=120)
+    # 새 신호/반성은 변경 감지 루프 하나가 처리 (CHANGE_NOTIFY_SOCKET 설정 시 트레이더 알림으로 즉시)
+    # 같은 루프가 /ws/updates bootstrap 링 버퍼도 채움
+    watch_task = asyncio.create_task(
+        watch_changes_loop(SessionLocal, enqueue, start_from_latest=True, bootstrap_last=120, cache=bootstrap_cache)
     )
     try:
         yield
     finally:
         print("[lifespan] shutting down…")
-        for t in [poll_task, writer_task, poll_reflection_task]:
+        for t in [watch_task, writer_task]:
             t.cancel()
-        await asyncio.gather(*[writer_task, poll_task, poll_reflection_task], return_exceptions=True)
+        await asyncio.gather(*[writer_task, watch_task], return_exceptions=True)
 
 app = FastAPI(lifespan=lifespan)
 
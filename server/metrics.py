@@ -0,0 +1,75 @@
+# server/metrics.py
+# trace_spans -> Prometheus 텍스트 포맷 (단계별 p50/p95 지연, 호출 수, 오류 수, LLM 토큰)
+from __future__ import annotations
+import math
+import time
+from collections import defaultdict
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from models import TraceSpan
+
+QUANTILES = (0.5, 0.95)
+
+def _quantile(sorted_values, q):
+    """nearest-rank 분위수 (ceil(q*n)번째 값)
+
+    >>> [_quantile(list(range(1, 11)), q) for q in (0.5, 0.99)]
+    [5, 10]
+    >>> [_quantile(list(range(1, 101)), q) for q in (0.5, 0.99)]
+    [50, 99]
+    """
+    idx = max(0, math.ceil(q * len(sorted_values)) - 1)
+    return sorted_values[idx]
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def render_metrics(db: Session, window_seconds: float) -> str:
+    since = time.time() - window_seconds
+    try:
+        rows = (db.query(TraceSpan.name, TraceSpan.duration_ms, TraceSpan.status,
+                         TraceSpan.prompt_tokens, TraceSpan.completion_tokens)
+                  .filter(TraceSpan.started_at >= since)
+                  .all())
+    except OperationalError:
+        rows = []  # 트레이더가 아직 span을 기록하지 않음 (테이블 없음)
+
+    durations = defaultdict(list)
+    errors = defaultdict(int)
+    tokens = defaultdict(lambda: [0, 0])
+    for name, duration_ms, status, prompt_tokens, completion_tokens in rows:
+        durations[name].append(duration_ms / 1000)
+        if status == "error":
+            errors[name] += 1
+        if prompt_tokens or completion_tokens:
+            tokens[name][0] += prompt_tokens or 0
+            tokens[name][1] += completion_tokens or 0
+
+    lines = [
+        f"# HELP trading_stage_duration_seconds Trading cycle stage latency over the last {window_seconds:g}s",
+        "# TYPE trading_stage_duration_seconds summary",
+    ]
+    for name in sorted(durations):
+        values = sorted(durations[name])
+        stage = _label(name)
+        for q in QUANTILES:
+            lines.append(f'trading_stage_duration_seconds{{stage="{stage}",quantile="{q:g}"}} {_quantile(values, q):.6f}')
+        lines.append(f'trading_stage_duration_seconds_sum{{stage="{stage}"}} {sum(values):.6f}')
+        lines.append(f'trading_stage_duration_seconds_count{{stage="{stage}"}} {len(values)}')
+
+    lines += [
+        "# HELP trading_stage_errors Failed spans per stage in the window",
+        "# TYPE trading_stage_errors gauge",
+    ]
+    for name in sorted(durations):
+        lines.append(f'trading_stage_errors{{stage="{_label(name)}"}} {errors[name]}')
+
+    lines += [
+        "# HELP trading_llm_tokens LLM token usage per stage in the window",
+        "# TYPE trading_llm_tokens gauge",
+    ]
+    for name in sorted(tokens):
+        prompt, completion = tokens[name]
+        lines.append(f'trading_llm_tokens{{stage="{_label(name)}",kind="prompt"}} {prompt}')
+        lines.append(f'trading_llm_tokens{{stage="{_label(name)}",kind="completion"}} {completion}')
+    return "\n".join(lines) + "\n"
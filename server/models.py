@@ -8,6 +8,8 @@ class TradingHistory(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     timestamp = Column(DateTime, nullable=False)
+    timestamp_ms = Column(Integer, index=True)           # UTC epoch ms (정렬/커서 조회용, migrations v2)
+    ticker = Column(String, nullable=False, default="KRW-BTC")  # 업비트 마켓 코드 (KRW-BTC)
     decision = Column(String, nullable=False)            # "buy" | "sell" | "hold" (소문자 저장 가정)
     percentage = Column(Float, nullable=False)
     reason = Column(Text, nullable=True)
@@ -25,6 +27,7 @@ class TradingReflection(Base):
     id = Column(Integer, primary_key=True, index=True)
     trading_id = Column(Integer, ForeignKey("trading_history.id"), nullable=False)
     reflection_date = Column(DateTime, nullable=False)
+    reflection_date_ms = Column(Integer, index=True)     # UTC epoch ms
 
     market_condition = Column(Text, nullable=False)
     decision_analysis = Column(Text, nullable=False)
@@ -33,3 +36,50 @@ class TradingReflection(Base):
     learning_points = Column(Text, nullable=False)
 
     history = relationship("TradingHistory", back_populates="reflections")
+
+class _HistoryRollup:
+    """trading_history 버킷 집계 (migrations v3, INSERT 트리거가 증분 갱신)"""
+    ticker = Column(String, primary_key=True)
+    bucket_ms = Column(Integer, primary_key=True)   # 버킷 시작 UTC epoch ms
+    bucket_start = Column(DateTime, nullable=False) # 버킷 시작 로컬 시각
+    rows = Column(Integer, nullable=False)
+    buy_count = Column(Integer, nullable=False)
+    sell_count = Column(Integer, nullable=False)
+    hold_count = Column(Integer, nullable=False)
+    percentage_sum = Column(Float, nullable=False)
+    last_id = Column(Integer, nullable=False)       # 버킷 마지막 trading_history.id
+    last_ms = Column(Integer, nullable=False)
+    last_price = Column(Float, nullable=False)
+    equity = Column(Float, nullable=False)          # 마지막 행 기준 KRW + 코인 평가액
+
+class HistoryRollupHourly(_HistoryRollup, Base):
+    __tablename__ = "history_rollup_hourly"
+
+class HistoryRollupDaily(_HistoryRollup, Base):
+    __tablename__ = "history_rollup_daily"
+
+class HistoryRollupWeekly(_HistoryRollup, Base):
+    __tablename__ = "history_rollup_weekly"
+
+# /history?resolution= 값 -> 롤업 모델
+ROLLUP_MODELS = {
+    "1h": HistoryRollupHourly,
+    "1d": HistoryRollupDaily,
+    "1w": HistoryRollupWeekly,
+}
+
+class TraceSpan(Base):
+    __tablename__ = "trace_spans"  # 트레이더(tracing.py)가 기록하는 사이클 단계별 span
+
+    id = Column(Integer, primary_key=True, index=True)
+    trace_id = Column(String, nullable=False)
+    span_id = Column(String, nullable=False)
+    parent_id = Column(String, nullable=True)
+    name = Column(String, nullable=False)        # cycle | source.news | llm.decision | order.fill ...
+    ticker = Column(String, nullable=True)
+    started_at = Column(Float, nullable=False)   # epoch 초
+    duration_ms = Column(Float, nullable=False)
+    status = Column(String, nullable=False)      # ok | empty | error
+    prompt_tokens = Column(Integer, nullable=False, default=0)
+    completion_tokens = Column(Integer, nullable=False, default=0)
+    attrs = Column(Text, nullable=True)          # JSON
@@ -1,19 +1,27 @@
 # server/router.py
 from __future__ import annotations
 from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect, Query
+from fastapi.responses import PlainTextResponse
 from sqlalchemy.orm import Session
-from typing import Optional, List
+from typing import Optional, List, Literal, Union
 from datetime import datetime
 from db import get_db, SessionLocal
-from models import TradingHistory, TradingReflection
+from models import TradingHistory, TradingReflection, ROLLUP_MODELS
 from schemas import (
     TradingHistoryOut, SignalOut, HistoryResponse, LatestResponse, HealthResponse, TradingReflectionOut, ReflectionsResponse,
+    RollupOut, RollupHistoryResponse, display_ticker,
 )
-from broadcast import subscribers
+from broadcast import subscribers, encode_message, render_ws_metrics
+from metrics import render_metrics
+from bootstrap import bootstrap_cache
 
 api_router = APIRouter()
 
 # --- helpers ---
+def _epoch_ms(dt: datetime) -> int:
+    """커서 시각 -> epoch ms (타임존 없는 값은 DB 기록과 같은 로컬 시각으로 간주)"""
+    return int(dt.timestamp() * 1000)
+
 def _to_signal(dto: TradingHistoryOut) -> SignalOut:
     typ = (dto.decision or "").upper()
     if typ not in {"BUY", "SELL", "HOLD", "ALERT"}:
@@ -21,28 +29,64 @@ def _to_signal(dto: TradingHistoryOut) -> SignalOut:
     return SignalOut(
         id=dto.id,
         ts=dto.timestamp,
-        ticker="BTC/KRW",
+        ticker=display_ticker(dto.ticker),
         price=dto.btc_krw_price,
         type=typ,
         confidence=dto.percentage,
         reason=dto.reason,
     )
 
+def _to_rollup(row) -> RollupOut:
+    return RollupOut(
+        ts=row.bucket_start,
+        ticker=display_ticker(row.ticker),
+        price=row.last_price,
+        equity=row.equity,
+        buy=row.buy_count,
+        sell=row.sell_count,
+        hold=row.hold_count,
+        avg_percentage=row.percentage_sum / row.rows if row.rows else 0.0,
+        count=row.rows,
+        last_id=row.last_id,
+    )
+
+def _rollup_history(db: Session, resolution: str, limit: int, cursor: Optional[datetime], ticker: Optional[str]):
+    """롤업 테이블에서 버킷 limit개 (행 수와 무관하게 조회 비용 일정)"""
+    model = ROLLUP_MODELS[resolution]
+    q = db.query(model)
+    if ticker is not None:
+        q = q.filter(model.ticker == ticker)
+    if cursor is not None:
+        q = q.filter(model.bucket_ms < _epoch_ms(cursor))
+    rows = (q.order_by(model.bucket_ms.desc())
+              .limit(limit)
+              .all())
+    rows = list(reversed(rows))  # 시간 오름차순으로 반환
+    next_cursor = rows[0].bucket_start if rows else None
+    return RollupHistoryResponse(resolution=resolution, items=[_to_rollup(r) for r in rows], next_cursor=next_cursor)
+
 # --- REST ---
 @api_router.get("/health", response_model=HealthResponse)
 def health():
     return HealthResponse(ok=True, time=datetime.utcnow())
 
-@api_router.get("/history", response_model=HistoryResponse)
+@api_router.get("/history", response_model=Union[HistoryResponse, RollupHistoryResponse])
 def history(
     limit: int = Query(100, ge=1, le=500),
     cursor: Optional[datetime] = Query(None, description="ISO8601 (이 시각 이전 데이터)")
+    , ticker: Optional[str] = Query(None, description="업비트 마켓 코드 (예: KRW-ETH)")
+    , resolution: Literal["raw", "1h", "1d", "1w"] = Query("raw", description="raw: 신호 원본, 1h/1d/1w: 버킷 집계")
     , db: Session = Depends(get_db),
 ):
+    if resolution != "raw":
+        return _rollup_history(db, resolution, limit, cursor, ticker)
+
     q = db.query(TradingHistory)
+    if ticker is not None:
+        q = q.filter(TradingHistory.ticker == ticker)
     if cursor is not None:
-        q = q.filter(TradingHistory.timestamp < cursor)
-    rows = (q.order_by(TradingHistory.timestamp.desc())
+        q = q.filter(TradingHistory.timestamp_ms < _epoch_ms(cursor))
+    rows = (q.order_by(TradingHistory.timestamp_ms.desc())
               .limit(limit)
               .all())
     rows = list(reversed(rows))  # 시간 오름차순으로 반환
@@ -52,11 +96,16 @@ def history(
     return HistoryResponse(items=items, next_cursor=next_cursor)
 
 @api_router.get("/latest", response_model=LatestResponse)
-def latest(db: Session = Depends(get_db)):
-    row = (db.query(TradingHistory)
-             .order_by(TradingHistory.timestamp.desc())
-             .limit(1)
-             .first())
+def latest(
+    ticker: Optional[str] = Query(None, description="업비트 마켓 코드 (예: KRW-ETH)"),
+    db: Session = Depends(get_db),
+):
+    q = db.query(TradingHistory)
+    if ticker is not None:
+        q = q.filter(TradingHistory.ticker == ticker)
+    row = (q.order_by(TradingHistory.timestamp_ms.desc())
+            .limit(1)
+            .first())
     if not row:
         return LatestResponse(last_price=0.0, last_signal=None)
     dto = TradingHistoryOut.model_validate(row)
@@ -76,9 +125,9 @@ def reflections(
     if trading_id is not None:
         q = q.filter(TradingReflection.trading_id == trading_id)
     if cursor is not None:
-        q = q.filter(TradingReflection.reflection_date < cursor)
+        q = q.filter(TradingReflection.reflection_date_ms < _epoch_ms(cursor))
 
-    rows = (q.order_by(TradingReflection.reflection_date.desc())
+    rows = (q.order_by(TradingReflection.reflection_date_ms.desc())
               .limit(limit)
               .all())
     rows = list(reversed(rows))  # 시간 오름차순 반환
@@ -89,54 +138,64 @@ def reflections(
 
 
 
-# --- WebSocket ---
-@api_router.websocket("/ws/updates")
-async def ws_updates(ws: WebSocket):
-    await ws.accept()
-    subscribers.add(ws)
+# --- Prometheus ---
+@api_router.get("/metrics", response_class=PlainTextResponse)
+def metrics(
+    window: int = Query(3600, ge=60, le=7 * 86400, description="집계 구간(초)"),
+    db: Session = Depends(get_db),
+):
+    body = render_metrics(db, window) + render_ws_metrics()
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
 
-    # ✅ 접속 즉시 부트스트랩 N건 전송 (예: 120건)
+
+
+# --- WebSocket ---
+def _bootstrap_from_db(sub):
     try:
         with SessionLocal() as db:
             rows = (db.query(TradingHistory)
-                      .order_by(TradingHistory.timestamp.desc())
-                      .limit(120)
+                      .order_by(TradingHistory.timestamp_ms.desc())
+                      .limit(bootstrap_cache.signals.maxlen)
                       .all())
         rows = list(reversed(rows))  # 시간 오름차순
-        items = [
-            {
-                "id": dto.id,
-                "ts": dto.timestamp,
-                "ticker": "BTC/KRW",
-                "price": dto.btc_krw_price,
-                "type": (dto.decision or "").upper() if (dto.decision or "").upper() in {"BUY","SELL","HOLD","ALERT"} else "HOLD",
-                "confidence": dto.percentage,
-                "reason": dto.reason,
-            }
-            for dto in (TradingHistoryOut.model_validate(r) for r in rows)
-        ]
-        await ws.send_json({"event": "bootstrap", "data": items})
+        items = [_to_signal(TradingHistoryOut.model_validate(r)).model_dump() for r in rows]
+        sub.offer(encode_message("bootstrap", items))
     except Exception as e:
         # bootstrap 실패해도 연결은 유지
         print("[ws bootstrap] error:", e)
-        
+
     try:
         with SessionLocal() as db:
             rws = (db.query(TradingReflection)
-                     .order_by(TradingReflection.reflection_date.desc())
-                     .limit(120)
+                     .order_by(TradingReflection.reflection_date_ms.desc())
+                     .limit(bootstrap_cache.reflections.maxlen)
                      .all())
         rws = list(reversed(rws))
         ritems = [TradingReflectionOut.model_validate(r) for r in rws]
-        await ws.send_json({"event": "bootstrap_reflections", "data": [i.model_dump() for i in ritems]})
+        sub.offer(encode_message("bootstrap_reflections", [i.model_dump() for i in ritems]))
     except Exception as e:
         print("[ws bootstrap_reflections] error:", e)
 
+@api_router.websocket("/ws/updates")
+async def ws_updates(ws: WebSocket):
+    await ws.accept()
+    # 이 연결로의 모든 전송은 구독자 큐 -> writer 태스크 한 곳에서만 (동시 send 방지)
+    sub = subscribers.add(ws)
+
+    # ✅ 접속 즉시 부트스트랩 N건 전송: watcher가 채운 링 버퍼의 미리 직렬화한 프레임 (DB 조회 없음)
+    frames = bootstrap_cache.frames()
+    if frames is not None:
+        for frame in frames:
+            sub.offer(frame)
+    else:
+        # watcher가 아직 채우지 않았거나 돌지 않는 경우 (예: lifespan 없이 라우터만 쓰는 벤치마크)
+        _bootstrap_from_db(sub)
+
     try:
         while True:
             text = await ws.receive_text()
             if text.strip().lower() == "ping":
-                await ws.send_json({"event": "pong", "data": None})
+                sub.offer(encode_message("pong", None))
     except WebSocketDisconnect:
         subscribers.discard(ws)
     except Exception:
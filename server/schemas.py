@@ -5,6 +5,11 @@ from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime
 
+def display_ticker(market: str) -> str:
+    """업비트 마켓 코드(KRW-BTC) -> 앱 표기(BTC/KRW)"""
+    quote, _, base = (market or "KRW-BTC").partition("-")
+    return f"{base}/{quote}" if base else market
+
 # === Public DTOs ===
 class SignalOut(BaseModel):
     id: int
@@ -19,6 +24,23 @@ class HistoryResponse(BaseModel):
     items: List[SignalOut]
     next_cursor: Optional[datetime] = Field(default=None, description="다음 페이지 커서 (ISO8601)")
 
+class RollupOut(BaseModel):
+    ts: datetime                    # 버킷 시작 시각
+    ticker: str = "BTC/KRW"
+    price: float                    # 버킷 마지막 가격
+    equity: float                   # 버킷 마지막 잔고 기준 총 평가액 (KRW)
+    buy: int
+    sell: int
+    hold: int
+    avg_percentage: float
+    count: int
+    last_id: int                    # 버킷 마지막 신호 id
+
+class RollupHistoryResponse(BaseModel):
+    resolution: str                 # 1h | 1d | 1w
+    items: List[RollupOut]
+    next_cursor: Optional[datetime] = Field(default=None, description="다음 페이지 커서 (ISO8601)")
+
 class LatestResponse(BaseModel):
     last_price: float
     last_signal: Optional[SignalOut] = None
@@ -29,6 +51,7 @@ class HealthResponse(BaseModel):
 class TradingHistoryOut(BaseModel):
     id: int
     timestamp: datetime
+    ticker: str = "KRW-BTC"
     decision: str
     percentage: float
     reason: str
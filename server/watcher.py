@@ -1,10 +1,24 @@
 # server/watcher.py
+# trading.db 변경 감지 -> 새 신호/반성 브로드캐스트
+# - 전용 sqlite3 연결의 PRAGMA data_version으로 다른 연결(트레이더)의 커밋 여부만 확인 (쿼리/디스크 읽기 없음)
+# - 바뀐 경우에만 세션 하나로 두 테이블의 새 행을 한 번에 조회
+# - CHANGE_NOTIFY_SOCKET 설정 시 트레이더(change_notify.py)의 Unix 소켓 알림으로 폴링 간격을 기다리지 않고 즉시 조회
+# - cache(BootstrapCache)를 넘기면 시작 시 최근 N건으로 채우고 새 행도 함께 넣음 (/ws/updates bootstrap용)
 import asyncio
+import os
+import socket
+import sqlite3
+from pathlib import Path
+from typing import Optional
 from sqlalchemy.orm import Session
 from models import TradingHistory, TradingReflection
-from schemas import TradingHistoryOut, TradingReflectionOut
+from schemas import TradingHistoryOut, TradingReflectionOut, display_ticker
+from db import DB_PATH
 from datetime import datetime
 
+WATCH_INTERVAL = float(os.getenv("WATCH_INTERVAL", "2"))           # data_version 확인 간격(초)
+CHANGE_NOTIFY_SOCKET = os.getenv("CHANGE_NOTIFY_SOCKET", "")        # 비우면 알림 수신 안 함
+
 def _to_signal_dto(dto: TradingHistoryOut):
     # DB 필드 → RN 요구 스키마 매핑
     t = dto
@@ -12,86 +26,151 @@ def _to_signal_dto(dto: TradingHistoryOut):
     return {
         "id": t.id,
         "ts": t.timestamp,             # pydantic json()에서 ISO로 직렬화
-        "ticker": "BTC/KRW",
+        "ticker": display_ticker(t.ticker),
         "price": t.btc_krw_price,
         "type": typ if typ in {"BUY", "SELL", "HOLD", "ALERT"} else "HOLD",
         "confidence": t.percentage,
         "reason": t.reason,
     }
 
-async def poll_new_rows_loop(db_factory, broadcast, interval_seconds=5, start_from_latest=True, bootstrap_last=50):
-    print("[poll] start: interval", interval_seconds)
+class DataVersion:
+    """PRAGMA data_version: 같은 연결로 읽은 이전 값과 다르면 다른 연결이 커밋한 것"""
+
+    def __init__(self, db_path: Path = DB_PATH):
+        self.db_path = Path(db_path)
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def read(self) -> Optional[int]:
+        """현재 값 (DB를 열 수 없으면 None -> 호출 측은 '변경됨'으로 취급)"""
+        try:
+            if self._conn is None:
+                self._conn = sqlite3.connect(f"file:{self.db_path.as_posix()}?mode=ro", uri=True,
+                                             check_same_thread=False)
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+        except sqlite3.Error:
+            self.close()
+            return None
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+class _NotifyProtocol(asyncio.DatagramProtocol):
+    def __init__(self, wake: asyncio.Event):
+        self.wake = wake
+
+    def datagram_received(self, data, addr):
+        self.wake.set()
+
+async def listen_notifications(path: str, wake: asyncio.Event):
+    """트레이더 알림 datagram 수신 소켓 (이전 실행이 남긴 소켓 파일은 교체) -> transport"""
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+    loop = asyncio.get_running_loop()
+    transport, _ = await loop.create_datagram_endpoint(
+        lambda: _NotifyProtocol(wake), local_addr=path, family=socket.AF_UNIX)
+    print("[watch] listening for change notifications on", path)
+    return transport
 
-    # 0) 시작 시 최근 N건 bootstrap
-    def _bootstrap():
+async def watch_changes_loop(db_factory, broadcast, db_path: Path = DB_PATH, interval_seconds: float = WATCH_INTERVAL,
+                             notify_socket: str = CHANGE_NOTIFY_SOCKET, start_from_latest=True, bootstrap_last=50,
+                             cache=None):
+    print("[watch] start: interval", interval_seconds, "notify", notify_socket or "off")
+
+    # 0) 시작 시 최근 N건 bootstrap + 기준 id
+    def _init():
         with db_factory() as db:  # type: Session
             rows = (db.query(TradingHistory)
                       .order_by(TradingHistory.id.desc())
                       .limit(bootstrap_last)
                       .all())
-            return list(reversed(rows))
-    init_rows = await asyncio.to_thread(_bootstrap)
-    from schemas import TradingHistoryOut
-    boots = [TradingHistoryOut.model_validate(r) for r in init_rows]
-    payload = [_to_signal_dto(b) for b in boots]
-    broadcast("bootstrap", payload)
-
-    # 1) 기준 id
-    def _init_max_id():
-        with db_factory() as db:
-            row = (db.query(TradingHistory.id)
-                     .order_by(TradingHistory.id.desc())
-                     .limit(1)).first()
-            return row[0] if row else 0
-    last_id = await asyncio.to_thread(_init_max_id) if start_from_latest else 0
-    print("[poll] initialized last_id =", last_id)
+            rows = list(reversed(rows))
+            last_id = db.query(TradingHistory.id).order_by(TradingHistory.id.desc()).limit(1).scalar() or 0
+            last_rid = db.query(TradingReflection.id).order_by(TradingReflection.id.desc()).limit(1).scalar() or 0
+            seed = None
+            if cache is not None:
+                size = cache.signals.maxlen
+                recent = (db.query(TradingHistory)
+                            .order_by(TradingHistory.timestamp_ms.desc())
+                            .limit(size)
+                            .all())
+                rws = (db.query(TradingReflection)
+                         .order_by(TradingReflection.reflection_date_ms.desc())
+                         .limit(size)
+                         .all())
+                seed = ([_to_signal_dto(TradingHistoryOut.model_validate(r)) for r in reversed(recent)],
+                        [TradingReflectionOut.model_validate(r).model_dump() for r in reversed(rws)])
+            return rows, last_id, last_rid, seed
+    init_rows, last_id, last_rid, seed = await asyncio.to_thread(_init)
+    broadcast("bootstrap", [_to_signal_dto(TradingHistoryOut.model_validate(r)) for r in init_rows])
+    if seed is not None:
+        cache.seed(*seed)
+    if not start_from_latest:
+        last_id = last_rid = 0
+    print("[watch] initialized last_id =", last_id, "last_reflection_id =", last_rid)
 
-    # 2) 루프
-    while True:
+    # 1) 변경 감지 준비
+    version = DataVersion(db_path)
+    seen = version.read()
+    wake = asyncio.Event()
+    transport = None
+    if notify_socket:
         try:
-            def _fetch_since(since_id: int):
-                with db_factory() as db:
-                    return (db.query(TradingHistory)
-                              .filter(TradingHistory.id > since_id)
-                              .order_by(TradingHistory.id.asc())
-                              .all())
-            rows = await asyncio.to_thread(_fetch_since, last_id)
-            for r in rows:
-                last_id = max(last_id, r.id)
-                dto = TradingHistoryOut.model_validate(r)
-                broadcast("signal", _to_signal_dto(dto))
-        except Exception as e:
-            print("[poll] error:", e)
-        await asyncio.sleep(interval_seconds)
-
+            transport = await listen_notifications(notify_socket, wake)
+        except OSError as e:
+            print("[watch] notify socket disabled:", e)
 
-async def poll_new_reflections_loop(db_factory, broadcast, interval_seconds=5, start_from_latest=True, bootstrap_last=50):
-    print("[poll_reflection] start:", interval_seconds)
-
-    def _init_max_id():
+    def _fetch_since(since_id: int, since_rid: int):
+        # 두 테이블을 세션 하나로 한 번에 조회
         with db_factory() as db:
-            row = (db.query(TradingReflection.id)
-                     .order_by(TradingReflection.id.desc())
-                     .limit(1)).first()
-            return row[0] if row else 0
-    last_id = await asyncio.to_thread(_init_max_id) if start_from_latest else 0
-    print("[poll_reflection] initialized last_id =", last_id)
+            rows = (db.query(TradingHistory)
+                      .filter(TradingHistory.id > since_id)
+                      .order_by(TradingHistory.id.asc())
+                      .all())
+            rws = (db.query(TradingReflection)
+                     .filter(TradingReflection.id > since_rid)
+                     .order_by(TradingReflection.id.asc())
+                     .all())
+            return ([TradingHistoryOut.model_validate(r) for r in rows],
+                    [TradingReflectionOut.model_validate(r) for r in rws])
 
-    while True:
-        try:
-            def _fetch_since(since_id: int):
-                with db_factory() as db:
-                    return (db.query(TradingReflection)
-                              .filter(TradingReflection.id > since_id)
-                              .order_by(TradingReflection.id.asc())
-                              .all())
-            rows = await asyncio.to_thread(_fetch_since, last_id)
-            for r in rows:
-                last_id = max(last_id, r.id)
-                dto = TradingReflectionOut.model_validate(r)
-                # WS로 단건 push
-                broadcast("reflection", dto.model_dump())
-        except Exception as e:
-            print("[poll_reflection] error:", e)
-        await asyncio.sleep(interval_seconds)
-        
\ No newline at end of file
+    # 2) 루프: 알림이 오거나 interval마다 data_version 확인, 바뀐 경우에만 조회
+    try:
+        while True:
+            try:
+                await asyncio.wait_for(wake.wait(), timeout=interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            notified = wake.is_set()
+            wake.clear()
+            try:
+                current = version.read()
+                if not notified and current is not None and current == seen:
+                    continue
+                # 조회 전에 읽은 값을 기준으로 삼아 조회 중 커밋은 다음 확인에서 다시 감지
+                seen = current
+                signals, reflections = await asyncio.to_thread(_fetch_since, last_id, last_rid)
+                signal_items = [_to_signal_dto(dto) for dto in signals]
+                reflection_items = [dto.model_dump() for dto in reflections]
+                for dto, item in zip(signals, signal_items):
+                    last_id = max(last_id, dto.id)
+                    broadcast("signal", item)
+                for dto, item in zip(reflections, reflection_items):
+                    last_rid = max(last_rid, dto.id)
+                    # WS로 단건 push
+                    broadcast("reflection", item)
+                if cache is not None:
+                    cache.add(signal_items, reflection_items)
+            except Exception as e:
+                print("[watch] error:", e)
+    finally:
+        version.close()
+        if transport is not None:
+            transport.close()
+            try:
+                os.unlink(notify_socket)
+            except OSError:
+                pass
@@ -0,0 +1,107 @@
+"""strategy.txt 전략 요약(digest) 캐시
+
+유튜브 자막 분석은 strategy.txt 내용이 바뀌거나 youtube_channels에 새 영상이
+추가됐을 때만 LLM으로 다시 계산하고, 결과는 내용 해시를 키로 파일에 저장해 재사용한다.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+from datetime import datetime
+
+from youtube_transcript_api import YouTubeTranscriptApi
+
+
+DIGEST_VERSION = 1  # 분석 프롬프트/형식이 바뀌면 올려서 기존 캐시 무효화
+VIDEO_HEADER = "=== Video ID: {} ==="
+VIDEO_HEADER_RE = re.compile(r"^=== Video ID: (\S+) ===$", re.MULTILINE)
+
+
+def fetch_transcript(video_id, languages=("ko",)):
+    """유튜브 자막 텍스트 조회"""
+    fetched = YouTubeTranscriptApi().fetch(video_id, languages=list(languages))
+    return " ".join(snippet.text for snippet in fetched)
+
+
+class StrategyDigest:
+    """strategy.txt 해시 기반 분석 결과 캐시"""
+
+    def __init__(self, analyze_fn, video_ids=(), strategy_path="strategy.txt",
+                 cache_path="strategy_digest.json", model=""):
+        self.analyze_fn = analyze_fn  # (strategy 텍스트) -> 분석 dict
+        self.video_ids = list(video_ids)
+        self.strategy_path = strategy_path
+        self.cache_path = cache_path
+        self.model = model
+        self._lock = threading.Lock()
+        self._cached = None  # (key, analysis)
+
+    def _read_strategy(self):
+        with open(self.strategy_path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    def add_missing_transcripts(self, content):
+        """youtube_channels에 있지만 strategy.txt에 없는 영상 자막을 추가"""
+        present = set(VIDEO_HEADER_RE.findall(content))
+        added = []
+        for video_id in self.video_ids:
+            if video_id in present:
+                continue
+            try:
+                text = fetch_transcript(video_id)
+            except Exception as e:
+                print(f"Error processing transcript for video {video_id}: {e}")
+                continue
+            added.append(f"\n\n{VIDEO_HEADER.format(video_id)}\n{text}\n")
+
+        if added:
+            with open(self.strategy_path, "a", encoding="utf-8") as f:
+                f.writelines(added)
+            print(f"[strategy_digest] 새 영상 자막 {len(added)}개 추가")
+            content = self._read_strategy()
+        return content
+
+    def key_for(self, content):
+        h = hashlib.sha256()
+        h.update(f"v{DIGEST_VERSION}|{self.model}|".encode())
+        h.update(content.encode("utf-8"))
+        return h.hexdigest()
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data.get("key"), data.get("analysis")
+        except (OSError, ValueError):
+            return None, None
+
+    def _save_cache(self, key, analysis):
+        tmp = f"{self.cache_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "key": key,
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+                "analysis": analysis,
+            }, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.cache_path)  # 중간에 죽어도 기존 캐시가 깨지지 않도록 원자적 교체
+
+    def get(self):
+        """최신 전략 분석 결과 (변경이 없으면 캐시 반환)"""
+        with self._lock:
+            content = self.add_missing_transcripts(self._read_strategy())
+            key = self.key_for(content)
+
+            if self._cached and self._cached[0] == key:
+                return self._cached[1]
+            cached_key, analysis = self._load_cache()
+            if cached_key == key and analysis is not None:
+                self._cached = (key, analysis)
+                return analysis
+
+            print("[strategy_digest] strategy.txt 변경 감지, 전략 분석 재계산")
+            analysis = self.analyze_fn(content)
+            if analysis is not None:
+                self._save_cache(key, analysis)
+                self._cached = (key, analysis)
+            return analysis
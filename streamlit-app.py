@@ -29,6 +29,7 @@ def load_recent_trades():
    query = """
        SELECT
            timestamp,
+           ticker,
            decision,
            percentage,
            reason,
@@ -37,7 +38,7 @@ def load_recent_trades():
            btc_avg_buy_price,
            btc_krw_price
        FROM trading_history
-       ORDER BY timestamp DESC
+       ORDER BY timestamp_ms DESC
    """
    return pd.read_sql_query(query, conn)
 
@@ -52,11 +53,38 @@ def load_reflections():
            h.btc_krw_price
        FROM trading_reflection r
        JOIN trading_history h ON r.trading_id = h.id
-       ORDER BY r.reflection_date DESC
+       ORDER BY r.reflection_date_ms DESC
    """
    return pd.read_sql_query(query, conn)
 
 
+# 차트 해상도 -> 롤업 테이블 (migrations v3, 거래 기록 시 트리거로 갱신)
+ROLLUP_TABLES = {
+   "1시간": "history_rollup_hourly",
+   "1일": "history_rollup_daily",
+   "1주": "history_rollup_weekly",
+}
+
+
+@st.cache_data(ttl=60)
+def load_rollup(table, ticker):
+   # 롤업은 티커별 버킷이므로 한 티커만 (섞으면 가격 선이 마켓 사이를 오감)
+   query = f"""
+       SELECT
+           bucket_start AS timestamp,
+           ticker,
+           last_price AS btc_krw_price,
+           equity,
+           buy_count,
+           sell_count,
+           hold_count
+       FROM {table}
+       WHERE ticker = ?
+       ORDER BY bucket_ms
+   """
+   return pd.read_sql_query(query, conn, params=(ticker,))
+
+
 # 메인 대시보드
 st.title("📊 트레이딩 모니터링 대시보드")
 
@@ -95,11 +123,19 @@ st.subheader("📈 거래 히스토리")
 trades_df['timestamp'] = pd.to_datetime(trades_df['timestamp'])
 
 
-# BTC 가격 차트
-fig_price = px.line(trades_df,
+# BTC 가격 차트 (장기 구간은 롤업 버킷으로 그려 행 수와 무관하게 일정한 비용)
+tickers = sorted(trades_df['ticker'].unique()) or ["KRW-BTC"]
+chart_ticker = st.sidebar.selectbox("차트 티커", tickers,
+                                   index=tickers.index("KRW-BTC") if "KRW-BTC" in tickers else 0)
+resolution = st.sidebar.selectbox("차트 해상도", ["원본", *ROLLUP_TABLES], index=0)
+price_df = trades_df[trades_df['ticker'] == chart_ticker]
+if resolution in ROLLUP_TABLES:
+   price_df = load_rollup(ROLLUP_TABLES[resolution], chart_ticker)
+   price_df['timestamp'] = pd.to_datetime(price_df['timestamp'])
+fig_price = px.line(price_df,
                    x='timestamp',
                    y='btc_krw_price',
-                   title='BTC 가격 변동')
+                   title=f'{chart_ticker} 가격 변동')
 fig_price.update_layout(height=400)
 st.plotly_chart(fig_price, use_container_width=True)
 
@@ -0,0 +1,217 @@
+"""매매 규칙 파라미터 탐색 (TradingParams 그리드/무작위 탐색)
+
+- 과거 OHLCV, 지표, 정책 신호는 부모 프로세스에서 한 번만 계산해 공유 메모리에 올림
+- 워커(spawn 프로세스 풀)는 공유 메모리에 붙어 backtest.simulate_arrays만 반복 실행
+- 결과는 목적 함수(total_return / sharpe / calmar) 순위와 함께 SQLite sweep_results 테이블에 저장
+"""
+import itertools
+import json
+import os
+import random
+import sqlite3
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, fields, replace
+from datetime import datetime
+from multiprocessing import get_context, shared_memory
+
+import numpy as np
+
+import trade_rules
+from backtest import DECISIONS, UPBIT_FEE, RulePolicy, align_fear_greed, performance, simulate_arrays
+from indicators import add_indicators
+
+
+SWEEP_DB_PATH = os.getenv('SWEEP_DB_PATH', 'sweep.db')
+SWEEP_WORKERS = int(os.getenv('SWEEP_WORKERS', str(os.cpu_count() or 1)))
+
+# 그리드 탐색 후보값 (무작위 탐색은 각 목록의 최소~최대 구간에서 균등 추출, DISCRETE 축은 후보값 중 선택)
+SEARCH_SPACE = {
+    "fear_level": [15, 20, 25, 30, 35],
+    "greed_level": [65, 70, 75, 80, 85],
+    "boost": [1.0, 1.2, 1.5],
+    "dampen": [0.5, 0.8, 1.0],
+    "min_confidence": [60, 70, 80],
+    "fallback_order_krw": [5000, 5001],   # 5000: 최소 금액 이하 매수는 건너뜀 (trade_rules.buy_order)
+}
+DISCRETE = {"fallback_order_krw"}
+
+# 공유 메모리 배열 행 순서 (decision은 DECISIONS 인덱스로 저장)
+ROWS = ["open", "close", "decision", "percentage", "confidence", "fear_greed"]
+
+
+def _score(stats, objective):
+    if objective == "calmar":
+        drawdown = abs(stats["max_drawdown"])
+        return stats["total_return"] / drawdown if drawdown > 0 else stats["total_return"]
+    return stats[objective]
+
+
+def grid_params(space=SEARCH_SPACE):
+    """후보값의 모든 조합 -> TradingParams 목록"""
+    names = list(space)
+    return [trade_rules.TradingParams(**dict(zip(names, values)))
+            for values in itertools.product(*(space[n] for n in names))]
+
+
+def random_params(count, space=SEARCH_SPACE, seed=None):
+    """각 필드를 후보값 범위에서 균등 추출 (fear_level < greed_level 유지)"""
+    rng = random.Random(seed)
+    result = []
+    while len(result) < count:
+        values = {name: rng.choice(space[name]) if name in DISCRETE
+                  else round(rng.uniform(min(space[name]), max(space[name])), 2) for name in space}
+        if values["fear_level"] < values["greed_level"]:
+            result.append(trade_rules.TradingParams(**values))
+    return result
+
+
+def collapse_confidence(candidates, decision, confidence):
+    """정책 신뢰도가 상수면 min_confidence는 '모두 통과/모두 차단'만 가르므로 같은 결과인 후보는 하나만 남김
+
+    (RulePolicy는 고정 confidence, RecordedPolicy.from_trading_db도 저장된 신뢰도가 없어 상수)
+    """
+    active = np.unique(confidence[(decision == "buy") | (decision == "sell")])
+    if len(active) > 1:
+        return candidates
+    level = active[0] if len(active) else 0
+    kept = {}
+    for params in candidates:
+        kept.setdefault((replace(params, min_confidence=0), params.min_confidence <= level), params)
+    if len(kept) < len(candidates):
+        print(f"policy confidence is constant ({level:g}): min_confidence axis dropped, "
+              f"{len(candidates)} -> {len(kept)} candidates")
+    return list(kept.values())
+
+
+# --- 워커 ---
+_worker = {}
+
+
+def _attach(name, shape, interval, initial_krw, fee, fill):
+    """워커 초기화: 공유 메모리에 붙어 배열 뷰를 만든다 (복사 없음)"""
+    shm = shared_memory.SharedMemory(name=name)  # spawn 워커는 부모의 resource tracker를 공유, 해제는 부모가 담당
+    data = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    arrays = dict(zip(ROWS, data))
+    arrays["decision"] = DECISIONS[arrays["decision"].astype(np.int8)]
+    _worker.update(shm=shm, arrays=arrays, interval=interval, initial_krw=initial_krw, fee=fee, fill=fill)
+
+
+def _evaluate(params):
+    a = _worker["arrays"]
+    equity, drawdown, exposure_value, trades, rejected = simulate_arrays(
+        a["open"], a["close"], a["decision"], a["percentage"], a["confidence"], a["fear_greed"],
+        params, _worker["initial_krw"], _worker["fee"], _worker["fill"])
+    return performance(a["close"], equity, drawdown, exposure_value, trades, rejected,
+                       _worker["interval"], _worker["initial_krw"])
+
+
+# --- 결과 저장 ---
+def save_results(rows, run_id, ticker, interval, objective, db_path=SWEEP_DB_PATH):
+    """순위가 매겨진 결과 저장 (rows: (params, stats, score) 점수 내림차순)"""
+    with sqlite3.connect(db_path) as conn:
+        conn.execute('''
+        CREATE TABLE IF NOT EXISTS sweep_results (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            run_id TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            ticker TEXT NOT NULL,
+            interval TEXT NOT NULL,
+            objective TEXT NOT NULL,
+            rank INTEGER NOT NULL,
+            score REAL NOT NULL,
+            params TEXT NOT NULL,
+            stats TEXT NOT NULL
+        )''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_sweep_results_run ON sweep_results (run_id, rank)')
+        created_at = datetime.now().isoformat()
+        conn.executemany(
+            'INSERT INTO sweep_results (run_id, created_at, ticker, interval, objective, rank, score, params, stats) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            [(run_id, created_at, ticker, interval, objective, rank, score, json.dumps(asdict(params)), json.dumps(stats))
+             for rank, (params, stats, score) in enumerate(rows, 1)])
+
+
+def run_sweep(ohlcv, candidates, policy=None, fear_greed=None, interval="minute60", objective="sharpe",
+              workers=SWEEP_WORKERS, initial_krw=1_000_000, fee=UPBIT_FEE, fill="next_open"):
+    """파라미터 후보 전체 백테스트 -> [(params, stats, score)] 점수 내림차순
+
+    정책 신뢰도가 상수면 min_confidence만 다른 후보는 하나로 합쳐 평가 (collapse_confidence)
+    """
+    frame = add_indicators(ohlcv.copy())  # 호출 측 DataFrame(캐시된 캔들 등)에 컬럼을 추가하지 않음
+    frame["fear_greed"] = align_fear_greed(frame.index, fear_greed)
+    signals = (policy or RulePolicy())(frame)
+    candidates = collapse_confidence(candidates, signals["decision"].to_numpy(),
+                                     signals["confidence_score"].to_numpy(dtype=float))
+
+    codes = {name: i for i, name in enumerate(DECISIONS)}
+    data = np.stack([
+        frame["open"].to_numpy(dtype=float),
+        frame["close"].to_numpy(dtype=float),
+        signals["decision"].map(codes).to_numpy(dtype=float),
+        signals["percentage"].to_numpy(dtype=float),
+        signals["confidence_score"].to_numpy(dtype=float),
+        frame["fear_greed"].to_numpy(dtype=float),
+    ])
+
+    shm = shared_memory.SharedMemory(create=True, size=data.nbytes)
+    try:
+        np.ndarray(data.shape, dtype=data.dtype, buffer=shm.buf)[:] = data
+        workers = max(1, min(workers, len(candidates)))
+        chunksize = max(1, len(candidates) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"), initializer=_attach,
+                                 initargs=(shm.name, data.shape, interval, initial_krw, fee, fill)) as pool:
+            results = list(pool.map(_evaluate, candidates, chunksize=chunksize))
+    finally:
+        shm.close()
+        shm.unlink()
+
+    rows = [(params, stats, _score(stats, objective)) for params, stats in zip(candidates, results)]
+    rows.sort(key=lambda row: row[2], reverse=True)
+    return rows
+
+
+def print_top(rows, objective, top=10):
+    print(f"\n=== Top {min(top, len(rows))} by {objective} ===")
+    names = [f.name for f in fields(trade_rules.TradingParams)]
+    print(" ".join(f"{n:>18}" for n in names) + f" {'return':>9} {'mdd':>8} {'sharpe':>7} {'trades':>6}")
+    for params, stats, _ in rows[:top]:
+        print(" ".join(f"{getattr(params, n):>18g}" for n in names)
+              + f" {stats['total_return']:>9.4f} {stats['max_drawdown']:>8.4f} {stats['sharpe']:>7.3f} {stats['trades']:>6}")
+
+
+if __name__ == "__main__":
+    # 사용 예: python sweep.py KRW-BTC minute60 8760 grid sharpe
+    #          python sweep.py KRW-BTC minute60 8760 random:500 calmar
+    import sys
+    from backtest import fetch_fear_greed_history
+    from candle_store import CandleStore
+
+    ticker = sys.argv[1] if len(sys.argv) > 1 else "KRW-BTC"
+    interval = sys.argv[2] if len(sys.argv) > 2 else "minute60"
+    count = int(sys.argv[3]) if len(sys.argv) > 3 else 24 * 365
+    mode = sys.argv[4] if len(sys.argv) > 4 else "grid"
+    objective = sys.argv[5] if len(sys.argv) > 5 else "sharpe"
+
+    if mode.startswith("random"):
+        _, _, n = mode.partition(":")
+        candidates = random_params(int(n or 200))
+    else:
+        candidates = grid_params()
+
+    ohlcv = CandleStore().get(ticker, interval, count)
+    try:
+        fear_greed = fetch_fear_greed_history()
+    except Exception as e:
+        print(f"Error fetching fear and greed history: {e}")
+        fear_greed = None
+
+    started = time.perf_counter()
+    rows = run_sweep(ohlcv, candidates, fear_greed=fear_greed, interval=interval, objective=objective)
+    elapsed = time.perf_counter() - started
+
+    run_id = uuid.uuid4().hex[:12]
+    save_results(rows, run_id, ticker, interval, objective)
+    print_top(rows, objective)
+    print(f"\nrun_id {run_id}: {len(rows)} candidates, {SWEEP_WORKERS} workers, {elapsed:.2f}s -> {SWEEP_DB_PATH}")
@@ -0,0 +1,90 @@
+"""trade_rules.plan_order(백테스트)와 execute_trade(실거래)가 같은 주문을 내는지 확인"""
+import pytest
+
+import autotrade
+import trade_rules
+from account_snapshot import AccountSnapshot
+from order_executor import OrderExecutor
+from tracing import get_tracer
+
+
+TICKER = "KRW-BTC"
+PRICE = 100_000_000
+
+
+class FakeUpbit:
+    """잔고 고정 + 주문 기록 (주문은 바로 done)"""
+
+    def __init__(self, krw, btc):
+        self.rows = [
+            {"currency": "KRW", "unit_currency": "KRW", "balance": str(krw), "locked": "0", "avg_buy_price": "0"},
+            {"currency": "BTC", "unit_currency": "KRW", "balance": str(btc), "locked": "0",
+             "avg_buy_price": str(PRICE)},
+        ]
+        self.orders = []
+
+    def get_balances(self):
+        return self.rows
+
+    def buy_market_order(self, ticker, price):
+        self.orders.append(("buy", price))
+        return {"uuid": f"order-{len(self.orders)}", "state": "wait"}
+
+    def sell_market_order(self, ticker, volume):
+        self.orders.append(("sell", volume))
+        return {"uuid": f"order-{len(self.orders)}", "state": "wait"}
+
+    def get_order(self, uuid):
+        return {"uuid": uuid, "state": "done", "executed_volume": "0", "paid_fee": "0", "trades": []}
+
+
+class FakeDB:
+    def record_trade(self, trade_data):
+        return 1
+
+    def save_order_fill(self, ticket):
+        pass
+
+
+def live_order(params, decision, percentage, confidence, fear_greed, krw, btc):
+    """execute_trade가 업비트에 넣은 주문 -> ("buy", KRW) | ("sell", 수량) | None"""
+    upbit = FakeUpbit(krw, btc)
+    account = AccountSnapshot(upbit)
+    trader = autotrade.EnhancedCryptoTrader.__new__(autotrade.EnhancedCryptoTrader)
+    trader.ticker, trader.account, trader.db, trader.params = TICKER, account, FakeDB(), params
+    trader.trade_manager = autotrade.TradeManager(
+        upbit, TICKER, account=account, params=params, executor=OrderExecutor(upbit, account=account, poll_initial=0))
+    trader.execute_trade(decision, percentage, confidence, fear_greed, "test", price=PRICE)
+    trader.trade_manager.executor.wait_all(5)
+    assert len(upbit.orders) <= 1
+    return upbit.orders[0] if upbit.orders else None
+
+
+@pytest.fixture(autouse=True)
+def no_trace_writes():
+    # 체결 추적 span이 trading.db에 기록되지 않도록
+    tracer = get_tracer()
+    enabled, tracer.enabled = tracer.enabled, False
+    yield
+    tracer.enabled = enabled
+
+
+@pytest.mark.parametrize("params", [trade_rules.TradingParams(), trade_rules.TradingParams(fallback_order_krw=5000)])
+@pytest.mark.parametrize("decision, percentage, confidence, fear_greed, krw, btc", [
+    ("buy", 50, 80, 10, 1_000_000, 0.01),       # 공포: 매수 확대
+    ("buy", 50, 80, 90, 1_000_000, 0.01),       # 탐욕: 매수 축소
+    ("sell", 50, 80, 90, 1_000_000, 0.01),      # 탐욕: 매도 확대
+    ("sell", 50, 80, 10, 1_000_000, 0.01),      # 공포: 매도 축소
+    ("buy", 10, 80, 50, 20_000, 0.01),          # 최소 금액 이하 매수 -> fallback
+    ("sell", 10, 80, 50, 1_000_000, 0.0004),    # 최소 금액 이하 매도 -> fallback
+    ("buy", 50, 60, 50, 1_000_000, 0.01),       # 신뢰도 미달
+    ("hold", 50, 80, 50, 1_000_000, 0.01),
+])
+def test_plan_order_matches_execute_trade(params, decision, percentage, confidence, fear_greed, krw, btc):
+    planned = trade_rules.plan_order(decision, percentage, confidence, fear_greed, krw, btc, PRICE, params)
+    live = live_order(params, decision, percentage, confidence, fear_greed, krw, btc)
+    if planned is None:
+        assert live is None
+    else:
+        assert live is not None and live[0] == planned[0]
+        assert live[1] == pytest.approx(planned[1])
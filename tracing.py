@@ -0,0 +1,139 @@
+"""매매 사이클 단계별 트레이싱
+
+- with get_tracer().span("source.news"): ... 형태로 단계 소요 시간 측정
+- 부모 span은 contextvars로 전파 (스레드 풀 작업은 contextvars.copy_context()로 넘김)
+- LLM span에는 prompt/completion 토큰 수 기록
+- 끝난 span은 메모리에 모았다가 최상위 span이 끝날 때 SQLite trace_spans 테이블에 한 번에 기록
+  (서버 /metrics가 이 테이블로 단계별 p50/p95 지연과 토큰 수 집계)
+"""
+import atexit
+import contextvars
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from migrations import configure, migrate
+
+
+TRACING = os.getenv('TRACING', 'true').lower() == 'true'
+TRACE_DB_PATH = os.getenv('TRACE_DB_PATH', 'trading.db')
+TRACE_FLUSH_SIZE = 64  # 최상위 span이 끝나기 전이라도 이만큼 쌓이면 기록
+
+_current = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "ticker", "started_at", "_t0",
+                 "duration_ms", "status", "prompt_tokens", "completion_tokens", "attrs")
+
+    def __init__(self, name, parent=None, ticker=None):
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex[:16]
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.name = name
+        self.ticker = ticker or (parent.ticker if parent else None)
+        self.started_at = time.time()
+        self._t0 = time.perf_counter()
+        self.duration_ms = None
+        self.status = "ok"
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.attrs = {}
+
+    def set(self, prompt_tokens=None, completion_tokens=None, **attrs):
+        """토큰 수/속성 기록"""
+        if prompt_tokens is not None:
+            self.prompt_tokens = prompt_tokens
+        if completion_tokens is not None:
+            self.completion_tokens = completion_tokens
+        self.attrs.update(attrs)
+
+    def finish(self):
+        self.duration_ms = (time.perf_counter() - self._t0) * 1000
+
+
+def current_span():
+    return _current.get()
+
+
+class Tracer:
+    """span 수집 + SQLite 기록 (스레드 안전)"""
+
+    def __init__(self, db_path=TRACE_DB_PATH, enabled=TRACING, flush_size=TRACE_FLUSH_SIZE):
+        self.db_path = db_path
+        self.enabled = enabled
+        self.flush_size = flush_size
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            configure(self._conn)  # trading.db와 같은 파일이면 WAL로 트레이더 기록과 겹쳐도 대기 없음
+            migrate(self._conn)    # trace_spans는 migrations v5
+        return self._conn
+
+    @contextmanager
+    def span(self, name, ticker=None, **attrs):
+        """현재 span의 자식 span (없으면 새 trace 시작)"""
+        span = Span(name, _current.get(), ticker)
+        span.attrs.update(attrs)
+        token = _current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.attrs.setdefault("error", str(e))
+            raise
+        finally:
+            _current.reset(token)
+            span.finish()
+            self._record(span)
+
+    def _record(self, span):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._buffer.append(span)
+            full = len(self._buffer) >= self.flush_size
+        if span.parent_id is None or full:
+            self.flush()
+
+    def flush(self):
+        """모인 span을 trace_spans에 기록"""
+        with self._lock:
+            spans, self._buffer = self._buffer, []
+            if not spans:
+                return
+            try:
+                conn = self._connect()
+                conn.executemany("""
+                    INSERT INTO trace_spans (
+                        trace_id, span_id, parent_id, name, ticker, started_at, duration_ms,
+                        status, prompt_tokens, completion_tokens, attrs
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, [(s.trace_id, s.span_id, s.parent_id, s.name, s.ticker, s.started_at, s.duration_ms,
+                       s.status, s.prompt_tokens, s.completion_tokens,
+                       json.dumps(s.attrs, default=str) if s.attrs else None) for s in spans])
+                conn.commit()
+            except Exception as e:
+                print(f"Error in Tracer.flush: {e}")
+
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer():
+    """프로세스 공용 Tracer"""
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            _tracer = Tracer()
+            atexit.register(_tracer.flush)
+        return _tracer
@@ -0,0 +1,93 @@
+"""매매 규칙 (실거래 execute_trade와 백테스트가 함께 사용)
+
+- 공포탐욕지수에 따른 거래 비율 조정
+- 최소 주문 금액(5000 KRW) 처리와 주문 크기 계산
+- 조정 가능한 값은 TradingParams로 묶어 환경 변수/파라미터 탐색(sweep.py)으로 설정
+"""
+import os
+from dataclasses import dataclass, fields
+
+
+MIN_TRADE_AMOUNT = 5000     # 업비트 최소 주문 금액 (KRW), 거래소 규칙이라 조정 대상 아님
+
+
+@dataclass(frozen=True)
+class TradingParams:
+    fear_level: float = 25              # 공포탐욕지수 이하: 공포
+    greed_level: float = 75             # 이상: 탐욕
+    boost: float = 1.2                  # 역추세 방향(공포 매수/탐욕 매도) 비율 확대
+    dampen: float = 0.8                 # 추세 추종 방향 비율 축소
+    min_confidence: float = 70          # 이 미만이면 매매하지 않음
+    fallback_order_krw: float = 5001    # 계산된 주문이 최소 금액 이하일 때 대신 쓰는 금액
+
+    @classmethod
+    def from_env(cls, prefix="TRADE_"):
+        """TRADE_FEAR_LEVEL, TRADE_MIN_CONFIDENCE ... 환경 변수로 기본값 덮어쓰기"""
+        overrides = {}
+        for f in fields(cls):
+            value = os.getenv(f"{prefix}{f.name.upper()}")
+            if value is not None:
+                overrides[f.name] = float(value)
+        return cls(**overrides)
+
+
+DEFAULT_PARAMS = TradingParams()
+
+
+def adjust_trade_ratio(base_ratio, fear_greed_value, trade_type, params=DEFAULT_PARAMS):
+    """공포탐욕지수에 따른 거래 비율 조정 (base_ratio: 0~100 -> 0~1)"""
+    trade_ratio = base_ratio / 100.0
+
+    if trade_type == "buy":
+        if fear_greed_value <= params.fear_level:
+            trade_ratio = min(trade_ratio * params.boost, 1.0)
+        elif fear_greed_value >= params.greed_level:
+            trade_ratio = trade_ratio * params.dampen
+    elif trade_type == "sell":
+        if fear_greed_value >= params.greed_level:
+            trade_ratio = min(trade_ratio * params.boost, 1.0)
+        elif fear_greed_value <= params.fear_level:
+            trade_ratio = trade_ratio * params.dampen
+
+    return trade_ratio
+
+
+def buy_order_amount(krw_balance, trade_ratio, params=DEFAULT_PARAMS):
+    """매수 주문 금액(KRW). 최소 금액 이하면 fallback_order_krw"""
+    order_amount = krw_balance * trade_ratio
+    if order_amount <= MIN_TRADE_AMOUNT:
+        order_amount = params.fallback_order_krw
+    return order_amount
+
+
+def buy_order(krw_balance, trade_ratio, params=DEFAULT_PARAMS):
+    """매수 여부와 금액 (execute_trade, plan_order 공용) -> KRW 금액 | None (주문 없음)
+
+    fallback_order_krw가 최소 금액과 같으면(5000) 최소 금액 이하 주문은 넣지 않음
+    """
+    order_amount = buy_order_amount(krw_balance, trade_ratio, params)
+    return order_amount if order_amount > MIN_TRADE_AMOUNT else None
+
+
+def sell_order_volume(coin_balance, trade_ratio, price, params=DEFAULT_PARAMS):
+    """매도 수량. 평가 금액이 최소 금액 이하면 fallback_order_krw 어치"""
+    sell_amount = coin_balance * trade_ratio
+    if sell_amount * price <= MIN_TRADE_AMOUNT:
+        sell_amount = params.fallback_order_krw / price
+    return sell_amount
+
+
+def plan_order(decision, percentage, confidence_score, fear_greed_value, krw_balance, coin_balance, price,
+               params=DEFAULT_PARAMS):
+    """execute_trade와 같은 규칙으로 주문 계산
+
+    Returns: ("buy", KRW 금액) | ("sell", 코인 수량) | None (주문 없음)
+    """
+    if confidence_score < params.min_confidence or decision not in ("buy", "sell"):
+        return None
+    trade_ratio = adjust_trade_ratio(percentage, fear_greed_value, decision, params)
+    if decision == "buy":
+        amount = buy_order(krw_balance, trade_ratio, params)
+        return ("buy", amount) if amount is not None else None
+    volume = sell_order_volume(coin_balance, trade_ratio, price, params)
+    return ("sell", volume) if volume * price >= MIN_TRADE_AMOUNT else None
@@ -0,0 +1,209 @@
+"""이벤트 기반 매매 사이클 트리거
+
+실시간 피드(또는 주기적 REST 조회) 가격/호가를 받아 티커별 지표를 갱신하고,
+아래 조건이 일정 시간(debounce) 유지되면 분석 사이클을 요청한다.
+
+- atr_move:  마지막 사이클 이후 가격이 ATR의 N배 이상 이동
+- bb_breakout: 볼린저 밴드 상단/하단 돌파
+- rsi_cross: RSI 과매수/과매도 구간 진입
+- imbalance: 호가 잔량 불균형 급증
+
+티커별 cooldown, 전체 시간당 최대 사이클 수(max_per_hour)로 과도한 실행을 막는다.
+정각 사이클은 그대로 두고 이 트리거는 추가 실행만 담당한다.
+"""
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+
+import pandas as pd
+
+from candle_store import INTERVAL_SECONDS, KST
+from indicators import IndicatorEngine
+
+
+def _env_float(name, default):
+    return float(os.getenv(name, str(default)))
+
+
+@dataclass
+class TriggerConfig:
+    """0 또는 None으로 두면 해당 조건 비활성"""
+    atr_multiple: float = field(default_factory=lambda: _env_float("TRIGGER_ATR_MULTIPLE", 1.5))
+    bb_breakout: bool = field(default_factory=lambda: os.getenv("TRIGGER_BB_BREAKOUT", "true").lower() == "true")
+    rsi_low: float = field(default_factory=lambda: _env_float("TRIGGER_RSI_LOW", 30))
+    rsi_high: float = field(default_factory=lambda: _env_float("TRIGGER_RSI_HIGH", 70))
+    imbalance: float = field(default_factory=lambda: _env_float("TRIGGER_IMBALANCE", 0.6))
+    debounce: float = field(default_factory=lambda: _env_float("TRIGGER_DEBOUNCE", 30))       # 조건 유지 시간(초)
+    cooldown: float = field(default_factory=lambda: _env_float("TRIGGER_COOLDOWN", 900))      # 티커별 사이클 간 최소 간격(초)
+    max_per_hour: int = field(default_factory=lambda: int(_env_float("TRIGGER_MAX_PER_HOUR", 6)))
+    interval: str = "minute60"  # 지표 계산 봉 단위
+
+
+@dataclass(frozen=True)
+class TriggerEvent:
+    ticker: str
+    name: str
+    detail: str
+
+
+# --- 조건 (활성 상태면 설명 문자열, 아니면 None) ---
+def _atr_move(state, cfg):
+    atr = state.indicators.get("atr") or 0.0
+    if not cfg.atr_multiple or atr <= 0 or state.anchor_price is None:
+        return None
+    move = (state.price - state.anchor_price) / atr
+    if abs(move) >= cfg.atr_multiple:
+        return f"price moved {move:+.2f} ATR since last cycle"
+    return None
+
+
+def _bb_breakout(state, cfg):
+    if not cfg.bb_breakout:
+        return None
+    high, low = state.indicators.get("bb_high"), state.indicators.get("bb_low")
+    if high is None or high != high:
+        return None
+    if state.price > high:
+        return f"price {state.price:,.0f} above upper band {high:,.0f}"
+    if state.price < low:
+        return f"price {state.price:,.0f} below lower band {low:,.0f}"
+    return None
+
+
+def _rsi_cross(state, cfg):
+    rsi = state.indicators.get("rsi")
+    if rsi is None or rsi != rsi:
+        return None
+    if cfg.rsi_high and rsi >= cfg.rsi_high:
+        return f"RSI {rsi:.1f} >= {cfg.rsi_high:g}"
+    if cfg.rsi_low and rsi <= cfg.rsi_low:
+        return f"RSI {rsi:.1f} <= {cfg.rsi_low:g}"
+    return None
+
+
+def _imbalance(state, cfg):
+    if not cfg.imbalance or state.imbalance is None:
+        return None
+    if abs(state.imbalance) >= cfg.imbalance:
+        side = "bid" if state.imbalance > 0 else "ask"
+        return f"orderbook {side} imbalance {state.imbalance:+.2f}"
+    return None
+
+
+CONDITIONS = {
+    "atr_move": _atr_move,
+    "bb_breakout": _bb_breakout,
+    "rsi_cross": _rsi_cross,
+    "imbalance": _imbalance,
+}
+
+
+class _TickerState:
+    def __init__(self, engine, bar_ts, bar_high, bar_low):
+        self.engine = engine
+        self.bar_ts = bar_ts        # 진행 중인 봉 시작 시각 (KST naive)
+        self.bar_high = bar_high
+        self.bar_low = bar_low
+        self.price = None
+        self.imbalance = None
+        self.indicators = {}
+        self.anchor_price = None    # 마지막 사이클 시점 가격 (ATR 이동 기준)
+        self.last_cycle = None      # monotonic
+        self.active_since = {}      # 조건 -> 활성화 시각 (monotonic)
+        self.fired = set()          # 활성 구간 동안 이미 실행된 조건
+
+
+class TriggerEngine:
+    """가격/호가 관측 -> 디바운스/쿨다운/속도 제한을 거친 사이클 요청"""
+
+    def __init__(self, config=None, conditions=CONDITIONS):
+        self.config = config or TriggerConfig()
+        self.conditions = conditions
+        self.states = {}
+        self.fired_at = deque()  # 최근 1시간 트리거 실행 시각 (monotonic)
+        self.suppressed = 0
+
+    @property
+    def tickers(self):
+        return list(self.states)
+
+    def seed(self, ticker, df):
+        """과거 캔들(시간 오름차순, 마지막 행은 진행 중인 봉일 수 있음)로 지표 상태 초기화"""
+        engine = IndicatorEngine.from_frame(df)
+        last = df.iloc[-1]
+        state = _TickerState(engine, df.index[-1], float(last["high"]), float(last["low"]))
+        state.price = state.anchor_price = float(last["close"])
+        state.indicators = engine.last or {}
+        self.states[ticker] = state
+
+    def _bar_start(self, state, now_kst):
+        """now가 속한 봉의 시작 시각 (마지막 봉 시작 + 봉 길이의 정수배)"""
+        step = pd.Timedelta(seconds=INTERVAL_SECONDS[self.config.interval])
+        elapsed = (now_kst - state.bar_ts) // step
+        return state.bar_ts + step * max(elapsed, 0)
+
+    def observe(self, ticker, price, imbalance=None, now_kst=None):
+        """틱 가격 반영: 진행 중인 봉의 고가/저가/종가를 갱신해 지표 재계산"""
+        state = self.states.get(ticker)
+        if state is None or price is None:
+            return
+        now_kst = now_kst or pd.Timestamp(datetime.now(KST).replace(tzinfo=None))
+        bar_ts = self._bar_start(state, now_kst)
+        if bar_ts != state.bar_ts:  # 새 봉 시작
+            state.bar_ts, state.bar_high, state.bar_low = bar_ts, price, price
+        else:
+            state.bar_high = max(state.bar_high, price)
+            state.bar_low = min(state.bar_low, price)
+        # 같은 ts로 update하면 IndicatorEngine이 직전 상태로 되돌린 뒤 다시 반영
+        state.indicators = state.engine.update(bar_ts, state.bar_high, state.bar_low, price)
+        state.price = price
+        if imbalance is not None:
+            state.imbalance = imbalance
+
+    def poll(self, now=None):
+        """조건 평가 -> 실행할 TriggerEvent 목록 (티커당 최대 1건)"""
+        now = time.monotonic() if now is None else now
+        cfg = self.config
+        while self.fired_at and now - self.fired_at[0] > 3600:
+            self.fired_at.popleft()
+
+        events = []
+        for ticker, state in self.states.items():
+            if state.price is None:
+                continue
+            ready = []
+            for name, check in self.conditions.items():
+                detail = check(state, cfg)
+                if detail is None:
+                    # 조건이 풀리면 다시 실행 가능 상태로
+                    state.active_since.pop(name, None)
+                    state.fired.discard(name)
+                    continue
+                since = state.active_since.setdefault(name, now)
+                if name not in state.fired and now - since >= cfg.debounce:
+                    ready.append((name, detail))
+            if not ready:
+                continue
+
+            # 쿨다운/속도 제한에 걸리면 조건을 유지한 채 다음 poll에서 다시 시도
+            if state.last_cycle is not None and now - state.last_cycle < cfg.cooldown:
+                self.suppressed += 1
+                continue
+            if cfg.max_per_hour and len(self.fired_at) >= cfg.max_per_hour:
+                self.suppressed += 1
+                continue
+
+            state.fired.update(name for name, _ in ready)
+            self.fired_at.append(now)
+            events.append(TriggerEvent(ticker, "+".join(n for n, _ in ready), "; ".join(d for _, d in ready)))
+        return events
+
+    def mark_cycle(self, ticker, now=None):
+        """사이클 실행(트리거/정각 모두) 후 호출: 쿨다운 시작, ATR 이동 기준가 갱신"""
+        state = self.states.get(ticker)
+        if state is None:
+            return
+        state.last_cycle = time.monotonic() if now is None else now
+        state.anchor_price = state.price